@@ -0,0 +1 @@
+"""Генератор синтетических данных и замеры производительности сервисов"""
@@ -0,0 +1,147 @@
+"""Генератор синтетической базы: объекты, счетчики, показания, тарифы, платежи
+
+Показания монотонно растут с реалистичным расходом (горячая вода
+меньше холодной), тарифы дорожают раз в год. Данные вставляются
+Core-вставками порциями, таблица помесячного потребления и снимок
+последних показаний пересчитываются одним проходом, платежи
+рассчитываются сервисом по каждому месяцу.
+"""
+import random
+from dataclasses import dataclass
+from datetime import datetime, timedelta
+from typing import Dict, List
+from sqlalchemy import insert, select
+from sqlalchemy.orm import Session
+from models.entities import Property, Counter, Reading, Tariff, Payment
+from services.payment_service import PaymentService, DEFAULT_TARIFFS, payment_values
+from services.reading_service import get_month_period
+from services.usage_service import MonthlyUsageService
+from services.latest_service import LatestReadingService
+
+INSERT_BATCH_SIZE = 50000
+
+# Расход за один интервал между показаниями, м³
+HOT_USAGE_RANGE = (1, 4)
+COLD_USAGE_RANGE = (2, 7)
+
+# Годовой рост тарифов
+TARIFF_GROWTH_RANGE = (0.04, 0.09)
+
+@dataclass(frozen=True)
+class DatasetSpec:
+    """Параметры синтетического набора данных"""
+    name: str
+    counters: int  # Четное число: на объект по счетчику горячей и холодной воды
+    years: int
+    readings_per_month: int = 2
+    start_year: int = 2020
+    with_payments: bool = True
+    seed: int = 42
+    
+    @property
+    def properties(self) -> int:
+        return max(1, self.counters // 2)
+    
+    @property
+    def end_date(self) -> datetime:
+        return datetime(self.start_year + self.years, 1, 1) - timedelta(seconds=1)
+    
+    def months(self) -> List[tuple]:
+        return [(self.start_year + i // 12, i % 12 + 1) for i in range(self.years * 12)]
+
+SCALES: Dict[str, DatasetSpec] = {
+    "small": DatasetSpec("small", counters=10, years=1),
+    "medium": DatasetSpec("medium", counters=200, years=3),
+    "large": DatasetSpec("large", counters=2000, years=5),
+}
+
+def _insert_batches(db: Session, table, rows):
+    """Вставка строк порциями по INSERT_BATCH_SIZE"""
+    batch = []
+    for row in rows:
+        batch.append(row)
+        if len(batch) >= INSERT_BATCH_SIZE:
+            db.execute(insert(table), batch)
+            batch = []
+    if batch:
+        db.execute(insert(table), batch)
+
+def _generate_tariffs(spec: DatasetSpec, rng: random.Random) -> List[Dict]:
+    """Тарифы по годам, каждый закрывается началом следующего"""
+    rows = []
+    for service_type, price in DEFAULT_TARIFFS:
+        for year_offset in range(spec.years):
+            start_date = datetime(spec.start_year + year_offset, 1, 1)
+            last_year = year_offset == spec.years - 1
+            rows.append({
+                "service_type": service_type,
+                "price_per_cubic_meter": round(price, 2),
+                "start_date": start_date,
+                "end_date": None if last_year else datetime(start_date.year + 1, 1, 1),
+            })
+            price *= 1 + rng.uniform(*TARIFF_GROWTH_RANGE)
+    return rows
+
+def _generate_readings(spec: DatasetSpec, counters: List[tuple], rng: random.Random):
+    """Монотонные показания всех счетчиков, по readings_per_month в месяц"""
+    step_days = 28 // spec.readings_per_month
+    for counter_id, water_type in counters:
+        value = rng.randint(0, 500)
+        usage_range = HOT_USAGE_RANGE if water_type == "hot" else COLD_USAGE_RANGE
+        for year, month in spec.months():
+            for index in range(spec.readings_per_month):
+                value += rng.randint(*usage_range)
+                yield {
+                    "counter_id": counter_id,
+                    "value": value,
+                    "reading_date": datetime(year, month, 1 + index * step_days, rng.randint(8, 22)),
+                }
+
+def _generate_payments(db: Session, spec: DatasetSpec) -> int:
+    """Платежи по всем объектам за каждый месяц набора"""
+    payment_service = PaymentService(db)
+    rows = []
+    for year, month in spec.months():
+        _, period_end = get_month_period(year, month)
+        for calculation in payment_service.calculate_all_properties(year, month).calculations:
+            rows.append(dict(payment_values(calculation, "synthetic"), calculated_at=period_end))
+    _insert_batches(db, Payment.__table__, rows)
+    return len(rows)
+
+def generate_dataset(db: Session, spec: DatasetSpec) -> Dict[str, int]:
+    """Заполнение пустой базы по спецификации, возвращает число созданных строк"""
+    rng = random.Random(spec.seed)
+    
+    _insert_batches(db, Property.__table__, (
+        {"name": f"Объект {index + 1}", "address": f"ул. Синтетическая, д. {index + 1}"}
+        for index in range(spec.properties)
+    ))
+    property_ids = list(db.scalars(select(Property.id).order_by(Property.id)))
+    
+    counters = []
+    for index in range(spec.counters):
+        water_type = "hot" if index % 2 == 0 else "cold"
+        counters.append({
+            "number": f"SYN{index + 1:06d}",
+            "water_type": water_type,
+            "description": f"{'Горячая' if water_type == 'hot' else 'Холодная'} вода, объект {index // 2 + 1}",
+            "property_id": property_ids[min(index // 2, len(property_ids) - 1)],
+        })
+    _insert_batches(db, Counter.__table__, counters)
+    counter_rows = list(db.execute(select(Counter.id, Counter.water_type).order_by(Counter.id)))
+    
+    _insert_batches(db, Tariff.__table__, _generate_tariffs(spec, rng))
+    _insert_batches(db, Reading.__table__, _generate_readings(spec, counter_rows, rng))
+    usage_rows = MonthlyUsageService(db).rebuild()
+    LatestReadingService(db).rebuild()
+    
+    payments = _generate_payments(db, spec) if spec.with_payments else 0
+    db.commit()
+    
+    return {
+        "properties": len(property_ids),
+        "counters": len(counter_rows),
+        "readings": spec.counters * len(spec.months()) * spec.readings_per_month,
+        "usage_rows": usage_rows,
+        "payments": payments,
+    }
@@ -0,0 +1,232 @@
+"""Замеры сервисного слоя на синтетических данных разного масштаба
+
+Для каждого масштаба создается отдельная база, заполняется генератором
+и прогоняется набор замеров. Результаты пишутся в JSON, который можно
+сравнить с результатами другого коммита:
+
+    python -m benchmarks.run --scales small,medium --output bench.json
+    python -m benchmarks.run --scales small --compare bench.json
+"""
+import argparse
+import json
+import os
+import platform
+import sqlite3
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+from dataclasses import replace
+from datetime import datetime, timedelta
+from typing import Callable, Dict, List, Optional
+import sqlalchemy
+from sqlalchemy.orm import sessionmaker
+from models.migrations import upgrade_database
+from models.schemas import ReadingCreate
+from models.storage import load_storage_profile, create_storage_engine
+from services.reading_service import ReadingService
+from services.payment_service import PaymentService
+from services.forecast_service import ForecastService
+from services.instrumentation import QueryInstrumentation, QueryBudgetExceeded, instrument_services
+from .generator import DatasetSpec, SCALES, generate_dataset
+
+DEFAULT_REPEAT = 5
+DEFAULT_INGEST_SIZE = 10000
+
+def _git_commit() -> Optional[str]:
+    """Текущий коммит рабочего дерева, если доступен git"""
+    try:
+        return subprocess.run(
+            ["git", "rev-parse", "--short", "HEAD"],
+            capture_output=True, text=True, check=True,
+            cwd=os.path.dirname(os.path.abspath(__file__))
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+def time_call(function: Callable[[int], object], repeat: int) -> Dict[str, float]:
+    """Время вызовов в миллисекундах после одного прогревочного вызова
+    
+    function получает номер повтора (прогрев - номер 0).
+    """
+    function(0)
+    samples = []
+    for attempt in range(1, repeat + 1):
+        started = time.perf_counter()
+        function(attempt)
+        samples.append((time.perf_counter() - started) * 1000)
+    return {
+        "min_ms": round(min(samples), 3),
+        "median_ms": round(statistics.median(samples), 3),
+        "max_ms": round(max(samples), 3),
+    }
+
+def build_benchmarks(db, spec: DatasetSpec, ingest_size: int) -> Dict[str, Callable[[int], object]]:
+    """Замеряемые операции для заполненной базы"""
+    reading_service = ReadingService(db)
+    payment_service = PaymentService(db)
+    last_year, last_month = spec.months()[-1]
+    period_start = datetime(spec.start_year + spec.years // 2, 1, 1)
+    counter_ids = list(range(1, spec.counters + 1))
+    # Границы 12 месяцев последнего года данных
+    year_boundaries = [datetime(last_year, month, 1) for month in range(1, 13)] + [datetime(last_year + 1, 1, 1)]
+    
+    def forecast_payments(attempt: int):
+        # Построение модели по всей истории и прогноз последнего месяца
+        forecast_service = ForecastService(db, payment_service)
+        forecast_service.fit(cutoff=(last_year, last_month))
+        return forecast_service.project_payments(last_year, last_month)
+    
+    def bulk_ingest(attempt: int):
+        # Каждый повтор пишет показания после всех предыдущих
+        base_date = spec.end_date + timedelta(days=attempt + 1)
+        base_value = 10 ** 7 + attempt * ingest_size
+        readings = [
+            ReadingCreate(
+                counter_id=counter_ids[index % len(counter_ids)],
+                value=base_value + index,
+                reading_date=base_date + timedelta(seconds=index)
+            )
+            for index in range(ingest_size)
+        ]
+        return reading_service.create_readings_bulk(readings)
+    
+    return {
+        "get_monthly_consumption": lambda attempt: reading_service.get_monthly_consumption(last_year, last_month),
+        "get_consumption_for_period": lambda attempt: reading_service.get_consumption_for_period(period_start, spec.end_date),
+        "calculate_monthly_payment": lambda attempt: payment_service.calculate_monthly_payment(last_year, last_month),
+        "calculate_monthly_payment_property": lambda attempt: payment_service.calculate_monthly_payment(last_year, last_month, 1),
+        "get_payment_summary": lambda attempt: payment_service.get_payment_summary(last_year),
+        "consumption_matrix_12m": lambda attempt: reading_service.get_consumption_matrix(year_boundaries, "property"),
+        "forecast_payments": forecast_payments,
+        # Повторное сохранение перезаписывает платежи того же месяца
+        "save_payments": lambda attempt: payment_service.save_payments(
+            payment_service.calculate_all_properties(last_year, last_month).calculations
+        ),
+        # Запись идет последней: она меняет данные остальных замеров
+        "bulk_ingest": bulk_ingest,
+    }
+
+def run_scale(spec: DatasetSpec, workdir: str, repeat: int, ingest_size: int,
+              keep_db: bool = False) -> List[Dict]:
+    """Генерация базы масштаба spec и прогон замеров"""
+    path = os.path.join(workdir, f"bench_{spec.name}.db")
+    if os.path.exists(path):
+        os.remove(path)
+    
+    profile = replace(load_storage_profile(), database_url=f"sqlite:///{path}")
+    engine = create_storage_engine(profile)
+    upgrade_database(engine)
+    db = sessionmaker(bind=engine)()
+    
+    try:
+        started = time.perf_counter()
+        counts = generate_dataset(db, spec)
+        generate_seconds = time.perf_counter() - started
+        print(f"📦 {spec.name}: {counts} за {generate_seconds:.1f} с", file=sys.stderr)
+        
+        results = []
+        for name, function in build_benchmarks(db, spec, ingest_size).items():
+            timing = time_call(function, repeat)
+            print(f"  {name}: {timing['median_ms']:.2f} мс", file=sys.stderr)
+            results.append({
+                "scale": spec.name,
+                "benchmark": name,
+                "repeat": repeat,
+                **timing,
+            })
+        results.append({
+            "scale": spec.name,
+            "benchmark": "generate_dataset",
+            "repeat": 1,
+            "min_ms": round(generate_seconds * 1000, 3),
+            "median_ms": round(generate_seconds * 1000, 3),
+            "max_ms": round(generate_seconds * 1000, 3),
+            **counts,
+        })
+        return results
+    finally:
+        db.close()
+        engine.dispose()
+        if not keep_db:
+            for suffix in ("", "-wal", "-shm"):
+                if os.path.exists(path + suffix):
+                    os.remove(path + suffix)
+
+def compare(current: List[Dict], baseline_path: str):
+    """Сравнение медиан с результатами из другого файла (вывод в stderr)"""
+    with open(baseline_path, encoding="utf-8") as f:
+        baseline = {
+            (row["scale"], row["benchmark"]): row["median_ms"]
+            for row in json.load(f)["results"]
+        }
+    
+    print(f"\n{'масштаб':<8} {'замер':<36} {'было, мс':>10} {'стало, мс':>10} {'изм.':>8}", file=sys.stderr)
+    for row in current:
+        before = baseline.get((row["scale"], row["benchmark"]))
+        if before is None:
+            continue
+        change = (row["median_ms"] / before - 1) * 100 if before else 0.0
+        print(f"{row['scale']:<8} {row['benchmark']:<36} {before:>10.2f} {row['median_ms']:>10.2f} {change:>+7.1f}%", file=sys.stderr)
+
+def main(argv: Optional[List[str]] = None) -> int:
+    """Прогон замеров из командной строки"""
+    parser = argparse.ArgumentParser(description="Замеры производительности сервисов")
+    parser.add_argument("--scales", default="small,medium", help=f"Масштабы через запятую: {', '.join(SCALES)}")
+    parser.add_argument("--repeat", type=int, default=DEFAULT_REPEAT)
+    parser.add_argument("--ingest-size", type=int, default=DEFAULT_INGEST_SIZE)
+    parser.add_argument("--output", help="Файл результатов JSON (по умолчанию - stdout)")
+    parser.add_argument("--compare", help="Файл результатов для сравнения")
+    parser.add_argument("--workdir", help="Каталог для баз (по умолчанию - временный)")
+    parser.add_argument("--keep-db", action="store_true", help="Не удалять сгенерированные базы")
+    parser.add_argument("--check-queries", action="store_true",
+                        help="Учет запросов сервисов; повтор запроса сверх порога (N+1) - ошибка")
+    args = parser.parse_args(argv)
+    
+    names = [name.strip() for name in args.scales.split(",") if name.strip()]
+    unknown = [name for name in names if name not in SCALES]
+    if unknown:
+        parser.error(f"Неизвестные масштабы: {', '.join(unknown)}")
+    
+    instrumentation = instrument_services(QueryInstrumentation(strict=True)) if args.check_queries else None
+    
+    workdir = args.workdir or tempfile.mkdtemp(prefix="water_counter_bench_")
+    results = []
+    try:
+        for name in names:
+            results.extend(run_scale(SCALES[name], workdir, args.repeat, args.ingest_size, args.keep_db))
+    except QueryBudgetExceeded as e:
+        print(f"❌ Превышен порог запросов: {e}", file=sys.stderr)
+        return 1
+    finally:
+        if instrumentation is not None:
+            print("\n📊 Запросы по методам:\n" + instrumentation.format_report(), file=sys.stderr)
+        if not args.workdir and not args.keep_db:
+            os.rmdir(workdir)
+    
+    report = {
+        "meta": {
+            "commit": _git_commit(),
+            "created_at": time.strftime("%Y-%m-%dT%H:%M:%S"),
+            "python": platform.python_version(),
+            "sqlalchemy": sqlalchemy.__version__,
+            "sqlite": sqlite3.sqlite_version,
+            "platform": platform.platform(),
+            "storage_profile": load_storage_profile().name,
+        },
+        "results": results,
+    }
+    
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as f:
+            json.dump(report, f, ensure_ascii=False, indent=2)
+    else:
+        print(json.dumps(report, ensure_ascii=False, indent=2))
+    
+    if args.compare:
+        compare(results, args.compare)
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,124 @@
+"""Проверка времени запуска приложения
+
+Замеряет импорт стартовых модулей (python -X importtime) и время до
+появления меню на уже размеченной базе, проверяет, что тяжелые пакеты
+не загружаются при запуске и что SCHEMA_REVISION совпадает с головной
+ревизией миграций. При превышении бюджета код возврата 1:
+
+    python -m benchmarks.startup --import-budget-ms 500 --startup-budget-ms 900
+"""
+import argparse
+import json
+import os
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+from typing import Dict, List, Optional, Set, Tuple
+
+# Код, выполняемый при запуске main.py до появления меню
+STARTUP_CODE = (
+    "import main; main.init_database(); "
+    "from ui.console_ui import ConsoleUI; ConsoleUI().show_main_menu()"
+)
+
+# Пакеты, которые при запуске не должны загружаться
+DEFERRED_PACKAGES = ("alembic", "numpy", "pyarrow", "pydantic")
+
+DEFAULT_IMPORT_BUDGET_MS = 500.0
+DEFAULT_STARTUP_BUDGET_MS = 900.0
+DEFAULT_RUNS = 5
+
+PROJECT_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+def _run(code: str, env: Dict[str, str], importtime: bool = False) -> subprocess.CompletedProcess:
+    """Запуск кода в отдельном интерпретаторе из корня проекта"""
+    command = [sys.executable] + (["-X", "importtime"] if importtime else []) + ["-c", code]
+    return subprocess.run(command, cwd=PROJECT_DIR, env=env, capture_output=True, text=True, check=True)
+
+def parse_importtime(stderr: str) -> Tuple[Dict[str, int], Set[str]]:
+    """Накопленное время импорта модулей верхнего уровня (мкс) и все модули"""
+    top_level = {}
+    modules = set()
+    for line in stderr.splitlines():
+        if not line.startswith("import time:") or "cumulative" in line:
+            continue
+        _, cumulative, name = line[len("import time:"):].split("|")
+        modules.add(name.strip())
+        if not name.startswith("  "):  # Вложенные импорты сдвинуты вправо
+            top_level[name.strip()] = int(cumulative)
+    return top_level, modules
+
+def measure(env: Dict[str, str], runs: int) -> Dict:
+    """Замер импорта и запуска до меню (медиана по runs запускам)"""
+    import_samples = []
+    startup_samples = []
+    loaded_deferred = set()
+    
+    for _ in range(runs):
+        top_level, modules = parse_importtime(_run(STARTUP_CODE, env, importtime=True).stderr)
+        import_samples.append(sum(top_level.values()) / 1000)
+        # Тяжелые пакеты могут подтягиваться косвенно, поэтому смотрим все дерево
+        loaded_deferred.update(
+            package for package in (name.split(".")[0] for name in modules)
+            if package in DEFERRED_PACKAGES
+        )
+        
+        started = time.perf_counter()
+        _run(STARTUP_CODE, env)
+        startup_samples.append((time.perf_counter() - started) * 1000)
+    
+    return {
+        "import_ms": round(statistics.median(import_samples), 1),
+        "startup_ms": round(statistics.median(startup_samples), 1),
+        "deferred_loaded": sorted(loaded_deferred),
+    }
+
+def check_schema_revision() -> Optional[str]:
+    """Ошибка, если SCHEMA_REVISION отстает от миграций"""
+    sys.path.insert(0, PROJECT_DIR)
+    from models.migrations import SCHEMA_REVISION, get_head_revision
+    
+    head = get_head_revision()
+    if head != SCHEMA_REVISION:
+        return f"SCHEMA_REVISION = {SCHEMA_REVISION}, головная ревизия миграций {head}"
+    return None
+
+def main(argv: Optional[List[str]] = None) -> int:
+    """Проверка бюджета запуска из командной строки"""
+    parser = argparse.ArgumentParser(description="Проверка времени запуска")
+    parser.add_argument("--import-budget-ms", type=float, default=DEFAULT_IMPORT_BUDGET_MS)
+    parser.add_argument("--startup-budget-ms", type=float, default=DEFAULT_STARTUP_BUDGET_MS)
+    parser.add_argument("--runs", type=int, default=DEFAULT_RUNS)
+    args = parser.parse_args(argv)
+    
+    problems = []
+    revision_problem = check_schema_revision()
+    if revision_problem:
+        problems.append(revision_problem)
+    
+    with tempfile.TemporaryDirectory(prefix="water_counter_startup_") as workdir:
+        env = dict(os.environ, WATER_COUNTER_DB_URL=f"sqlite:///{os.path.join(workdir, 'startup.db')}")
+        env.pop("WATER_COUNTER_QUERY_STATS", None)
+        # Первый запуск создает схему, замеряются последующие
+        _run("import main; main.init_database()", env)
+        result = measure(env, args.runs)
+    
+    if result["import_ms"] > args.import_budget_ms:
+        problems.append(f"импорт {result['import_ms']} мс при бюджете {args.import_budget_ms} мс")
+    if result["startup_ms"] > args.startup_budget_ms:
+        problems.append(f"запуск {result['startup_ms']} мс при бюджете {args.startup_budget_ms} мс")
+    if result["deferred_loaded"]:
+        problems.append(f"при запуске загружены: {', '.join(result['deferred_loaded'])}")
+    
+    result.update({
+        "import_budget_ms": args.import_budget_ms,
+        "startup_budget_ms": args.startup_budget_ms,
+        "problems": problems,
+    })
+    print(json.dumps(result, ensure_ascii=False, indent=2))
+    return 1 if problems else 0
+
+if __name__ == "__main__":
+    sys.exit(main())
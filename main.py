@@ -1,14 +1,17 @@
 # -*- coding: utf-8 -*-3
+import os
+import sys
 
 from models.database import engine
-from models.entities import Base
-from ui.console_ui import ConsoleUI
+from models.migrations import ensure_schema
 
 def init_database():
     """Инициализация базы данных"""
     print("🔧 Инициализация базы данных...")
-    Base.metadata.create_all(bind=engine)
-    print("✅ База данных инициализирована")
+    if ensure_schema(engine):
+        print("✅ База данных обновлена")
+    else:
+        print("✅ База данных актуальна")
 
 def main():
     """Главная функция приложения"""
@@ -16,6 +19,13 @@ def main():
         # Инициализируем базу данных
         init_database()
         
+        from ui.console_ui import ConsoleUI
+        
+        # Учет запросов включается переменной WATER_COUNTER_QUERY_STATS
+        if os.environ.get("WATER_COUNTER_QUERY_STATS"):
+            from services.instrumentation import configure_from_env
+            configure_from_env(ConsoleUI)
+        
         # Запускаем консольный интерфейс
         ui = ConsoleUI()
         ui.run()
@@ -27,4 +37,8 @@ def main():
         print("Попробуйте перезапустить приложение")
 
 if __name__ == "__main__":
+    if len(sys.argv) > 1:
+        # Подкоманды без диалога: python main.py bill --year 2024 --month 5
+        from ui.cli import main as cli_main
+        sys.exit(cli_main(sys.argv[1:]))
     main()
@@ -0,0 +1,92 @@
+"""Базовая схема: счетчики, показания, тарифы, платежи
+
+Revision ID: 0001
+Revises:
+Create Date: 2026-10-16 00:00:00
+
+Таблицы создаются только если их еще нет, поэтому ревизия накатывается
+и на пустую базу, и на существующий water_counter.db, созданный через
+Base.metadata.create_all.
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = "0001"
+down_revision: Union[str, Sequence[str], None] = None
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    existing_tables = set(sa.inspect(op.get_bind()).get_table_names())
+
+    if "counters" not in existing_tables:
+        op.create_table(
+            "counters",
+            sa.Column("id", sa.Integer(), nullable=False),
+            sa.Column("number", sa.String(length=50), nullable=False),
+            sa.Column("water_type", sa.String(length=20), nullable=False),
+            sa.Column("description", sa.Text(), nullable=True),
+            sa.Column("created_at", sa.DateTime(), nullable=True),
+            sa.PrimaryKeyConstraint("id"),
+        )
+        op.create_index("ix_counters_id", "counters", ["id"])
+        op.create_index("ix_counters_number", "counters", ["number"], unique=True)
+
+    if "readings" not in existing_tables:
+        op.create_table(
+            "readings",
+            sa.Column("id", sa.Integer(), nullable=False),
+            sa.Column("counter_id", sa.Integer(), nullable=False),
+            sa.Column("value", sa.Integer(), nullable=False),
+            sa.Column("reading_date", sa.DateTime(), nullable=False),
+            sa.Column("created_at", sa.DateTime(), nullable=True),
+            sa.ForeignKeyConstraint(["counter_id"], ["counters.id"]),
+            sa.PrimaryKeyConstraint("id"),
+        )
+        op.create_index("ix_readings_id", "readings", ["id"])
+
+    if "tariffs" not in existing_tables:
+        op.create_table(
+            "tariffs",
+            sa.Column("id", sa.Integer(), nullable=False),
+            sa.Column("service_type", sa.String(length=20), nullable=False),
+            sa.Column("price_per_cubic_meter", sa.Float(), nullable=False),
+            sa.Column("start_date", sa.DateTime(), nullable=False),
+            sa.Column("end_date", sa.DateTime(), nullable=True),
+            sa.Column("created_at", sa.DateTime(), nullable=True),
+            sa.PrimaryKeyConstraint("id"),
+        )
+        op.create_index("ix_tariffs_id", "tariffs", ["id"])
+
+    if "payments" not in existing_tables:
+        op.create_table(
+            "payments",
+            sa.Column("id", sa.Integer(), nullable=False),
+            sa.Column("period_start", sa.DateTime(), nullable=False),
+            sa.Column("period_end", sa.DateTime(), nullable=False),
+            sa.Column("total_amount", sa.Float(), nullable=False),
+            sa.Column("cold_water_consumption", sa.Integer(), nullable=False),
+            sa.Column("cold_water_amount", sa.Float(), nullable=False),
+            sa.Column("hot_water_consumption", sa.Integer(), nullable=False),
+            sa.Column("hot_water_amount", sa.Float(), nullable=False),
+            sa.Column("wastewater_consumption", sa.Integer(), nullable=False),
+            sa.Column("wastewater_amount", sa.Float(), nullable=False),
+            sa.Column("calculated_at", sa.DateTime(), nullable=True),
+            sa.Column("notes", sa.Text(), nullable=True),
+            sa.PrimaryKeyConstraint("id"),
+        )
+        op.create_index("ix_payments_id", "payments", ["id"])
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_table("payments")
+    op.drop_table("tariffs")
+    op.drop_table("readings")
+    op.drop_table("counters")
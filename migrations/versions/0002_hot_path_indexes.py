@@ -0,0 +1,53 @@
+"""Составные индексы для горячих запросов показаний, тарифов и платежей
+
+Revision ID: 0002
+Revises: 0001
+Create Date: 2026-10-16 00:00:00
+
+- readings (counter_id, reading_date): выборки показаний счетчика по дате
+- tariffs (service_type, start_date, end_date): поиск действующего тарифа
+- payments (period_start, ...): покрывающий индекс для сводок за период
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = "0002"
+down_revision: Union[str, Sequence[str], None] = "0001"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.create_index(
+        "ix_readings_counter_date",
+        "readings",
+        ["counter_id", "reading_date"],
+    )
+    op.create_index(
+        "ix_tariffs_service_period",
+        "tariffs",
+        ["service_type", "start_date", "end_date"],
+    )
+    op.create_index(
+        "ix_payments_period_covering",
+        "payments",
+        [
+            "period_start",
+            "period_end",
+            "total_amount",
+            "hot_water_consumption",
+            "cold_water_consumption",
+        ],
+    )
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_index("ix_payments_period_covering", table_name="payments")
+    op.drop_index("ix_tariffs_service_period", table_name="tariffs")
+    op.drop_index("ix_readings_counter_date", table_name="readings")
@@ -0,0 +1,83 @@
+"""Объекты недвижимости: владельцы счетчиков и платежей
+
+Revision ID: 0003
+Revises: 0002
+Create Date: 2026-10-16 00:00:00
+
+Существующие счетчики и платежи привязываются к объекту по умолчанию,
+чтобы база с одной квартирой продолжила работать как раньше.
+"""
+from datetime import datetime
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = "0003"
+down_revision: Union[str, Sequence[str], None] = "0002"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+DEFAULT_PROPERTY_NAME = "Основная квартира"
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.create_table(
+        "properties",
+        sa.Column("id", sa.Integer(), nullable=False),
+        sa.Column("name", sa.String(length=100), nullable=False),
+        sa.Column("address", sa.Text(), nullable=True),
+        sa.Column("created_at", sa.DateTime(), nullable=True),
+        sa.PrimaryKeyConstraint("id"),
+    )
+    op.create_index("ix_properties_id", "properties", ["id"])
+    op.create_index("ix_properties_name", "properties", ["name"], unique=True)
+
+    for table_name in ("counters", "payments"):
+        with op.batch_alter_table(table_name) as batch_op:
+            batch_op.add_column(sa.Column("property_id", sa.Integer(), nullable=True))
+            batch_op.create_index(f"ix_{table_name}_property_id", ["property_id"])
+            batch_op.create_foreign_key(
+                f"fk_{table_name}_property_id_properties",
+                "properties",
+                ["property_id"],
+                ["id"],
+            )
+
+    # Привязываем существующие данные к объекту по умолчанию
+    bind = op.get_bind()
+    has_data = bind.execute(sa.text(
+        "SELECT EXISTS (SELECT 1 FROM counters) OR EXISTS (SELECT 1 FROM payments)"
+    )).scalar()
+    if has_data:
+        properties = sa.table(
+            "properties",
+            sa.column("id", sa.Integer),
+            sa.column("name", sa.String),
+            sa.column("created_at", sa.DateTime),
+        )
+        bind.execute(properties.insert().values(name=DEFAULT_PROPERTY_NAME, created_at=datetime.utcnow()))
+        property_id = bind.execute(
+            sa.select(properties.c.id).where(properties.c.name == DEFAULT_PROPERTY_NAME)
+        ).scalar()
+        for table_name in ("counters", "payments"):
+            bind.execute(
+                sa.text(f"UPDATE {table_name} SET property_id = :property_id"),
+                {"property_id": property_id},
+            )
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    for table_name in ("payments", "counters"):
+        with op.batch_alter_table(table_name) as batch_op:
+            batch_op.drop_constraint(f"fk_{table_name}_property_id_properties", type_="foreignkey")
+            batch_op.drop_index(f"ix_{table_name}_property_id")
+            batch_op.drop_column("property_id")
+
+    op.drop_index("ix_properties_name", table_name="properties")
+    op.drop_index("ix_properties_id", table_name="properties")
+    op.drop_table("properties")
@@ -0,0 +1,97 @@
+"""Таблица помесячного потребления counter_monthly_usage
+
+Revision ID: 0004
+Revises: 0003
+Create Date: 2026-10-16 00:00:00
+
+Таблица заполняется по существующим показаниям. Дополнительно
+добавляется индекс readings (reading_date, id) для выборок показаний
+всех счетчиков за диапазон дат.
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = "0004"
+down_revision: Union[str, Sequence[str], None] = "0003"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+BATCH_SIZE = 10000
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    usage = op.create_table(
+        "counter_monthly_usage",
+        sa.Column("counter_id", sa.Integer(), nullable=False),
+        sa.Column("year", sa.Integer(), nullable=False),
+        sa.Column("month", sa.Integer(), nullable=False),
+        sa.Column("first_value", sa.Integer(), nullable=False),
+        sa.Column("first_date", sa.DateTime(), nullable=False),
+        sa.Column("last_value", sa.Integer(), nullable=False),
+        sa.Column("last_date", sa.DateTime(), nullable=False),
+        sa.Column("readings_count", sa.Integer(), nullable=False),
+        sa.Column("consumption", sa.Integer(), nullable=False),
+        sa.ForeignKeyConstraint(["counter_id"], ["counters.id"]),
+        sa.PrimaryKeyConstraint("counter_id", "year", "month"),
+    )
+    op.create_index("ix_readings_date_id", "readings", ["reading_date", "id"])
+
+    # Заполняем таблицу по существующим показаниям
+    readings = sa.table(
+        "readings",
+        sa.column("id", sa.Integer),
+        sa.column("counter_id", sa.Integer),
+        sa.column("value", sa.Integer),
+        sa.column("reading_date", sa.DateTime),
+    )
+    bind = op.get_bind()
+    result = bind.execute(
+        sa.select(readings.c.counter_id, readings.c.value, readings.c.reading_date)
+        .order_by(readings.c.counter_id, readings.c.reading_date, readings.c.id)
+    )
+
+    batch = []
+    current = None
+    previous_last = None
+    for counter_id, value, reading_date in result:
+        key = (counter_id, reading_date.year, reading_date.month)
+        if current is not None and (current["counter_id"], current["year"], current["month"]) == key:
+            current["last_value"] = value
+            current["last_date"] = reading_date
+            current["readings_count"] += 1
+            continue
+        if current is not None:
+            base = previous_last if previous_last is not None else current["first_value"]
+            current["consumption"] = current["last_value"] - base
+            batch.append(current)
+            previous_last = current["last_value"] if current["counter_id"] == counter_id else None
+            if len(batch) >= BATCH_SIZE:
+                bind.execute(usage.insert(), batch)
+                batch = []
+        current = {
+            "counter_id": counter_id,
+            "year": reading_date.year,
+            "month": reading_date.month,
+            "first_value": value,
+            "first_date": reading_date,
+            "last_value": value,
+            "last_date": reading_date,
+            "readings_count": 1,
+        }
+    if current is not None:
+        base = previous_last if previous_last is not None else current["first_value"]
+        current["consumption"] = current["last_value"] - base
+        batch.append(current)
+    if batch:
+        bind.execute(usage.insert(), batch)
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_index("ix_readings_date_id", table_name="readings")
+    op.drop_table("counter_monthly_usage")
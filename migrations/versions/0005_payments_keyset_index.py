@@ -0,0 +1,34 @@
+"""Индекс payments (calculated_at, id) для курсорной пагинации
+
+Revision ID: 0005
+Revises: 0004
+Create Date: 2026-10-16 00:00:00
+
+Страницы истории платежей выбираются по курсору (calculated_at, id)
+без OFFSET; индекс по readings (reading_date, id) добавлен в 0004.
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = "0005"
+down_revision: Union[str, Sequence[str], None] = "0004"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.create_index(
+        "ix_payments_calculated_id",
+        "payments",
+        ["calculated_at", "id"],
+    )
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_index("ix_payments_calculated_id", table_name="payments")
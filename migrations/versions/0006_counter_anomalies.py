@@ -0,0 +1,66 @@
+"""Статистика расхода счетчиков и оповещения об аномалиях
+
+Revision ID: 0006
+Revises: 0005
+Create Date: 2026-10-16 00:00:00
+
+counter_stats хранит состояние потокового детектора аномалий,
+counter_alerts - найденные аномалии. Таблицы создаются пустыми:
+статистика накапливается с новых показаний, по истории ее можно
+пересчитать командой `python main.py alerts rebuild`.
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = "0006"
+down_revision: Union[str, Sequence[str], None] = "0005"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.create_table(
+        "counter_stats",
+        sa.Column("counter_id", sa.Integer(), nullable=False),
+        sa.Column("last_value", sa.Integer(), nullable=False),
+        sa.Column("last_date", sa.DateTime(), nullable=False),
+        sa.Column("samples", sa.Integer(), nullable=False),
+        sa.Column("mean", sa.Float(), nullable=False),
+        sa.Column("m2", sa.Float(), nullable=False),
+        sa.Column("leak_streak", sa.Integer(), nullable=False),
+        sa.Column("stall_days", sa.Float(), nullable=False),
+        sa.ForeignKeyConstraint(["counter_id"], ["counters.id"]),
+        sa.PrimaryKeyConstraint("counter_id"),
+    )
+    op.create_table(
+        "counter_alerts",
+        sa.Column("id", sa.Integer(), nullable=False),
+        sa.Column("counter_id", sa.Integer(), nullable=False),
+        sa.Column("kind", sa.String(length=20), nullable=False),
+        sa.Column("reading_date", sa.DateTime(), nullable=False),
+        sa.Column("value", sa.Integer(), nullable=False),
+        sa.Column("daily_usage", sa.Float(), nullable=True),
+        sa.Column("baseline", sa.Float(), nullable=True),
+        sa.Column("message", sa.Text(), nullable=False),
+        sa.Column("acknowledged", sa.Boolean(), nullable=False),
+        sa.Column("created_at", sa.DateTime(), nullable=True),
+        sa.ForeignKeyConstraint(["counter_id"], ["counters.id"]),
+        sa.PrimaryKeyConstraint("id"),
+    )
+    op.create_index("ix_counter_alerts_id", "counter_alerts", ["id"])
+    op.create_index("ix_counter_alerts_counter_date", "counter_alerts", ["counter_id", "reading_date"])
+    op.create_index("ix_counter_alerts_date_id", "counter_alerts", ["reading_date", "id"])
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_index("ix_counter_alerts_date_id", table_name="counter_alerts")
+    op.drop_index("ix_counter_alerts_counter_date", table_name="counter_alerts")
+    op.drop_index("ix_counter_alerts_id", table_name="counter_alerts")
+    op.drop_table("counter_alerts")
+    op.drop_table("counter_stats")
@@ -0,0 +1,52 @@
+"""Снимок последних показаний счетчиков
+
+Revision ID: 0007
+Revises: 0006
+Create Date: 2026-10-16 00:00:00
+
+counter_latest_readings хранит последнее показание каждого счетчика,
+чтобы экраны ввода и списка счетчиков получали их одним запросом.
+Таблица заполняется по существующим показаниям.
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = "0007"
+down_revision: Union[str, Sequence[str], None] = "0006"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.create_table(
+        "counter_latest_readings",
+        sa.Column("counter_id", sa.Integer(), nullable=False),
+        sa.Column("value", sa.Integer(), nullable=False),
+        sa.Column("reading_date", sa.DateTime(), nullable=False),
+        sa.ForeignKeyConstraint(["counter_id"], ["counters.id"]),
+        sa.PrimaryKeyConstraint("counter_id"),
+    )
+    op.execute(
+        """
+        INSERT INTO counter_latest_readings (counter_id, value, reading_date)
+        SELECT counter_id, value, reading_date
+        FROM (
+            SELECT counter_id, value, reading_date,
+                   ROW_NUMBER() OVER (
+                       PARTITION BY counter_id ORDER BY reading_date DESC, id DESC
+                   ) AS rn
+            FROM readings
+        ) AS ranked
+        WHERE rn = 1
+        """
+    )
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_table("counter_latest_readings")
@@ -0,0 +1,96 @@
+"""Уникальный ключ платежа (property_id, period_start, period_end)
+
+Revision ID: 0008
+Revises: 0007
+Create Date: 2026-10-16 00:00:00
+
+Платежи сохраняются пакетно с перезаписью по ключу объекта и периода.
+Повторные платежи за один период не удаляются: более ранние (с меньшим
+id) переносятся в payments_replaced с id оставшегося платежа в
+replaced_by, в payments остается последний сохраненный. Платежам без
+объекта уникальность периода задает частичный индекс.
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = "0008"
+down_revision: Union[str, Sequence[str], None] = "0007"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+PAYMENT_COLUMNS = (
+    "id", "property_id", "period_start", "period_end", "total_amount",
+    "cold_water_consumption", "cold_water_amount", "hot_water_consumption", "hot_water_amount",
+    "wastewater_consumption", "wastewater_amount", "calculated_at", "notes",
+)
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.create_table(
+        "payments_replaced",
+        sa.Column("id", sa.Integer(), autoincrement=False, nullable=False),
+        sa.Column("replaced_by", sa.Integer(), nullable=False),
+        sa.Column("property_id", sa.Integer(), nullable=True),
+        sa.Column("period_start", sa.DateTime(), nullable=False),
+        sa.Column("period_end", sa.DateTime(), nullable=False),
+        sa.Column("total_amount", sa.Float(), nullable=False),
+        sa.Column("cold_water_consumption", sa.Integer(), nullable=False),
+        sa.Column("cold_water_amount", sa.Float(), nullable=False),
+        sa.Column("hot_water_consumption", sa.Integer(), nullable=False),
+        sa.Column("hot_water_amount", sa.Float(), nullable=False),
+        sa.Column("wastewater_consumption", sa.Integer(), nullable=False),
+        sa.Column("wastewater_amount", sa.Float(), nullable=False),
+        sa.Column("calculated_at", sa.DateTime(), nullable=True),
+        sa.Column("notes", sa.Text(), nullable=True),
+        sa.ForeignKeyConstraint(["property_id"], ["properties.id"]),
+        sa.PrimaryKeyConstraint("id"),
+    )
+    # GROUP BY объединяет и платежи без объекта (property_id IS NULL)
+    columns = ", ".join(PAYMENT_COLUMNS)
+    source = ", ".join(f"payments.{column}" for column in PAYMENT_COLUMNS)
+    op.execute(
+        f"""
+        INSERT INTO payments_replaced (replaced_by, {columns})
+        SELECT kept.id, {source}
+        FROM payments
+        JOIN (
+            SELECT MAX(id) AS id, property_id, period_start, period_end
+            FROM payments
+            GROUP BY property_id, period_start, period_end
+        ) AS kept
+          ON kept.property_id IS NOT DISTINCT FROM payments.property_id
+         AND kept.period_start = payments.period_start
+         AND kept.period_end = payments.period_end
+        WHERE payments.id <> kept.id
+        """
+    )
+    op.execute("DELETE FROM payments WHERE id IN (SELECT id FROM payments_replaced)")
+    op.create_index(
+        "ix_payments_property_period",
+        "payments",
+        ["property_id", "period_start", "period_end"],
+        unique=True,
+    )
+    op.create_index(
+        "ix_payments_unassigned_period",
+        "payments",
+        ["period_start", "period_end"],
+        unique=True,
+        sqlite_where=sa.text("property_id IS NULL"),
+        postgresql_where=sa.text("property_id IS NULL"),
+    )
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_index("ix_payments_unassigned_period", table_name="payments")
+    op.drop_index("ix_payments_property_period", table_name="payments")
+    columns = ", ".join(PAYMENT_COLUMNS)
+    op.execute(f"INSERT INTO payments ({columns}) SELECT {columns} FROM payments_replaced")
+    op.drop_table("payments_replaced")
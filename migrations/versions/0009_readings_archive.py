@@ -0,0 +1,55 @@
+"""Архив старых показаний
+
+Revision ID: 0009
+Revises: 0008
+Create Date: 2026-10-16 00:00:00
+
+readings_archive хранит показания, перенесенные из readings старше
+горизонта хранения; строки сохраняют исходные id. При откате показания
+возвращаются в readings.
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = "0009"
+down_revision: Union[str, Sequence[str], None] = "0008"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.create_table(
+        "readings_archive",
+        sa.Column("id", sa.Integer(), autoincrement=False, nullable=False),
+        sa.Column("counter_id", sa.Integer(), nullable=False),
+        sa.Column("value", sa.Integer(), nullable=False),
+        sa.Column("reading_date", sa.DateTime(), nullable=False),
+        sa.Column("created_at", sa.DateTime(), nullable=True),
+        sa.ForeignKeyConstraint(["counter_id"], ["counters.id"]),
+        sa.PrimaryKeyConstraint("id"),
+    )
+    op.create_index(
+        "ix_readings_archive_counter_date", "readings_archive", ["counter_id", "reading_date"]
+    )
+    op.create_index(
+        "ix_readings_archive_date_id", "readings_archive", ["reading_date", "id"]
+    )
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.execute(
+        """
+        INSERT INTO readings (id, counter_id, value, reading_date, created_at)
+        SELECT id, counter_id, value, reading_date, created_at
+        FROM readings_archive
+        """
+    )
+    op.drop_index("ix_readings_archive_date_id", table_name="readings_archive")
+    op.drop_index("ix_readings_archive_counter_date", table_name="readings_archive")
+    op.drop_table("readings_archive")
@@ -1,18 +1,32 @@
-from sqlalchemy import create_engine
 from sqlalchemy.ext.declarative import declarative_base
 from sqlalchemy.orm import sessionmaker
+from .storage import load_storage_profile, create_storage_engine, engine_options, apply_pragmas
 
-# Создаем движок для SQLite
-SQLALCHEMY_DATABASE_URL = "sqlite:///./water_counter.db"
+# Профиль хранения задается переменными окружения (см. models/storage.py)
+storage_profile = load_storage_profile()
+SQLALCHEMY_DATABASE_URL = storage_profile.database_url
 
-engine = create_engine(
-    SQLALCHEMY_DATABASE_URL, 
-    connect_args={"check_same_thread": False}
-)
+# Создаем движок с настройками профиля
+engine = create_storage_engine(storage_profile)
 
 # Создаем фабрику сессий
 SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
 
+# Асинхронный движок создается при первом обращении (нужен aiosqlite)
+ASYNC_DATABASE_URL = SQLALCHEMY_DATABASE_URL.replace("sqlite://", "sqlite+aiosqlite://", 1)
+_async_session_factory = None
+
+def get_async_session_factory():
+    """Фабрика асинхронных сессий"""
+    global _async_session_factory
+    if _async_session_factory is None:
+        from sqlalchemy.ext.asyncio import create_async_engine, async_sessionmaker
+        async_engine = create_async_engine(ASYNC_DATABASE_URL, **engine_options(storage_profile))
+        apply_pragmas(async_engine.sync_engine, storage_profile)
+        # Объекты остаются доступны после коммита без повторной загрузки
+        _async_session_factory = async_sessionmaker(async_engine, autoflush=False, expire_on_commit=False)
+    return _async_session_factory
+
 # Базовый класс для моделей
 Base = declarative_base()
 
@@ -23,3 +37,8 @@ def get_db():
         yield db
     finally:
         db.close()
+
+async def get_async_db():
+    """Получение асинхронной сессии базы данных"""
+    async with get_async_session_factory()() as db:
+        yield db
@@ -1,8 +1,21 @@
-from sqlalchemy import Column, Integer, String, Float, DateTime, ForeignKey, Text
+from sqlalchemy import Column, Integer, String, Float, DateTime, ForeignKey, Text, Index, Boolean, text
 from sqlalchemy.orm import relationship
 from datetime import datetime
 from .database import Base
 
+class Property(Base):
+    """Модель объекта недвижимости (квартиры)"""
+    __tablename__ = "properties"
+    
+    id = Column(Integer, primary_key=True, index=True)
+    name = Column(String(100), unique=True, index=True, nullable=False)
+    address = Column(Text, nullable=True)
+    created_at = Column(DateTime, default=datetime.utcnow)
+    
+    # Связи со счетчиками и платежами
+    counters = relationship("Counter", back_populates="property")
+    payments = relationship("Payment", back_populates="property")
+
 class Counter(Base):
     """Модель счетчика воды"""
     __tablename__ = "counters"
@@ -11,10 +24,12 @@ class Counter(Base):
     number = Column(String(50), unique=True, index=True, nullable=False)
     water_type = Column(String(20), nullable=False)  # "hot" или "cold"
     description = Column(Text, nullable=True)
+    property_id = Column(Integer, ForeignKey("properties.id"), nullable=True, index=True)
     created_at = Column(DateTime, default=datetime.utcnow)
     
     # Связь с показаниями
     readings = relationship("Reading", back_populates="counter")
+    property = relationship("Property", back_populates="counters")
 
 class Reading(Base):
     """Модель показаний счетчика"""
@@ -28,6 +43,99 @@ class Reading(Base):
     
     # Связь со счетчиком
     counter = relationship("Counter", back_populates="readings")
+    
+    __table_args__ = (
+        Index("ix_readings_counter_date", "counter_id", "reading_date"),
+        Index("ix_readings_date_id", "reading_date", "id"),
+    )
+
+class ReadingArchive(Base):
+    """Архив старых показаний, перенесенных из readings
+    
+    Строки сохраняют id из readings, поэтому порядок (reading_date, id)
+    при чтении обоих уровней совпадает с исходным.
+    """
+    __tablename__ = "readings_archive"
+    
+    id = Column(Integer, primary_key=True, autoincrement=False)
+    counter_id = Column(Integer, ForeignKey("counters.id"), nullable=False)
+    value = Column(Integer, nullable=False)
+    reading_date = Column(DateTime, nullable=False)
+    created_at = Column(DateTime, nullable=True)
+    
+    __table_args__ = (
+        Index("ix_readings_archive_counter_date", "counter_id", "reading_date"),
+        Index("ix_readings_archive_date_id", "reading_date", "id"),
+    )
+
+class CounterMonthlyUsage(Base):
+    """Потребление счетчика за месяц, обновляется при вставке показаний
+    
+    consumption - разница между последним показанием месяца и последним
+    показанием предыдущего месяца с данными (если его нет - первым
+    показанием месяца). Может быть отрицательным при ошибочных данных.
+    """
+    __tablename__ = "counter_monthly_usage"
+    
+    counter_id = Column(Integer, ForeignKey("counters.id"), primary_key=True)
+    year = Column(Integer, primary_key=True)
+    month = Column(Integer, primary_key=True)
+    first_value = Column(Integer, nullable=False)
+    first_date = Column(DateTime, nullable=False)
+    last_value = Column(Integer, nullable=False)
+    last_date = Column(DateTime, nullable=False)
+    readings_count = Column(Integer, nullable=False)
+    consumption = Column(Integer, nullable=False)
+
+class CounterLatestReading(Base):
+    """Последнее показание счетчика, обновляется при вставке показаний
+    
+    Последним считается показание с наибольшей датой, при равных датах -
+    вставленное позже. Показания задним числом снимок не меняют.
+    """
+    __tablename__ = "counter_latest_readings"
+    
+    counter_id = Column(Integer, ForeignKey("counters.id"), primary_key=True)
+    value = Column(Integer, nullable=False)
+    reading_date = Column(DateTime, nullable=False)
+
+class CounterStats(Base):
+    """Скользящая статистика суточного расхода счетчика для поиска аномалий
+    
+    Среднее и дисперсия считаются методом Уэлфорда (mean, m2 по samples
+    интервалам между показаниями) и обновляются при каждой вставке без
+    пересчета истории.
+    """
+    __tablename__ = "counter_stats"
+    
+    counter_id = Column(Integer, ForeignKey("counters.id"), primary_key=True)
+    last_value = Column(Integer, nullable=False)
+    last_date = Column(DateTime, nullable=False)
+    samples = Column(Integer, nullable=False, default=0)
+    mean = Column(Float, nullable=False, default=0.0)  # м³ в сутки
+    m2 = Column(Float, nullable=False, default=0.0)
+    leak_streak = Column(Integer, nullable=False, default=0)  # Интервалов подряд выше нормы
+    stall_days = Column(Float, nullable=False, default=0.0)  # Суток подряд без расхода
+
+class CounterAlert(Base):
+    """Оповещение об аномалии показаний: утечка, скачок, простой, откат"""
+    __tablename__ = "counter_alerts"
+    
+    id = Column(Integer, primary_key=True, index=True)
+    counter_id = Column(Integer, ForeignKey("counters.id"), nullable=False)
+    kind = Column(String(20), nullable=False)  # "leak", "spike", "stall", "regression"
+    reading_date = Column(DateTime, nullable=False)
+    value = Column(Integer, nullable=False)
+    daily_usage = Column(Float, nullable=True)  # Расход интервала, м³ в сутки
+    baseline = Column(Float, nullable=True)  # Средний расход до показания
+    message = Column(Text, nullable=False)
+    acknowledged = Column(Boolean, nullable=False, default=False)
+    created_at = Column(DateTime, default=datetime.utcnow)
+    
+    __table_args__ = (
+        Index("ix_counter_alerts_counter_date", "counter_id", "reading_date"),
+        Index("ix_counter_alerts_date_id", "reading_date", "id"),
+    )
 
 class Tariff(Base):
     """Модель тарифа на воду"""
@@ -39,12 +147,17 @@ class Tariff(Base):
     start_date = Column(DateTime, nullable=False)
     end_date = Column(DateTime, nullable=True)  # None означает действующий тариф
     created_at = Column(DateTime, default=datetime.utcnow)
+    
+    __table_args__ = (
+        Index("ix_tariffs_service_period", "service_type", "start_date", "end_date"),
+    )
 
 class Payment(Base):
     """Модель платежа"""
     __tablename__ = "payments"
     
     id = Column(Integer, primary_key=True, index=True)
+    property_id = Column(Integer, ForeignKey("properties.id"), nullable=True, index=True)
     period_start = Column(DateTime, nullable=False)
     period_end = Column(DateTime, nullable=False)
     total_amount = Column(Float, nullable=False)
@@ -63,3 +176,51 @@ class Payment(Base):
     
     calculated_at = Column(DateTime, default=datetime.utcnow)
     notes = Column(Text, nullable=True)
+    
+    # Связь с объектом недвижимости
+    property = relationship("Property", back_populates="payments")
+    
+    __table_args__ = (
+        # Покрывающий индекс для сводок по периодам
+        Index(
+            "ix_payments_period_covering",
+            "period_start", "period_end", "total_amount",
+            "hot_water_consumption", "cold_water_consumption"
+        ),
+        # Курсорная пагинация истории платежей
+        Index("ix_payments_calculated_id", "calculated_at", "id"),
+        # Один платеж объекта за период, ключ пакетного сохранения
+        Index("ix_payments_property_period", "property_id", "period_start", "period_end", unique=True),
+        # NULL в уникальном индексе не совпадают, платежи без объекта - отдельным индексом.
+        # Условие для PostgreSQL задает миграция 0008: postgresql_where здесь
+        # загружал бы диалект PostgreSQL при каждом запуске
+        Index(
+            "ix_payments_unassigned_period",
+            "period_start", "period_end",
+            unique=True,
+            sqlite_where=text("property_id IS NULL"),
+        ),
+    )
+
+class ReplacedPayment(Base):
+    """Платеж, замененный более поздним за тот же объект и период
+    
+    Заполняется миграцией 0008: повторные платежи до введения
+    уникального ключа не удаляются, а переносятся сюда с исходными id.
+    """
+    __tablename__ = "payments_replaced"
+    
+    id = Column(Integer, primary_key=True, autoincrement=False)
+    replaced_by = Column(Integer, nullable=False)  # ID оставшегося платежа
+    property_id = Column(Integer, ForeignKey("properties.id"), nullable=True)
+    period_start = Column(DateTime, nullable=False)
+    period_end = Column(DateTime, nullable=False)
+    total_amount = Column(Float, nullable=False)
+    cold_water_consumption = Column(Integer, nullable=False)
+    cold_water_amount = Column(Float, nullable=False)
+    hot_water_consumption = Column(Integer, nullable=False)
+    hot_water_amount = Column(Float, nullable=False)
+    wastewater_consumption = Column(Integer, nullable=False)
+    wastewater_amount = Column(Float, nullable=False)
+    calculated_at = Column(DateTime, nullable=True)
+    notes = Column(Text, nullable=True)
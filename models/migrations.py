@@ -0,0 +1,73 @@
+import os
+from typing import Optional, Set
+from sqlalchemy import text
+from sqlalchemy.engine import Engine
+from sqlalchemy.exc import DBAPIError
+
+# Корень проекта, где лежат alembic.ini и каталог migrations
+BASE_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+# Последняя ревизия в migrations/versions; обновляется вместе с каждой новой
+# миграцией. Если база уже на этой ревизии, Alembic при запуске не загружается.
+SCHEMA_REVISION = "0009"
+
+class SchemaRevisionError(RuntimeError):
+    """Ревизия схемы базы неизвестна этой версии приложения"""
+
+def get_alembic_config():
+    """Конфигурация Alembic с путями относительно корня проекта"""
+    from alembic.config import Config
+    
+    config = Config(os.path.join(BASE_DIR, "alembic.ini"))
+    config.set_main_option("script_location", os.path.join(BASE_DIR, "migrations"))
+    return config
+
+def get_head_revision() -> str:
+    """Головная ревизия по файлам миграций"""
+    from alembic.script import ScriptDirectory
+    
+    return ScriptDirectory.from_config(get_alembic_config()).get_current_head()
+
+def get_known_revisions() -> Set[str]:
+    """Все ревизии по файлам миграций"""
+    from alembic.script import ScriptDirectory
+    
+    script = ScriptDirectory.from_config(get_alembic_config())
+    return {revision.revision for revision in script.walk_revisions()}
+
+def get_schema_revision(engine: Engine) -> Optional[str]:
+    """Ревизия схемы, записанная в базе (None - база не размечена)"""
+    try:
+        with engine.connect() as connection:
+            return connection.execute(text("SELECT version_num FROM alembic_version")).scalar()
+    except DBAPIError:
+        return None
+
+def upgrade_database(engine: Engine, revision: str = "head") -> None:
+    """Применение миграций к базе данных"""
+    from alembic import command
+    
+    config = get_alembic_config()
+    with engine.begin() as connection:
+        config.attributes["connection"] = connection
+        command.upgrade(config, revision)
+
+def ensure_schema(engine: Engine) -> bool:
+    """Обновление схемы, если она отстает от SCHEMA_REVISION
+    
+    Возвращает True, если миграции запускались. Для актуальной базы
+    выполняется один запрос к alembic_version. База с ревизией, которой
+    нет среди миграций (обновлена более новой версией приложения),
+    не обновляется: SchemaRevisionError.
+    """
+    revision = get_schema_revision(engine)
+    if revision == SCHEMA_REVISION:
+        return False
+    if revision is not None and revision not in get_known_revisions():
+        raise SchemaRevisionError(
+            f"Ревизия схемы базы {revision} неизвестна этой версии приложения "
+            f"(последняя известная - {SCHEMA_REVISION}); база обновлена более новой версией, "
+            f"обновите приложение"
+        )
+    upgrade_database(engine)
+    return True
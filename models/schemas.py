@@ -2,11 +2,28 @@ from pydantic import BaseModel, Field, validator
 from datetime import datetime
 from typing import Optional, List
 
+class PropertyBase(BaseModel):
+    """Базовая схема объекта недвижимости"""
+    name: str = Field(..., min_length=1, max_length=100)
+    address: Optional[str] = None
+
+class PropertyCreate(PropertyBase):
+    """Схема для создания объекта недвижимости"""
+    pass
+
+class Property(PropertyBase):
+    """Схема объекта недвижимости с ID"""
+    id: int
+    created_at: datetime
+    
+    model_config = {"from_attributes": True}
+
 class CounterBase(BaseModel):
     """Базовая схема счетчика"""
     number: str = Field(..., min_length=1, max_length=50)
     water_type: str = Field(..., pattern="^(hot|cold)$")
     description: Optional[str] = None
+    property_id: Optional[int] = None
 
 class CounterCreate(CounterBase):
     """Схема для создания счетчика"""
@@ -56,6 +73,7 @@ class Tariff(TariffBase):
 
 class PaymentBase(BaseModel):
     """Базовая схема платежа"""
+    property_id: Optional[int] = None
     period_start: datetime
     period_end: datetime
     total_amount: float = Field(..., ge=0)
@@ -93,6 +111,7 @@ class MonthlyReadings(BaseModel):
 
 class PaymentCalculation(BaseModel):
     """Схема для расчета платежа"""
+    property_id: Optional[int] = None
     period_start: datetime
     period_end: datetime
     hot_water_consumption: int = Field(..., ge=0)
@@ -102,3 +121,81 @@ class PaymentCalculation(BaseModel):
     cold_water_rate: float = Field(..., gt=0)
     wastewater_rate: float = Field(..., gt=0)
     total_amount: float = Field(..., ge=0)
+
+class CounterConsumption(BaseModel):
+    """Схема потребления по одному счетчику за период"""
+    counter_id: int
+    number: str
+    water_type: str
+    property_id: Optional[int] = None
+    start_value: Optional[int] = None
+    end_value: Optional[int] = None
+    consumption: int = 0
+
+class ConsumptionAnomaly(BaseModel):
+    """Схема аномалии показаний счетчика"""
+    counter_id: int
+    number: str
+    kind: str = Field(..., pattern="^(insufficient_data|negative_delta)$")
+    message: str
+
+class MonthlyConsumption(BaseModel):
+    """Схема потребления за месяц по всем счетчикам"""
+    period_start: datetime
+    period_end: datetime
+    property_id: Optional[int] = None  # None - все счетчики базы
+    hot: int = 0
+    cold: int = 0
+    counters: List[CounterConsumption] = []
+    anomalies: List[ConsumptionAnomaly] = []
+
+class RejectedReading(BaseModel):
+    """Отклоненное показание из пакета с причиной"""
+    index: int  # Позиция показания в пакете
+    counter_id: int
+    message: str
+
+class BulkReadingReport(BaseModel):
+    """Отчет о пакетной загрузке показаний
+    
+    Все показания пакета, не попавшие в rejected_rows, приняты.
+    """
+    accepted: int = 0
+    rejected: int = 0
+    rejected_rows: List[RejectedReading] = []
+
+class ImportReport(BaseModel):
+    """Отчет об импорте показаний из файла"""
+    source: str
+    processed: int = 0  # Строк обработано в этом запуске
+    accepted: int = 0
+    rejected: int = 0
+    skipped: int = 0  # Уже сохраненные строки повторенной порции
+    chunks: int = 0
+    resumed_from_line: int = 0  # 0 - импорт начат с начала файла
+    errors: List[str] = []  # Первые ошибки (не больше MAX_IMPORT_ERRORS)
+
+class ExportReport(BaseModel):
+    """Отчет об экспорте данных в файл"""
+    dataset: str
+    format: str
+    path: str
+    rows: int = 0
+    elapsed_seconds: float = 0.0
+
+class ArchiveReport(BaseModel):
+    """Отчет о переносе старых показаний в архив"""
+    before: datetime
+    archived: int = 0
+    batches: int = 0
+    elapsed_seconds: float = 0.0
+
+class BatchBillingResult(BaseModel):
+    """Результат расчета платежей по всем объектам за месяц"""
+    period_start: datetime
+    period_end: datetime
+    calculations: List[PaymentCalculation] = []
+    anomalies: List[ConsumptionAnomaly] = []
+    properties_count: int = 0
+    elapsed_seconds: float = 0.0
+    properties_per_second: float = 0.0
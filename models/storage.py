@@ -0,0 +1,140 @@
+"""Профили хранения: URL базы, режим журнала SQLite, PRAGMA и пул соединений
+
+Профиль выбирается переменными окружения:
+    WATER_COUNTER_PROFILE  - имя пресета (default, interactive, bulk-import,
+                             read-heavy-reporting)
+    WATER_COUNTER_CONFIG   - путь к JSON-файлу с полями StorageProfile,
+                             поле "profile" задает базовый пресет
+    WATER_COUNTER_DB_URL   - URL базы данных (перекрывает остальные)
+"""
+import json
+import os
+from dataclasses import dataclass, fields, replace
+from typing import Dict, Optional
+from sqlalchemy import create_engine, event
+from sqlalchemy.engine import Engine
+
+DEFAULT_DATABASE_URL = "sqlite:///./water_counter.db"
+
+@dataclass(frozen=True)
+class StorageProfile:
+    """Настройки хранения; None означает значение SQLite по умолчанию"""
+    name: str = "default"
+    database_url: str = DEFAULT_DATABASE_URL
+    journal_mode: Optional[str] = None  # WAL, DELETE, TRUNCATE...
+    synchronous: Optional[str] = None  # OFF, NORMAL, FULL
+    cache_size: Optional[int] = None  # >0 - страницы, <0 - размер в КиБ
+    mmap_size: Optional[int] = None  # байты
+    temp_store: Optional[str] = None  # DEFAULT, FILE, MEMORY
+    busy_timeout: Optional[int] = None  # миллисекунды
+    pool_size: Optional[int] = None
+    max_overflow: Optional[int] = None
+    
+    def pragmas(self) -> Dict[str, object]:
+        """PRAGMA, которые нужно выполнить при открытии соединения"""
+        values = {
+            "journal_mode": self.journal_mode,
+            "synchronous": self.synchronous,
+            "cache_size": self.cache_size,
+            "mmap_size": self.mmap_size,
+            "temp_store": self.temp_store,
+            "busy_timeout": self.busy_timeout,
+        }
+        return {name: value for name, value in values.items() if value is not None}
+
+PRESETS: Dict[str, StorageProfile] = {
+    # Поведение SQLite по умолчанию
+    "default": StorageProfile(),
+    # Консольная работа: WAL, читатели не блокируют писателя
+    "interactive": StorageProfile(
+        name="interactive",
+        journal_mode="WAL",
+        synchronous="NORMAL",
+        cache_size=-16000,
+        temp_store="MEMORY",
+        busy_timeout=5000,
+    ),
+    # Массовая загрузка: без fsync на каждый коммит, большой кэш
+    "bulk-import": StorageProfile(
+        name="bulk-import",
+        journal_mode="WAL",
+        synchronous="OFF",
+        cache_size=-200000,
+        mmap_size=268435456,
+        temp_store="MEMORY",
+        busy_timeout=30000,
+    ),
+    # Отчеты: большой кэш и mmap, несколько соединений для чтения
+    "read-heavy-reporting": StorageProfile(
+        name="read-heavy-reporting",
+        journal_mode="WAL",
+        synchronous="NORMAL",
+        cache_size=-64000,
+        mmap_size=1073741824,
+        temp_store="MEMORY",
+        busy_timeout=10000,
+        pool_size=10,
+        max_overflow=10,
+    ),
+}
+
+def get_preset(name: str) -> StorageProfile:
+    """Пресет профиля по имени"""
+    if name not in PRESETS:
+        raise ValueError(f"Неизвестный профиль хранения: {name}. Доступны: {', '.join(PRESETS)}")
+    return PRESETS[name]
+
+def load_storage_profile(environ: Optional[Dict[str, str]] = None) -> StorageProfile:
+    """Профиль хранения из переменных окружения и файла конфигурации"""
+    environ = os.environ if environ is None else environ
+    profile = get_preset(environ.get("WATER_COUNTER_PROFILE", "default"))
+    
+    config_path = environ.get("WATER_COUNTER_CONFIG")
+    if config_path:
+        with open(config_path, encoding="utf-8") as f:
+            config = json.load(f)
+        if "profile" in config:
+            profile = get_preset(config.pop("profile"))
+        known = {field.name for field in fields(StorageProfile)}
+        unknown = set(config) - known
+        if unknown:
+            raise ValueError(f"Неизвестные параметры профиля: {', '.join(sorted(unknown))}")
+        profile = replace(profile, **config)
+    
+    if environ.get("WATER_COUNTER_DB_URL"):
+        profile = replace(profile, database_url=environ["WATER_COUNTER_DB_URL"])
+    return profile
+
+def is_sqlite(url: str) -> bool:
+    """Является ли URL адресом SQLite"""
+    return url.startswith("sqlite")
+
+def apply_pragmas(engine: Engine, profile: StorageProfile):
+    """Выполнение PRAGMA профиля на каждом новом соединении SQLite"""
+    pragmas = profile.pragmas()
+    if not pragmas or not is_sqlite(str(engine.url)):
+        return
+    
+    @event.listens_for(engine, "connect")
+    def set_sqlite_pragmas(dbapi_connection, connection_record):
+        cursor = dbapi_connection.cursor()
+        for name, value in pragmas.items():
+            cursor.execute(f"PRAGMA {name}={value}")
+        cursor.close()
+
+def engine_options(profile: StorageProfile) -> Dict:
+    """Параметры create_engine для профиля"""
+    options = {}
+    if is_sqlite(profile.database_url):
+        options["connect_args"] = {"check_same_thread": False}
+    if profile.pool_size is not None:
+        options["pool_size"] = profile.pool_size
+    if profile.max_overflow is not None:
+        options["max_overflow"] = profile.max_overflow
+    return options
+
+def create_storage_engine(profile: StorageProfile) -> Engine:
+    """Движок SQLAlchemy, настроенный по профилю"""
+    engine = create_engine(profile.database_url, **engine_options(profile))
+    apply_pragmas(engine, profile)
+    return engine
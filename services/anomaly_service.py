@@ -0,0 +1,288 @@
+"""Потоковый поиск утечек и аномалий показаний
+
+Для каждого счетчика хранится состояние (counter_stats): последнее
+показание и статистика суточного расхода по интервалам между
+показаниями (среднее и дисперсия методом Уэлфорда). Новое показание
+обновляет состояние за O(1), история не перечитывается.
+
+Аномалии:
+    leak       - LEAK_INTERVALS интервалов подряд расход выше нормы
+                 (среднее + LEAK_SIGMA отклонений)
+    spike      - первый интервал с расходом выше среднего + SPIKE_SIGMA
+                 отклонений
+    stall      - STALL_DAYS суток подряд без расхода при ненулевой норме
+    regression - показание меньше предыдущего
+"""
+import math
+from dataclasses import dataclass
+from datetime import datetime
+from typing import Dict, Iterable, List, Optional, Tuple
+from sqlalchemy import select, delete, insert, update, bindparam
+from sqlalchemy.orm import Session
+from models.entities import CounterStats, CounterAlert, Reading
+from . import queries
+from .pagination import Page, Cursor, DEFAULT_PAGE_SIZE, build_page, alert_key
+
+ALERT_KINDS = ("leak", "spike", "stall", "regression")
+
+MIN_SAMPLES = 10  # Интервалов до появления нормы
+MIN_INTERVAL_DAYS = 1.0  # Более короткие интервалы копятся до следующего показания
+MIN_STD = 0.05  # Нижняя граница отклонения, м³ в сутки
+LEAK_SIGMA = 2.0
+LEAK_INTERVALS = 3
+SPIKE_SIGMA = 4.0
+SPIKE_RATIO = 2.0  # Скачок еще и во столько раз выше среднего
+STALL_DAYS = 30.0
+
+# Подсказка для баз, обновленных до ревизии 0006 с накопленной историей:
+# миграция создает counter_stats пустой, и детектор начинает с нуля
+REBUILD_HINT = (
+    "Статистика детектора аномалий пуста, хотя показания есть: "
+    "пересчитайте ее по истории командой python main.py alerts rebuild"
+)
+
+# Поля состояния, которые сохраняются в counter_stats
+STATE_FIELDS = ("last_value", "last_date", "samples", "mean", "m2", "leak_streak", "stall_days")
+
+@dataclass
+class DetectorState:
+    """Состояние детектора одного счетчика"""
+    counter_id: int
+    last_value: Optional[int] = None
+    last_date: Optional[datetime] = None
+    samples: int = 0
+    mean: float = 0.0
+    m2: float = 0.0
+    leak_streak: int = 0
+    stall_days: float = 0.0
+    
+    @property
+    def std(self) -> float:
+        """Стандартное отклонение суточного расхода (не меньше MIN_STD)"""
+        variance = self.m2 / (self.samples - 1) if self.samples > 1 else 0.0
+        return max(math.sqrt(variance), MIN_STD)
+    
+    def _add_sample(self, daily_usage: float):
+        """Шаг Уэлфорда"""
+        self.samples += 1
+        delta = daily_usage - self.mean
+        self.mean += delta / self.samples
+        self.m2 += delta * (daily_usage - self.mean)
+    
+    def observe(self, value: int, reading_date: datetime) -> List[Dict]:
+        """Учет показания, возвращает найденные аномалии
+        
+        Показания раньше последнего учтенного пропускаются: статистика
+        строится по потоку в порядке дат.
+        """
+        if self.last_date is None:
+            self.last_value, self.last_date = value, reading_date
+            return []
+        if reading_date < self.last_date:
+            return []
+        
+        delta = value - self.last_value
+        if delta < 0:
+            alert = self._alert("regression", value, reading_date, None,
+                                f"Показание {value} меньше предыдущего {self.last_value}")
+            self.last_value, self.last_date = value, reading_date
+            self.leak_streak = 0
+            self.stall_days = 0.0
+            return [alert]
+        
+        days = (reading_date - self.last_date).total_seconds() / 86400
+        if days < MIN_INTERVAL_DAYS:
+            return []
+        daily_usage = delta / days
+        alerts = []
+        baseline_ready = self.samples >= MIN_SAMPLES
+        
+        if delta == 0:
+            previous_stall = self.stall_days
+            self.stall_days += days
+            if baseline_ready and self.mean > 0 and previous_stall < STALL_DAYS <= self.stall_days:
+                alerts.append(self._alert(
+                    "stall", value, reading_date, daily_usage,
+                    f"Нет расхода {self.stall_days:.0f} сут. при норме {self.mean:.2f} м³/сут"
+                ))
+        else:
+            self.stall_days = 0.0
+        
+        is_spike = False
+        if baseline_ready:
+            std = self.std
+            if daily_usage > self.mean + LEAK_SIGMA * std:
+                self.leak_streak += 1
+            else:
+                self.leak_streak = 0
+            
+            # Скачок - только первый интервал выше нормы; если расход остается
+            # высоким, это утечка, и норма дальше сдвигается вместе с ним
+            is_spike = (
+                self.leak_streak == 1
+                and daily_usage > self.mean + SPIKE_SIGMA * std
+                and daily_usage >= self.mean * SPIKE_RATIO
+            )
+            if is_spike:
+                alerts.append(self._alert(
+                    "spike", value, reading_date, daily_usage,
+                    f"Скачок расхода: {daily_usage:.2f} м³/сут при норме {self.mean:.2f} м³/сут"
+                ))
+            if self.leak_streak == LEAK_INTERVALS:
+                alerts.append(self._alert(
+                    "leak", value, reading_date, daily_usage,
+                    f"Возможная утечка: расход выше нормы {self.mean:.2f} м³/сут "
+                    f"{LEAK_INTERVALS} интервала подряд ({daily_usage:.2f} м³/сут)"
+                ))
+        
+        # Разовый скачок не входит в норму, чтобы выброс ее не сдвигал
+        if not is_spike:
+            self._add_sample(daily_usage)
+        self.last_value, self.last_date = value, reading_date
+        return alerts
+    
+    def _alert(self, kind: str, value: int, reading_date: datetime,
+               daily_usage: Optional[float], message: str) -> Dict:
+        return {
+            "counter_id": self.counter_id,
+            "kind": kind,
+            "reading_date": reading_date,
+            "value": value,
+            "daily_usage": daily_usage,
+            "baseline": self.mean if self.samples else None,
+            "message": message,
+            "acknowledged": False,
+            "created_at": datetime.utcnow(),
+        }
+    
+    def as_row(self) -> Dict:
+        return {"counter_id": self.counter_id, **{field: getattr(self, field) for field in STATE_FIELDS}}
+
+class AnomalyService:
+    """Сервис потокового поиска аномалий показаний"""
+    
+    def __init__(self, db: Session):
+        self.db = db
+    
+    def apply_readings(self, readings: List[Dict]) -> int:
+        """Учет новых показаний (без коммита, в транзакции вставки)
+        
+        Загружает состояние только счетчиков пакета, возвращает число
+        найденных аномалий.
+        """
+        if not readings:
+            return 0
+        
+        table = CounterStats.__table__
+        counter_ids = {reading["counter_id"] for reading in readings}
+        states = {
+            row["counter_id"]: DetectorState(**row)
+            for row in self.db.execute(select(table).where(table.c.counter_id.in_(counter_ids))).mappings()
+        }
+        existing = set(states)
+        
+        alerts = []
+        # Внутри пакета показания счетчика учитываются в порядке дат
+        for reading in sorted(readings, key=lambda reading: reading["reading_date"]):
+            counter_id = reading["counter_id"]
+            state = states.get(counter_id)
+            if state is None:
+                state = states[counter_id] = DetectorState(counter_id)
+            alerts.extend(state.observe(reading["value"], reading["reading_date"]))
+        
+        self._save_states(states, existing)
+        if alerts:
+            self.db.execute(insert(CounterAlert.__table__), alerts)
+        return len(alerts)
+    
+    def _save_states(self, states: Dict[int, DetectorState], existing: Iterable[int]):
+        """Запись состояний: новые вставляются, существующие обновляются"""
+        existing = set(existing)
+        table = CounterStats.__table__
+        new_rows = [state.as_row() for counter_id, state in states.items() if counter_id not in existing]
+        changed_rows = [
+            dict({field: getattr(state, field) for field in STATE_FIELDS}, b_counter_id=counter_id)
+            for counter_id, state in states.items() if counter_id in existing
+        ]
+        if new_rows:
+            self.db.execute(insert(table), new_rows)
+        if changed_rows:
+            self.db.execute(
+                update(table)
+                .where(table.c.counter_id == bindparam("b_counter_id"))
+                .values({field: bindparam(field) for field in STATE_FIELDS}),
+                changed_rows
+            )
+    
+    def needs_rebuild(self) -> bool:
+        """Показания есть, а состояния детектора нет (см. REBUILD_HINT)"""
+        return (
+            self.db.scalar(select(CounterStats.counter_id).limit(1)) is None
+            and self.db.scalar(select(Reading.id).limit(1)) is not None
+        )
+    
+    def rebuild(self, record_alerts: bool = False, batch_size: int = 10000) -> Tuple[int, int]:
+        """Пересчет состояния всех счетчиков по истории показаний
+        
+        Возвращает (число счетчиков, число найденных аномалий). Аномалии
+        истории записываются, только если record_alerts: прежние
+        оповещения при этом удаляются в той же транзакции, а отметка о
+        просмотре переносится на найденное заново оповещение с тем же
+        счетчиком, датой и видом.
+        """
+        acknowledged = set()
+        if record_alerts:
+            alerts_table = CounterAlert.__table__
+            acknowledged = {
+                tuple(row) for row in self.db.execute(
+                    select(alerts_table.c.counter_id, alerts_table.c.reading_date, alerts_table.c.kind)
+                    .where(alerts_table.c.acknowledged)
+                )
+            }
+            self.db.execute(delete(alerts_table))
+        self.db.execute(delete(CounterStats))
+        history = queries.reading_history()
+        readings = self.db.execute(
+            select(history.c.counter_id, history.c.value, history.c.reading_date)
+            .order_by(history.c.counter_id, history.c.reading_date, history.c.id)
+            .execution_options(yield_per=batch_size)
+        )
+        
+        states: Dict[int, DetectorState] = {}
+        alerts_found = 0
+        alerts = []
+        state = None
+        for counter_id, value, reading_date in readings:
+            if state is None or state.counter_id != counter_id:
+                state = states[counter_id] = DetectorState(counter_id)
+            found = state.observe(value, reading_date)
+            alerts_found += len(found)
+            if record_alerts:
+                for alert in found:
+                    alert["acknowledged"] = (alert["counter_id"], alert["reading_date"], alert["kind"]) in acknowledged
+                alerts.extend(found)
+                if len(alerts) >= batch_size:
+                    self.db.execute(insert(CounterAlert.__table__), alerts)
+                    alerts = []
+        
+        if alerts:
+            self.db.execute(insert(CounterAlert.__table__), alerts)
+        self._save_states(states, ())
+        self.db.commit()
+        return len(states), alerts_found
+    
+    def get_alerts_page(self, counter_id: Optional[int] = None, kind: Optional[str] = None,
+                        cursor: Optional[Cursor] = None,
+                        limit: int = DEFAULT_PAGE_SIZE) -> Page[CounterAlert]:
+        """Страница оповещений, новые первыми"""
+        rows = list(self.db.scalars(queries.alerts_page(counter_id, kind, cursor, limit)))
+        return build_page(rows, limit, alert_key)
+    
+    def acknowledge_alert(self, alert_id: int) -> bool:
+        """Отметка оповещения как просмотренного"""
+        alert = self.db.get(CounterAlert, alert_id)
+        if alert is None:
+            return False
+        alert.acknowledged = True
+        self.db.commit()
+        return True
@@ -0,0 +1,107 @@
+"""Перенос старых показаний в архив
+
+Показания старше горизонта хранения переносятся из readings в
+readings_archive порциями, каждая порция - отдельная транзакция
+(вставка в архив и удаление из readings). В оперативной таблице
+остается последнее показание каждого счетчика за каждый месяц: по нему
+считается потребление месяца и следующего за ним, поэтому расчеты
+периодов и проверка новых показаний не обращаются к архиву.
+
+История, страницы показаний, экспорт и пересчеты читают оба уровня
+через queries.reading_history().
+"""
+import time
+from array import array
+from datetime import datetime
+from typing import Optional
+from sqlalchemy import select, insert, delete, func, desc, extract
+from sqlalchemy.orm import Session
+from models.entities import Reading, ReadingArchive
+from models.schemas import ArchiveReport
+
+DEFAULT_HORIZON_MONTHS = 24
+DEFAULT_BATCH_SIZE = 10000
+
+def horizon_start(months: int, today: Optional[datetime] = None) -> datetime:
+    """Начало месяца, отстоящего на months месяцев от текущего"""
+    if months < 1:
+        raise ValueError("Горизонт хранения должен быть не меньше месяца")
+    today = today or datetime.now()
+    index = today.year * 12 + today.month - 1 - months
+    return datetime(index // 12, index % 12 + 1, 1)
+
+class ReadingArchiveService:
+    """Сервис архивации показаний"""
+    
+    def __init__(self, db: Session, batch_size: int = DEFAULT_BATCH_SIZE):
+        self.db = db
+        self.batch_size = batch_size
+    
+    def archive_candidates(self, before: datetime) -> array:
+        """ID показаний раньше before, которые можно перенести в архив
+        
+        Не переносятся последние показания счетчиков за месяц и показание с
+        наибольшим id: SQLite выдает новые id после наибольшего в таблице,
+        и без него id архивных строк могли бы повториться.
+        """
+        ranked = select(
+            Reading.id,
+            func.row_number().over(
+                partition_by=(
+                    Reading.counter_id,
+                    extract("year", Reading.reading_date),
+                    extract("month", Reading.reading_date),
+                ),
+                order_by=(desc(Reading.reading_date), desc(Reading.id))
+            ).label("rn"),
+        ).where(Reading.reading_date < before).subquery()
+        
+        max_id = select(func.max(Reading.id)).scalar_subquery()
+        query = (
+            select(ranked.c.id)
+            .where(ranked.c.rn > 1, ranked.c.id < max_id)
+            .order_by(ranked.c.id)
+            .execution_options(yield_per=self.batch_size)
+        )
+        
+        ids = array("q")
+        for partition in self.db.connection().execute(query).partitions():
+            ids.extend(reading_id for reading_id, in partition)
+        return ids
+    
+    def archive(self, before: datetime) -> ArchiveReport:
+        """Перенос показаний раньше before в архив порциями
+        
+        Прерванная архивация оставляет согласованные данные: каждая порция
+        переносится целиком, повторный запуск продолжает с оставшихся.
+        """
+        started = time.perf_counter()
+        ids = self.archive_candidates(before)
+        self.db.commit()
+        
+        readings = Reading.__table__
+        columns = [column.name for column in ReadingArchive.__table__.columns]
+        report = ArchiveReport(before=before)
+        for offset in range(0, len(ids), self.batch_size):
+            batch = ids[offset:offset + self.batch_size].tolist()
+            self.db.execute(
+                insert(ReadingArchive.__table__).from_select(
+                    columns,
+                    select(*(readings.c[name] for name in columns)).where(readings.c.id.in_(batch))
+                )
+            )
+            self.db.execute(delete(readings).where(readings.c.id.in_(batch)))
+            self.db.commit()
+            report.archived += len(batch)
+            report.batches += 1
+        
+        report.elapsed_seconds = round(time.perf_counter() - started, 3)
+        return report
+    
+    def archive_older_than(self, months: int = DEFAULT_HORIZON_MONTHS) -> ArchiveReport:
+        """Архивация показаний старше горизонта в месяцах (по целым месяцам)"""
+        return self.archive(horizon_start(months))
+    
+    def get_archived_count(self) -> int:
+        """Число показаний в архиве"""
+        return self.db.scalar(select(func.count()).select_from(ReadingArchive))
@@ -0,0 +1,207 @@
+"""Асинхронные сервисы поверх AsyncSession
+
+Простые выборки выполняются напрямую через общие запросы из queries.
+Операции с бизнес-логикой (валидация, пересчет потребления, расчет
+платежей) выполняются синхронными сервисами внутри AsyncSession.run_sync,
+поэтому логика не дублируется и не расходится между слоями.
+"""
+from datetime import datetime
+from typing import Dict, List, Optional, Sequence, Tuple
+from sqlalchemy.ext.asyncio import AsyncSession
+from models.entities import Counter, Reading, Payment, Tariff
+from models.schemas import (
+    CounterCreate, ReadingCreate, BulkReadingReport, MonthlyConsumption,
+    PaymentCalculation, BatchBillingResult
+)
+from . import queries
+from .pagination import Page, Cursor, DEFAULT_PAGE_SIZE, build_page, reading_key, payment_key
+from .counter_service import CounterService
+from .reading_service import ReadingService
+from .payment_service import PaymentService, PaymentTotals
+
+class AsyncCounterService:
+    """Асинхронный сервис для работы со счетчиками"""
+    
+    def __init__(self, db: AsyncSession):
+        self.db = db
+    
+    async def _run(self, method: str, *args):
+        """Вызов метода синхронного сервиса внутри сессии"""
+        return await self.db.run_sync(lambda session: getattr(CounterService(session), method)(*args))
+    
+    async def create_counter(self, counter: CounterCreate) -> Counter:
+        """Создание нового счетчика"""
+        return await self._run("create_counter", counter)
+    
+    async def get_counter(self, counter_id: int) -> Optional[Counter]:
+        """Получение счетчика по ID"""
+        return (await self.db.scalars(queries.counter_by_id(counter_id))).first()
+    
+    async def get_counter_by_number(self, number: str) -> Optional[Counter]:
+        """Получение счетчика по номеру"""
+        return (await self.db.scalars(queries.counter_by_number(number))).first()
+    
+    async def get_all_counters(self) -> List[Counter]:
+        """Получение всех счетчиков"""
+        return list(await self.db.scalars(queries.all_counters()))
+    
+    async def get_counters_by_property(self, property_id: int) -> List[Counter]:
+        """Получение счетчиков объекта"""
+        return list(await self.db.scalars(queries.counters_by_property(property_id)))
+    
+    async def get_counters_by_type(self, water_type: str) -> List[Counter]:
+        """Получение счетчиков по типу воды"""
+        return list(await self.db.scalars(queries.counters_by_type(water_type)))
+    
+    async def update_counter(self, counter_id: int, counter: CounterCreate) -> Optional[Counter]:
+        """Обновление счетчика"""
+        return await self._run("update_counter", counter_id, counter)
+    
+    async def delete_counter(self, counter_id: int) -> bool:
+        """Удаление счетчика"""
+        return await self._run("delete_counter", counter_id)
+    
+    async def initialize_default_counters(self, property_id: Optional[int] = None) -> List[Counter]:
+        """Инициализация счетчиков по умолчанию"""
+        return await self._run("initialize_default_counters", property_id)
+
+class AsyncReadingService:
+    """Асинхронный сервис для работы с показаниями счетчиков"""
+    
+    def __init__(self, db: AsyncSession):
+        self.db = db
+    
+    async def _run(self, method: str, *args):
+        """Вызов метода синхронного сервиса внутри сессии"""
+        return await self.db.run_sync(lambda session: getattr(ReadingService(session), method)(*args))
+    
+    async def create_reading(self, reading: ReadingCreate) -> Reading:
+        """Создание нового показания"""
+        return await self._run("create_reading", reading)
+    
+    async def create_readings_bulk(self, readings: List[ReadingCreate]) -> BulkReadingReport:
+        """Пакетное создание показаний в одной транзакции"""
+        return await self._run("create_readings_bulk", readings)
+    
+    async def get_reading(self, reading_id: int) -> Optional[Reading]:
+        """Получение показания по ID"""
+        return (await self.db.scalars(queries.reading_by_id(reading_id))).first()
+    
+    async def get_readings_by_counter(self, counter_id: int, limit: int = 10) -> List[Reading]:
+        """Получение последних показаний для счетчика"""
+        return list(await self.db.scalars(queries.readings_by_counter(counter_id, limit)))
+    
+    async def get_readings_page(self, counter_id: Optional[int] = None, cursor: Optional[Cursor] = None,
+                                limit: int = DEFAULT_PAGE_SIZE) -> Page[Reading]:
+        """Страница показаний, новые первыми"""
+        rows = list(await self.db.scalars(queries.readings_page(counter_id, cursor, limit)))
+        return build_page(rows, limit, reading_key)
+    
+    async def get_latest_reading_by_counter(self, counter_id: int) -> Optional[Reading]:
+        """Получение последнего показания для счетчика"""
+        return (await self.db.scalars(queries.latest_reading_by_counter(counter_id))).first()
+    
+    async def get_readings_by_date_range(self, start_date: datetime, end_date: datetime) -> List[Reading]:
+        """Получение показаний за период"""
+        return list(await self.db.scalars(queries.readings_by_date_range(start_date, end_date)))
+    
+    async def get_latest_reading_by_date(self, counter_id: int, target_date: datetime) -> Optional[Reading]:
+        """Получение последнего показания до указанной даты"""
+        return (await self.db.scalars(queries.latest_reading_by_date(counter_id, target_date))).first()
+    
+    async def get_monthly_consumption(self, year: int, month: int,
+                                      property_id: Optional[int] = None) -> Dict[str, int]:
+        """Расчет потребления за месяц по типам воды"""
+        return await self._run("get_monthly_consumption", year, month, property_id)
+    
+    async def calculate_monthly_consumption(self, year: int, month: int,
+                                            property_id: Optional[int] = None) -> MonthlyConsumption:
+        """Расчет потребления за месяц по всем счетчикам"""
+        return await self._run("calculate_monthly_consumption", year, month, property_id)
+    
+    async def get_consumption_for_period(self, start_date: datetime, end_date: datetime) -> Dict[str, int]:
+        """Расчет потребления за период"""
+        return await self._run("get_consumption_for_period", start_date, end_date)
+    
+    async def validate_reading(self, counter_id: int, value: int, reading_date: datetime) -> Tuple[bool, str]:
+        """Валидация показания"""
+        latest = (await self.db.execute(queries.latest_values([counter_id]))).first()
+        
+        if latest is not None and latest.value is not None:
+            return ReadingService._check_reading(value, reading_date, latest.value, latest.reading_date)
+        
+        return True, "OK"
+
+class AsyncPaymentService:
+    """Асинхронный сервис для расчета платежей"""
+    
+    def __init__(self, db: AsyncSession):
+        self.db = db
+    
+    async def _run(self, method: str, *args):
+        """Вызов метода синхронного сервиса внутри сессии"""
+        return await self.db.run_sync(lambda session: getattr(PaymentService(session), method)(*args))
+    
+    async def get_current_tariff(self, service_type: str) -> Optional[Tariff]:
+        """Получение действующего тарифа для типа услуги"""
+        return (await self.db.scalars(queries.current_tariff(service_type))).first()
+    
+    async def create_tariff(self, service_type: str, price_per_cubic_meter: float, start_date: datetime) -> Tariff:
+        """Создание нового тарифа"""
+        return await self._run("create_tariff", service_type, price_per_cubic_meter, start_date)
+    
+    async def calculate_monthly_payment(self, year: int, month: int,
+                                        property_id: Optional[int] = None) -> PaymentCalculation:
+        """Расчет платежа за месяц"""
+        return await self._run("calculate_monthly_payment", year, month, property_id)
+    
+    async def calculate_all_properties(self, year: int, month: int) -> BatchBillingResult:
+        """Расчет платежей за месяц по всем объектам"""
+        return await self._run("calculate_all_properties", year, month)
+    
+    async def create_payment(self, calculation: PaymentCalculation, notes: str = None) -> Payment:
+        """Создание записи о платеже"""
+        return await self._run("create_payment", calculation, notes)
+    
+    async def save_payments(self, calculations: List[PaymentCalculation], notes: str = None) -> List[int]:
+        """Пакетное сохранение платежей с перезаписью по объекту и периоду"""
+        return await self._run("save_payments", calculations, notes)
+    
+    async def get_payment(self, payment_id: int) -> Optional[Payment]:
+        """Получение платежа по ID"""
+        return (await self.db.scalars(queries.payment_by_id(payment_id))).first()
+    
+    async def get_all_payments(self) -> List[Payment]:
+        """Получение всех платежей"""
+        return list(await self.db.scalars(queries.all_payments()))
+    
+    async def get_payments_page(self, cursor: Optional[Cursor] = None,
+                                limit: int = DEFAULT_PAGE_SIZE) -> Page[Payment]:
+        """Страница платежей, новые первыми"""
+        rows = list(await self.db.scalars(queries.payments_page(cursor, limit)))
+        return build_page(rows, limit, payment_key)
+    
+    async def get_payments_by_year(self, year: int) -> List[Payment]:
+        """Получение платежей за год"""
+        return list(await self.db.scalars(queries.payments_by_year(year)))
+    
+    async def get_payment_summary(self, year: int) -> Dict:
+        """Получение сводки платежей за год"""
+        return await self._run("get_payment_summary", year)
+    
+    async def get_payment_totals(self, group_by: Sequence[str] = ("year", "month"),
+                                 start_year: Optional[int] = None,
+                                 end_year: Optional[int] = None,
+                                 property_id: Optional[int] = None) -> List[PaymentTotals]:
+        """Агрегаты платежей с группировкой в SQL"""
+        return await self._run("get_payment_totals", group_by, start_year, end_year, property_id)
+    
+    async def get_yearly_rollup(self, start_year: Optional[int] = None,
+                                end_year: Optional[int] = None,
+                                by_property: bool = False) -> List[PaymentTotals]:
+        """Сводка по годам за несколько лет"""
+        return await self._run("get_yearly_rollup", start_year, end_year, by_property)
+    
+    async def initialize_default_tariffs(self) -> List[Tariff]:
+        """Инициализация тарифов по умолчанию"""
+        return await self._run("initialize_default_tariffs")
@@ -0,0 +1,126 @@
+from dataclasses import dataclass
+from datetime import datetime
+from typing import List, Optional, Sequence, Tuple
+import numpy as np
+from models.schemas import PaymentCalculation
+
+@dataclass
+class BillingArrays:
+    """Результат векторного расчета: матрицы (группы × периоды)"""
+    hot_consumption: np.ndarray
+    cold_consumption: np.ndarray
+    wastewater_consumption: np.ndarray
+    hot_amount: np.ndarray
+    cold_amount: np.ndarray
+    wastewater_amount: np.ndarray
+    total_amount: np.ndarray
+
+def compute_billing(consumption: np.ndarray,
+                    is_hot: np.ndarray,
+                    hot_rates: np.ndarray,
+                    cold_rates: np.ndarray,
+                    wastewater_rates: np.ndarray,
+                    groups: Optional[np.ndarray] = None,
+                    n_groups: Optional[int] = None) -> BillingArrays:
+    """Векторный расчет сумм для многих счетчиков и периодов за один вызов
+    
+    consumption - матрица потребления (счетчики × периоды), is_hot - признак
+    горячей воды для каждого счетчика, *_rates - цены по периодам.
+    Если заданы groups (номер группы 0..n_groups-1 для каждого счетчика),
+    потребление суммируется по группам (например, по объектам), иначе
+    каждый счетчик считается отдельной группой. Отрицательное потребление
+    считается нулевым, как и в ReadingService.
+    """
+    consumption = np.clip(np.asarray(consumption, dtype=np.int64), 0, None)
+    if consumption.ndim != 2:
+        raise ValueError("Матрица потребления должна быть двумерной (счетчики × периоды)")
+    
+    n_counters, n_periods = consumption.shape
+    is_hot = np.asarray(is_hot, dtype=bool)
+    if is_hot.shape != (n_counters,):
+        raise ValueError("is_hot должен содержать по одному значению на счетчик")
+    
+    rates = [np.asarray(r, dtype=np.float64) for r in (hot_rates, cold_rates, wastewater_rates)]
+    if any(r.shape != (n_periods,) for r in rates):
+        raise ValueError("Векторы цен должны содержать по одному значению на период")
+    hot_rates, cold_rates, wastewater_rates = rates
+    
+    hot = np.where(is_hot[:, None], consumption, 0)
+    cold = consumption - hot
+    
+    if groups is not None:
+        groups = np.asarray(groups, dtype=np.intp)
+        if groups.shape != (n_counters,):
+            raise ValueError("groups должен содержать по одному значению на счетчик")
+        if n_groups is None:
+            n_groups = int(groups.max()) + 1 if n_counters else 0
+        hot = sum_by_group(hot, groups, n_groups)
+        cold = sum_by_group(cold, groups, n_groups)
+    
+    wastewater = hot + cold
+    hot_amount = hot * hot_rates
+    cold_amount = cold * cold_rates
+    wastewater_amount = wastewater * wastewater_rates
+    
+    return BillingArrays(
+        hot_consumption=hot,
+        cold_consumption=cold,
+        wastewater_consumption=wastewater,
+        hot_amount=hot_amount,
+        cold_amount=cold_amount,
+        wastewater_amount=wastewater_amount,
+        total_amount=hot_amount + cold_amount + wastewater_amount
+    )
+
+def sum_by_group(matrix: np.ndarray, groups: np.ndarray, n_groups: int) -> np.ndarray:
+    """Сумма строк матрицы по группам 0..n_groups-1 (одна строка на группу)
+    
+    Общее ядро для сумм по объектам и группировок матрицы потребления.
+    """
+    order = np.argsort(groups, kind="stable")
+    sorted_groups = groups[order]
+    result = np.zeros((n_groups, matrix.shape[1]), dtype=matrix.dtype)
+    if not len(order):
+        return result
+    
+    # Начала блоков одинаковых групп в отсортированном порядке
+    starts = np.flatnonzero(np.r_[True, sorted_groups[1:] != sorted_groups[:-1]])
+    result[sorted_groups[starts]] = np.add.reduceat(matrix[order], starts, axis=0)
+    return result
+
+def build_payment_calculations(arrays: BillingArrays,
+                               periods: Sequence[Tuple[datetime, datetime]],
+                               hot_rates: Sequence[float],
+                               cold_rates: Sequence[float],
+                               wastewater_rates: Sequence[float],
+                               property_ids: Optional[Sequence[Optional[int]]] = None) -> List[PaymentCalculation]:
+    """Преобразование матриц в PaymentCalculation (по строкам, затем по периодам)"""
+    n_groups, n_periods = arrays.total_amount.shape
+    if len(periods) != n_periods:
+        raise ValueError("Число периодов не совпадает с размером матриц")
+    
+    hot = arrays.hot_consumption.tolist()
+    cold = arrays.cold_consumption.tolist()
+    wastewater = arrays.wastewater_consumption.tolist()
+    total = arrays.total_amount.tolist()
+    hot_rates, cold_rates, wastewater_rates = (
+        np.asarray(r, dtype=np.float64).tolist() for r in (hot_rates, cold_rates, wastewater_rates)
+    )
+    
+    calculations = []
+    for group in range(n_groups):
+        property_id = property_ids[group] if property_ids is not None else None
+        for period, (period_start, period_end) in enumerate(periods):
+            calculations.append(PaymentCalculation(
+                property_id=property_id,
+                period_start=period_start,
+                period_end=period_end,
+                hot_water_consumption=hot[group][period],
+                cold_water_consumption=cold[group][period],
+                wastewater_consumption=wastewater[group][period],
+                hot_water_rate=hot_rates[period],
+                cold_water_rate=cold_rates[period],
+                wastewater_rate=wastewater_rates[period],
+                total_amount=total[group][period]
+            ))
+    return calculations
@@ -0,0 +1,132 @@
+"""Матрица потребления счетчиков за много периодов
+
+Периоды задаются отсортированным списком границ: n + 1 граница дают
+n периодов [b0, b1], [b1, b2], ... Потребление счетчика за период, как
+в ReadingService.get_consumption_for_period, - разница показаний на
+концах периода (последних не позже границы); если одного из показаний
+нет или разница отрицательная, потребление нулевое.
+
+Показания на всех границах находятся за один упорядоченный проход по
+таблице показаний: указатель границы сдвигается вперед вместе с датой
+показания внутри каждого счетчика.
+"""
+from dataclasses import dataclass
+from datetime import datetime
+from typing import Dict, Iterable, List, Optional, Sequence, Tuple
+import numpy as np
+from .billing_kernel import sum_by_group
+from .timeseries import ReadingSeriesStore, to_timestamp
+
+# Допустимые группировки строк матрицы
+MATRIX_GROUPS = ("water_type", "property")
+
+@dataclass
+class ConsumptionMatrix:
+    """Потребление (строки × периоды) в м³
+    
+    keys - ключи строк: ID счетчиков, типы воды или ID объектов
+    (None - счетчики без объекта).
+    """
+    keys: List
+    periods: List[Tuple[datetime, datetime]]
+    values: np.ndarray
+    
+    def as_dict(self) -> Dict:
+        """Строки матрицы по ключам"""
+        return dict(zip(self.keys, self.values.tolist()))
+
+def check_boundaries(boundaries: Sequence[datetime]) -> List[datetime]:
+    """Проверка списка границ: минимум две, по возрастанию"""
+    boundaries = list(boundaries)
+    if len(boundaries) < 2:
+        raise ValueError("Нужно минимум две границы периодов")
+    if any(later <= earlier for earlier, later in zip(boundaries, boundaries[1:])):
+        raise ValueError("Границы периодов должны идти по возрастанию")
+    return boundaries
+
+def sweep_boundary_values(readings: Iterable[Tuple[int, datetime, int]],
+                          rows: Dict[int, int],
+                          boundaries: Sequence[datetime]) -> Tuple[np.ndarray, np.ndarray]:
+    """Показания счетчиков на границах за один проход
+    
+    readings - (counter_id, reading_date, value) в порядке
+    (counter_id, reading_date, id), rows - строка матрицы для каждого
+    счетчика. Возвращает значения и признак наличия показания
+    (счетчики × границы).
+    """
+    n_boundaries = len(boundaries)
+    values = np.zeros((len(rows), n_boundaries), dtype=np.int64)
+    known = np.zeros((len(rows), n_boundaries), dtype=bool)
+    
+    row = None
+    current = None
+    position = 0
+    last_value = None
+    for counter_id, reading_date, value in readings:
+        if counter_id != current:
+            if row is not None and last_value is not None:
+                values[row, position:] = last_value
+                known[row, position:] = True
+            current, row = counter_id, rows.get(counter_id)
+            position, last_value = 0, None
+        
+        # Все границы до даты показания закрываются предыдущим значением
+        while position < n_boundaries and reading_date > boundaries[position]:
+            if row is not None and last_value is not None:
+                values[row, position] = last_value
+                known[row, position] = True
+            position += 1
+        last_value = value
+    
+    if row is not None and last_value is not None:
+        values[row, position:] = last_value
+        known[row, position:] = True
+    return values, known
+
+def series_boundary_values(store: ReadingSeriesStore,
+                           rows: Dict[int, int],
+                           boundaries: Sequence[datetime]) -> Tuple[np.ndarray, np.ndarray]:
+    """Показания счетчиков на границах по хранилищу рядов (бинарным поиском)"""
+    stamps = np.array([to_timestamp(boundary) for boundary in boundaries], dtype=np.int64)
+    values = np.zeros((len(rows), len(boundaries)), dtype=np.int64)
+    known = np.zeros((len(rows), len(boundaries)), dtype=bool)
+    
+    for counter_id, row in rows.items():
+        series = store.get(counter_id)
+        if series is None:
+            continue
+        timestamps, series_values = series.slice()
+        positions = np.searchsorted(timestamps, stamps, side="right")
+        known[row] = positions > 0
+        values[row] = np.where(known[row], series_values[np.maximum(positions - 1, 0)], 0)
+    return values, known
+
+def boundary_consumption(values: np.ndarray, known: np.ndarray) -> np.ndarray:
+    """Потребление по периодам из показаний на границах"""
+    consumption = np.diff(values, axis=1)
+    valid = known[:, 1:] & known[:, :-1] & (consumption >= 0)
+    return np.where(valid, consumption, 0)
+
+def group_rows(matrix: np.ndarray, labels: Sequence) -> Tuple[List, np.ndarray]:
+    """Сумма строк матрицы по меткам, ключи по возрастанию (None последним)"""
+    keys = sorted(set(labels), key=lambda key: (key is None, key))
+    index = {key: position for position, key in enumerate(keys)}
+    groups = np.fromiter((index[label] for label in labels), dtype=np.intp, count=len(labels))
+    return keys, sum_by_group(matrix, groups, len(keys))
+
+def build_matrix(counters: Sequence[Tuple[int, str, Optional[int]]],
+                 values: np.ndarray, known: np.ndarray,
+                 boundaries: Sequence[datetime],
+                 group_by: Optional[str] = None) -> ConsumptionMatrix:
+    """Матрица потребления по строкам счетчиков или группам
+    
+    counters - (id, water_type, property_id) в порядке строк values.
+    """
+    consumption = boundary_consumption(values, known)
+    periods = list(zip(boundaries, boundaries[1:]))
+    if group_by is None:
+        return ConsumptionMatrix([counter[0] for counter in counters], periods, consumption)
+    
+    labels = [counter[1] if group_by == "water_type" else counter[2] for counter in counters]
+    keys, grouped = group_rows(consumption, labels)
+    return ConsumptionMatrix(keys, periods, grouped)
@@ -2,6 +2,7 @@ from sqlalchemy.orm import Session
 from typing import List, Optional
 from models.entities import Counter
 from models.schemas import CounterCreate, Counter as CounterSchema
+from . import queries
 
 class CounterService:
     """Сервис для работы со счетчиками"""
@@ -14,7 +15,8 @@ class CounterService:
         db_counter = Counter(
             number=counter.number,
             water_type=counter.water_type,
-            description=counter.description
+            description=counter.description,
+            property_id=counter.property_id
         )
         self.db.add(db_counter)
         self.db.commit()
@@ -23,19 +25,23 @@ class CounterService:
     
     def get_counter(self, counter_id: int) -> Optional[Counter]:
         """Получение счетчика по ID"""
-        return self.db.query(Counter).filter(Counter.id == counter_id).first()
+        return self.db.scalars(queries.counter_by_id(counter_id)).first()
     
     def get_counter_by_number(self, number: str) -> Optional[Counter]:
         """Получение счетчика по номеру"""
-        return self.db.query(Counter).filter(Counter.number == number).first()
+        return self.db.scalars(queries.counter_by_number(number)).first()
     
     def get_all_counters(self) -> List[Counter]:
         """Получение всех счетчиков"""
-        return self.db.query(Counter).all()
+        return list(self.db.scalars(queries.all_counters()))
+    
+    def get_counters_by_property(self, property_id: int) -> List[Counter]:
+        """Получение счетчиков объекта"""
+        return list(self.db.scalars(queries.counters_by_property(property_id)))
     
     def get_counters_by_type(self, water_type: str) -> List[Counter]:
         """Получение счетчиков по типу воды"""
-        return self.db.query(Counter).filter(Counter.water_type == water_type).all()
+        return list(self.db.scalars(queries.counters_by_type(water_type)))
     
     def update_counter(self, counter_id: int, counter: CounterCreate) -> Optional[Counter]:
         """Обновление счетчика"""
@@ -44,6 +50,8 @@ class CounterService:
             db_counter.number = counter.number
             db_counter.water_type = counter.water_type
             db_counter.description = counter.description
+            if counter.property_id is not None:
+                db_counter.property_id = counter.property_id
             self.db.commit()
             self.db.refresh(db_counter)
         return db_counter
@@ -57,13 +65,13 @@ class CounterService:
             return True
         return False
     
-    def initialize_default_counters(self) -> List[Counter]:
+    def initialize_default_counters(self, property_id: Optional[int] = None) -> List[Counter]:
         """Инициализация счетчиков по умолчанию (4 счетчика)"""
         default_counters = [
-            CounterCreate(number="ГВ-1", water_type="hot", description="Горячая вода счетчик 1"),
-            CounterCreate(number="ГВ-2", water_type="hot", description="Горячая вода счетчик 2"),
-            CounterCreate(number="ХВ-1", water_type="cold", description="Холодная вода счетчик 1"),
-            CounterCreate(number="ХВ-2", water_type="cold", description="Холодная вода счетчик 2"),
+            CounterCreate(number="ГВ-1", water_type="hot", description="Горячая вода счетчик 1", property_id=property_id),
+            CounterCreate(number="ГВ-2", water_type="hot", description="Горячая вода счетчик 2", property_id=property_id),
+            CounterCreate(number="ХВ-1", water_type="cold", description="Холодная вода счетчик 1", property_id=property_id),
+            CounterCreate(number="ХВ-2", water_type="cold", description="Холодная вода счетчик 2", property_id=property_id),
         ]
         
         created_counters = []
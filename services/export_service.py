@@ -0,0 +1,235 @@
+"""Потоковый экспорт показаний, платежей и тарифов
+
+Строки читаются из базы порциями (yield_per), каждая порция сразу
+записывается в файл, поэтому память не зависит от размера таблицы.
+Форматы: CSV, JSONL (с расширением .gz - со сжатием gzip) и Parquet
+(нужен пакет pyarrow).
+
+Запуск без интерфейса - подкоманда export (ui/cli.py):
+    python main.py export readings readings.csv --start 2024-01-01
+"""
+import csv
+import gzip
+import json
+import os
+import time
+from datetime import datetime, timedelta
+from typing import IO, Iterator, List, Optional, Sequence
+from sqlalchemy import Select, select, or_
+from sqlalchemy.orm import Session
+from models.entities import Counter, Payment, Tariff
+from models.schemas import ExportReport
+from .import_service import parse_reading_date
+from . import queries
+
+DATASETS = ("readings", "payments", "tariffs")
+EXPORT_FORMATS = ("csv", "jsonl", "parquet")
+DEFAULT_BATCH_SIZE = 10000
+PARQUET_COMPRESSION = "zstd"
+
+def _load_pyarrow():
+    """Импорт pyarrow при первом экспорте в Parquet (пакет необязательный)"""
+    try:
+        import pyarrow
+        import pyarrow.parquet
+    except ImportError:
+        raise ValueError("Для экспорта в Parquet установите пакет pyarrow")
+    return pyarrow, pyarrow.parquet
+
+def detect_export_format(path: str) -> str:
+    """Определение формата экспорта по расширению файла"""
+    name = path[:-3] if path.lower().endswith(".gz") else path
+    extension = os.path.splitext(name)[1].lower().lstrip(".")
+    if extension in ("json", "ndjson"):
+        extension = "jsonl"
+    if extension not in EXPORT_FORMATS:
+        raise ValueError(f"Неподдерживаемый формат экспорта: {path}")
+    return extension
+
+def _format_value(value):
+    """Значение ячейки для текстовых форматов"""
+    if isinstance(value, datetime):
+        return value.isoformat()
+    return value
+
+class ExportService:
+    """Сервис потокового экспорта данных"""
+    
+    def __init__(self, db: Session, batch_size: int = DEFAULT_BATCH_SIZE):
+        self.db = db
+        self.batch_size = batch_size
+    
+    def build_query(self, dataset: str,
+                    start_date: Optional[datetime] = None,
+                    end_date: Optional[datetime] = None,
+                    counter_id: Optional[int] = None,
+                    property_id: Optional[int] = None) -> Select:
+        """Запрос выгрузки набора данных с фильтрами
+        
+        Показания фильтруются по дате, счетчику и объекту, платежи - по
+        началу периода и объекту, тарифы - по пересечению срока действия
+        с периодом.
+        """
+        if dataset == "readings":
+            # Показания читаются из оперативной таблицы и архива
+            def where(c):
+                conditions = []
+                if start_date is not None:
+                    conditions.append(c.reading_date >= start_date)
+                if end_date is not None:
+                    conditions.append(c.reading_date <= end_date)
+                if counter_id is not None:
+                    conditions.append(c.counter_id == counter_id)
+                return conditions
+            
+            history = queries.reading_history(where)
+            query = select(
+                history.c.id,
+                history.c.counter_id,
+                Counter.number.label("counter_number"),
+                Counter.water_type,
+                Counter.property_id,
+                history.c.value,
+                history.c.reading_date,
+                history.c.created_at,
+            ).join(Counter, Counter.id == history.c.counter_id)
+            if property_id is not None:
+                query = query.where(Counter.property_id == property_id)
+            return query.order_by(history.c.reading_date, history.c.id)
+        
+        if counter_id is not None:
+            raise ValueError(f"Фильтр по счетчику не применим к набору {dataset}")
+        
+        if dataset == "payments":
+            query = select(*Payment.__table__.columns)
+            if start_date is not None:
+                query = query.where(Payment.period_start >= start_date)
+            if end_date is not None:
+                query = query.where(Payment.period_start <= end_date)
+            if property_id is not None:
+                query = query.where(Payment.property_id == property_id)
+            return query.order_by(Payment.period_start, Payment.id)
+        
+        if dataset == "tariffs":
+            if property_id is not None:
+                raise ValueError("Фильтр по объекту не применим к тарифам")
+            query = select(*Tariff.__table__.columns)
+            if start_date is not None:
+                query = query.where(or_(Tariff.end_date.is_(None), Tariff.end_date >= start_date))
+            if end_date is not None:
+                query = query.where(Tariff.start_date <= end_date)
+            return query.order_by(Tariff.service_type, Tariff.start_date)
+        
+        raise ValueError(f"Неизвестный набор данных: {dataset}. Доступны: {', '.join(DATASETS)}")
+    
+    def export(self, dataset: str, path: str, file_format: Optional[str] = None,
+               start_date: Optional[datetime] = None,
+               end_date: Optional[datetime] = None,
+               counter_id: Optional[int] = None,
+               property_id: Optional[int] = None) -> ExportReport:
+        """Экспорт набора данных в файл
+        
+        Файл пишется во временный <path>.part и переименовывается после
+        успешного завершения, поэтому прерванный экспорт не оставляет
+        неполного файла под итоговым именем.
+        """
+        file_format = file_format or detect_export_format(path)
+        if file_format not in EXPORT_FORMATS:
+            raise ValueError(f"Неподдерживаемый формат экспорта: {file_format}")
+        if file_format == "parquet":
+            _load_pyarrow()
+        
+        query = self.build_query(dataset, start_date, end_date, counter_id, property_id)
+        columns = [column.name for column in query.selected_columns]
+        started = time.perf_counter()
+        
+        result = self.db.execute(query.execution_options(yield_per=self.batch_size))
+        batches = result.partitions()
+        
+        temp_path = path + ".part"
+        try:
+            if file_format == "parquet":
+                rows = self._write_parquet(temp_path, query, batches)
+            else:
+                with self._open_text(temp_path, path) as target:
+                    if file_format == "csv":
+                        rows = self._write_csv(target, columns, batches)
+                    else:
+                        rows = self._write_jsonl(target, columns, batches)
+            os.replace(temp_path, path)
+        except BaseException:
+            if os.path.exists(temp_path):
+                os.remove(temp_path)
+            raise
+        finally:
+            result.close()
+        
+        return ExportReport(
+            dataset=dataset,
+            format=file_format,
+            path=path,
+            rows=rows,
+            elapsed_seconds=time.perf_counter() - started
+        )
+    
+    @staticmethod
+    def _open_text(temp_path: str, path: str) -> IO[str]:
+        """Открытие текстового файла, со сжатием gzip для *.gz"""
+        if path.lower().endswith(".gz"):
+            return gzip.open(temp_path, "wt", encoding="utf-8", newline="")
+        return open(temp_path, "w", encoding="utf-8", newline="")
+    
+    @staticmethod
+    def _write_csv(target: IO[str], columns: List[str], batches: Iterator[Sequence]) -> int:
+        """Запись порций в CSV с заголовком"""
+        writer = csv.writer(target)
+        writer.writerow(columns)
+        rows = 0
+        for batch in batches:
+            writer.writerows([_format_value(value) for value in row] for row in batch)
+            rows += len(batch)
+        return rows
+    
+    @staticmethod
+    def _write_jsonl(target: IO[str], columns: List[str], batches: Iterator[Sequence]) -> int:
+        """Запись порций в JSONL, по объекту на строку"""
+        rows = 0
+        for batch in batches:
+            target.writelines(
+                json.dumps(dict(zip(columns, map(_format_value, row))), ensure_ascii=False) + "\n"
+                for row in batch
+            )
+            rows += len(batch)
+        return rows
+    
+    @staticmethod
+    def _arrow_schema(query: Select):
+        """Схема Arrow по типам колонок запроса"""
+        pa, _ = _load_pyarrow()
+        types = {int: pa.int64(), float: pa.float64(), datetime: pa.timestamp("us"), str: pa.string()}
+        return pa.schema([
+            (column.name, types.get(column.type.python_type, pa.string()))
+            for column in query.selected_columns
+        ])
+    
+    def _write_parquet(self, path: str, query: Select, batches: Iterator[Sequence]) -> int:
+        """Запись порций в Parquet, по группе строк на порцию"""
+        pa, pq = _load_pyarrow()
+        schema = self._arrow_schema(query)
+        rows = 0
+        with pq.ParquetWriter(path, schema, compression=PARQUET_COMPRESSION) as writer:
+            for batch in batches:
+                arrays = [
+                    pa.array([row[index] for row in batch], type=field.type)
+                    for index, field in enumerate(schema)
+                ]
+                writer.write_table(pa.Table.from_arrays(arrays, schema=schema))
+                rows += len(batch)
+        return rows
+
+def parse_end_date(value: str) -> datetime:
+    """Конец периода: дата без времени включает весь день"""
+    moment = parse_reading_date(value)
+    if len(value.strip()) <= 10:
+        moment += timedelta(days=1) - timedelta(seconds=1)
+    return moment
@@ -0,0 +1,275 @@
+"""Прогноз потребления и платежей на будущий месяц
+
+Помесячное потребление каждого счетчика (counter_monthly_usage)
+описывается моделью тренд + годовая сезонность:
+
+    y(t) = a + b·t + c1·sin(ωm) + d1·cos(ωm) + c2·sin(2ωm) + d2·cos(2ωm)
+
+где t - время в годах, m - номер месяца, ω = 2π/12. Для каждого
+счетчика хранятся нормальные уравнения (X^T X и X^T y), коэффициенты
+всех счетчиков находятся одним пакетным решением систем p × p.
+Изменение месяца меняет суммы на разность вклада, поэтому новые
+показания учитываются без пересчета истории.
+
+Короткая история не дает оценить тренд и сезонность: при числе месяцев
+меньше MIN_TREND_MONTHS и MIN_SEASONAL_MONTHS эти члены отключаются
+штрафом, и прогноз сводится к среднему (или среднему с трендом).
+В модель входят только полные месяцы - до cutoff, по умолчанию до
+текущего месяца.
+"""
+from datetime import datetime
+from typing import Dict, Iterable, List, Optional, Sequence, Tuple
+import numpy as np
+from sqlalchemy import select, tuple_
+from sqlalchemy.orm import Session
+from models.entities import Counter, CounterMonthlyUsage, Property
+from models.schemas import PaymentCalculation
+from .billing_kernel import compute_billing, build_payment_calculations
+from .payment_service import PaymentService
+from .reading_service import ReadingService, get_month_period
+
+N_FEATURES = 6
+MIN_TREND_MONTHS = 6
+MIN_SEASONAL_MONTHS = 24  # Две полные сезонные волны
+RIDGE = 1.0  # Штраф коэффициентов тренда и сезонности
+INTERCEPT_RIDGE = 1e-6  # Счетчик без истории получает нулевой прогноз
+DISABLED_RIDGE = 1e9  # Штраф, отключающий член модели
+
+def month_index(year: int, month: int) -> int:
+    """Сквозной номер месяца"""
+    return year * 12 + month - 1
+
+def current_month_index(now: Optional[datetime] = None) -> int:
+    """Номер текущего (неполного) месяца"""
+    now = now or datetime.now()
+    return month_index(now.year, now.month)
+
+def design_matrix(periods: Sequence[int], origin: int) -> np.ndarray:
+    """Признаки модели для сквозных номеров месяцев (месяцы × N_FEATURES)"""
+    periods = np.asarray(periods, dtype=np.int64)
+    years = (periods - origin) / 12.0
+    angle = 2 * np.pi * np.mod(periods, 12) / 12.0
+    return np.column_stack([
+        np.ones(len(periods)), years,
+        np.sin(angle), np.cos(angle), np.sin(2 * angle), np.cos(2 * angle),
+    ])
+
+class ForecastModel:
+    """Нормальные уравнения модели всех счетчиков
+    
+    origin - месяц, от которого отсчитывается тренд, cutoff - первый
+    месяц, который в модель не входит. Строки xtx, xty и months
+    соответствуют counter_ids.
+    """
+    
+    def __init__(self, origin: int, cutoff: int):
+        self.origin = origin
+        self.cutoff = cutoff
+        self.counter_ids: List[int] = []
+        self.xtx = np.zeros((0, N_FEATURES, N_FEATURES))
+        self.xty = np.zeros((0, N_FEATURES))
+        self.months = np.zeros(0, dtype=np.int64)
+        self._positions: Dict[int, int] = {}
+        self._values: Dict[Tuple[int, int], float] = {}
+        self._coefficients: Optional[np.ndarray] = None
+    
+    def position(self, counter_id: int) -> Optional[int]:
+        """Строка счетчика в матрицах модели"""
+        return self._positions.get(counter_id)
+    
+    def _ensure_counters(self, counter_ids: Iterable[int]):
+        """Добавление строк для новых счетчиков"""
+        new_ids = [counter_id for counter_id in dict.fromkeys(counter_ids) if counter_id not in self._positions]
+        if not new_ids:
+            return
+        for counter_id in new_ids:
+            self._positions[counter_id] = len(self.counter_ids)
+            self.counter_ids.append(counter_id)
+        count = len(new_ids)
+        self.xtx = np.concatenate([self.xtx, np.zeros((count, N_FEATURES, N_FEATURES))])
+        self.xty = np.concatenate([self.xty, np.zeros((count, N_FEATURES))])
+        self.months = np.concatenate([self.months, np.zeros(count, dtype=np.int64)])
+    
+    def load(self, counter_ids: np.ndarray, periods: np.ndarray, values: np.ndarray):
+        """Пакетное добавление месяцев, которых еще нет в модели
+        
+        Вклады суммируются по счетчикам через сортировку и reduceat,
+        без цикла по строкам.
+        """
+        counter_ids = np.asarray(counter_ids, dtype=np.int64)
+        periods = np.asarray(periods, dtype=np.int64)
+        values = np.asarray(values, dtype=np.float64)
+        
+        # Отрицательное потребление - ошибочные данные, в модель не входит
+        valid = values >= 0
+        counter_ids, periods, values = counter_ids[valid], periods[valid], values[valid]
+        if not len(values):
+            return
+        
+        self._ensure_counters(counter_ids.tolist())
+        rows = np.fromiter((self._positions[counter_id] for counter_id in counter_ids.tolist()),
+                           dtype=np.intp, count=len(counter_ids))
+        features = design_matrix(periods, self.origin)
+        
+        order = np.argsort(rows, kind="stable")
+        rows, features, values = rows[order], features[order], values[order]
+        starts = np.flatnonzero(np.r_[True, rows[1:] != rows[:-1]])
+        targets = rows[starts]
+        
+        self.xtx[targets] += np.add.reduceat(features[:, :, None] * features[:, None, :], starts, axis=0)
+        self.xty[targets] += np.add.reduceat(features * values[:, None], starts, axis=0)
+        self.months[targets] += np.diff(np.r_[starts, len(rows)])
+        
+        self._values.update(zip(zip(counter_ids[order].tolist(), periods[order].tolist()), values.tolist()))
+        self._coefficients = None
+    
+    def observe(self, counter_id: int, period: int, value: Optional[float]):
+        """Новое или измененное потребление месяца
+        
+        Из сумм вычитается прежний вклад месяца и добавляется новый.
+        value None или отрицательное значение убирает месяц из модели.
+        """
+        self._ensure_counters([counter_id])
+        row = self._positions[counter_id]
+        features = design_matrix([period], self.origin)[0]
+        
+        previous = self._values.pop((counter_id, period), None)
+        if previous is not None:
+            self.xtx[row] -= np.outer(features, features)
+            self.xty[row] -= features * previous
+            self.months[row] -= 1
+        if value is not None and value >= 0:
+            self.xtx[row] += np.outer(features, features)
+            self.xty[row] += features * value
+            self.months[row] += 1
+            self._values[(counter_id, period)] = float(value)
+        self._coefficients = None
+    
+    def coefficients(self) -> np.ndarray:
+        """Коэффициенты всех счетчиков (счетчики × N_FEATURES)"""
+        if self._coefficients is None:
+            penalty = np.full((len(self.counter_ids), N_FEATURES), RIDGE)
+            penalty[:, 0] = INTERCEPT_RIDGE
+            penalty[self.months < MIN_TREND_MONTHS, 1] = DISABLED_RIDGE
+            penalty[self.months < MIN_SEASONAL_MONTHS, 2:] = DISABLED_RIDGE
+            
+            systems = self.xtx + penalty[:, :, None] * np.eye(N_FEATURES)
+            self._coefficients = np.linalg.solve(systems, self.xty[:, :, None])[:, :, 0]
+        return self._coefficients
+    
+    def predict(self, periods: Sequence[int]) -> np.ndarray:
+        """Прогноз потребления (счетчики × месяцы), не меньше нуля"""
+        forecast = self.coefficients() @ design_matrix(periods, self.origin).T
+        return np.clip(forecast, 0, None)
+
+class ForecastService:
+    """Прогноз потребления счетчиков и ожидаемых платежей
+    
+    Модель строится по таблице помесячного потребления одним запросом
+    и держится в памяти. Чтобы учитывать новые показания без пересборки,
+    сервис подключается к ReadingService через attach(). Если вставка
+    показаний откатывается, модель нужно построить заново через fit().
+    """
+    
+    def __init__(self, db: Session, payment_service: Optional[PaymentService] = None):
+        self.db = db
+        self.payment_service = payment_service or PaymentService(db)
+        self.model: Optional[ForecastModel] = None
+        self._fixed_cutoff = False
+    
+    def attach(self, reading_service: ReadingService):
+        """Учет показаний, записанных через reading_service"""
+        reading_service.usage_listeners.append(self.apply_usage)
+    
+    def fit(self, cutoff: Optional[Tuple[int, int]] = None) -> ForecastModel:
+        """Построение модели по полным месяцам до cutoff (год, месяц)
+        
+        Без cutoff модель строится до текущего месяца и сдвигается
+        вместе с ним при следующих прогнозах.
+        """
+        cutoff_index = month_index(*cutoff) if cutoff is not None else current_month_index()
+        model = ForecastModel(origin=cutoff_index, cutoff=cutoff_index)
+        self._load_months(model, None, cutoff_index)
+        self.model = model
+        self._fixed_cutoff = cutoff is not None
+        return model
+    
+    def _load_months(self, model: ForecastModel, start: Optional[int], end: int):
+        """Загрузка месяцев [start, end) одним запросом"""
+        query = select(
+            CounterMonthlyUsage.counter_id,
+            CounterMonthlyUsage.year,
+            CounterMonthlyUsage.month,
+            CounterMonthlyUsage.consumption,
+        ).where(tuple_(CounterMonthlyUsage.year, CounterMonthlyUsage.month) < divmod(end, 12))
+        if start is not None:
+            query = query.where(tuple_(CounterMonthlyUsage.year, CounterMonthlyUsage.month) >= divmod(start, 12))
+        
+        rows = self.db.execute(query).all()
+        if not rows:
+            return
+        counter_ids, years, months, values = (np.array(column) for column in zip(*rows))
+        model.load(counter_ids, years * 12 + months - 1, values)
+    
+    def _get_model(self) -> ForecastModel:
+        """Модель, построенная по всем полным месяцам"""
+        if self.model is None:
+            return self.fit()
+        if not self._fixed_cutoff:
+            cutoff = current_month_index()
+            if cutoff > self.model.cutoff:
+                # Начался новый месяц: дозагружаем завершившиеся месяцы
+                self._load_months(self.model, self.model.cutoff, cutoff)
+                self.model.cutoff = cutoff
+        return self.model
+    
+    def apply_usage(self, usage_rows: List[Dict]):
+        """Учет добавленных и измененных строк помесячного потребления"""
+        if self.model is None:
+            return
+        for usage in usage_rows:
+            period = month_index(usage["year"], usage["month"])
+            if period < self.model.cutoff:
+                self.model.observe(usage["counter_id"], period, usage["consumption"])
+    
+    def forecast_counters(self, year: int, month: int) -> Dict[int, int]:
+        """Прогноз потребления каждого счетчика за месяц, м³"""
+        model = self._get_model()
+        forecast = np.rint(model.predict([month_index(year, month)])[:, 0]).astype(np.int64)
+        return dict(zip(model.counter_ids, forecast.tolist()))
+    
+    def project_payments(self, year: int, month: int) -> List[PaymentCalculation]:
+        """Ожидаемые платежи всех объектов за месяц
+        
+        Прогноз счетчиков суммируется по объектам и считается по тарифам,
+        действующим в периоде, тем же векторным расчетом, что и платежи.
+        Счетчики без объекта не учитываются, как и в calculate_all_properties.
+        """
+        period_start, period_end = get_month_period(year, month)
+        model = self._get_model()
+        forecast = np.rint(model.predict([month_index(year, month)])[:, 0]).astype(np.int64)
+        
+        property_ids = [row[0] for row in self.db.execute(select(Property.id).order_by(Property.id))]
+        groups_by_property = {property_id: group for group, property_id in enumerate(property_ids)}
+        counters = self.db.execute(
+            select(Counter.id, Counter.water_type, Counter.property_id)
+            .where(Counter.property_id.is_not(None))
+            .order_by(Counter.id)
+        ).all()
+        
+        consumption, is_hot, groups = [], [], []
+        for counter_id, water_type, property_id in counters:
+            row = model.position(counter_id)
+            consumption.append(int(forecast[row]) if row is not None else 0)
+            is_hot.append(water_type == "hot")
+            groups.append(groups_by_property[property_id])
+        
+        rates = self.payment_service.get_rate_vectors([period_end])
+        arrays = compute_billing(
+            np.array(consumption, dtype=np.int64).reshape(-1, 1),
+            np.array(is_hot, dtype=bool),
+            *rates,
+            groups=np.array(groups, dtype=np.intp),
+            n_groups=len(property_ids)
+        )
+        return build_payment_calculations(arrays, [(period_start, period_end)], *rates, property_ids=property_ids)
@@ -0,0 +1,258 @@
+import csv
+import json
+import os
+from datetime import datetime
+from typing import Dict, Iterator, List, Optional, Tuple
+from sqlalchemy import select
+from sqlalchemy.orm import Session
+from models.entities import Counter
+from models.schemas import ReadingCreate, ImportReport
+from .reading_service import ReadingService
+from . import queries
+
+DEFAULT_CHUNK_SIZE = 5000
+MAX_IMPORT_ERRORS = 100
+SUPPORTED_FORMATS = ("csv", "jsonl")
+
+# Имена полей в файлах выгрузки
+COUNTER_FIELD = "counter_number"
+VALUE_FIELD = "value"
+DATE_FIELD = "reading_date"
+
+def parse_reading_date(value: str) -> datetime:
+    """Разбор даты показания: ISO 8601 или ДД.ММ.ГГГГ"""
+    value = value.strip()
+    try:
+        return datetime.fromisoformat(value)
+    except ValueError:
+        return datetime.strptime(value, "%d.%m.%Y")
+
+def detect_format(path: str) -> str:
+    """Определение формата файла по расширению"""
+    extension = os.path.splitext(path)[1].lower().lstrip(".")
+    if extension in ("json", "ndjson"):
+        extension = "jsonl"
+    if extension not in SUPPORTED_FORMATS:
+        raise ValueError(f"Неподдерживаемый формат файла: {path}")
+    return extension
+
+def read_csv_header(path: str, delimiter: str = ",") -> List[str]:
+    """Чтение заголовка CSV-файла"""
+    with open(path, "rb") as source:
+        header_line = source.readline().decode("utf-8-sig")
+    return [name.strip() for name in next(csv.reader([header_line], delimiter=delimiter))]
+
+def iter_lines(path: str, start_offset: int = 0, start_line: int = 0,
+               skip_header: bool = False) -> Iterator[Tuple[int, int, str]]:
+    """Потоковое чтение строк файла
+    
+    Возвращает кортежи (номер строки, смещение в байтах после строки, текст).
+    Файл читается построчно, поэтому память не зависит от его размера.
+    Чтение продолжается с start_offset (строка start_line), пустые строки
+    пропускаются.
+    """
+    with open(path, "rb") as source:
+        line_number = 0
+        if start_offset:
+            source.seek(start_offset)
+            line_number = start_line
+        elif skip_header:
+            source.readline()
+            line_number = 1
+        
+        while True:
+            line = source.readline()
+            if not line:
+                break
+            line_number += 1
+            
+            text = line.decode("utf-8-sig").strip()
+            if text:
+                yield line_number, source.tell(), text
+
+def parse_line(text: str, file_format: str, header: Optional[List[str]] = None,
+               delimiter: str = ",") -> Dict:
+    """Разбор строки CSV или JSONL в словарь"""
+    if file_format == "csv":
+        values = next(csv.reader([text], delimiter=delimiter))
+        return dict(zip(header, values))
+    
+    record = json.loads(text)
+    if not isinstance(record, dict):
+        raise ValueError("Ожидался JSON-объект")
+    return record
+
+class ReadingImportService:
+    """Сервис потокового импорта показаний из CSV/JSONL
+    
+    Показания коммитятся порциями через ReadingService.create_readings_bulk.
+    После каждой порции рядом с файлом пишется контрольная точка, поэтому
+    прерванный импорт продолжается с последней зафиксированной строки.
+    
+    Порция и контрольная точка фиксируются не атомарно: если процесс
+    остановился между ними, при продолжении первая порция читается
+    повторно. Ее строки, уже сохраненные в базе (тот же счетчик, дата и
+    значение), пропускаются.
+    """
+    
+    def __init__(self, db: Session, chunk_size: int = DEFAULT_CHUNK_SIZE):
+        if chunk_size < 1:
+            raise ValueError("Размер порции должен быть больше 0")
+        self.db = db
+        self.chunk_size = chunk_size
+        self.reading_service = ReadingService(db)
+    
+    @staticmethod
+    def get_checkpoint_path(path: str) -> str:
+        """Путь к файлу контрольной точки импорта"""
+        return f"{path}.checkpoint"
+    
+    def import_file(self, path: str, file_format: Optional[str] = None,
+                    resume: bool = True, delimiter: str = ",") -> ImportReport:
+        """Импорт показаний из файла"""
+        file_format = file_format or detect_format(path)
+        if file_format not in SUPPORTED_FORMATS:
+            raise ValueError(f"Неподдерживаемый формат: {file_format}")
+        
+        checkpoint = self._load_checkpoint(path) if resume else None
+        start_offset = checkpoint["offset"] if checkpoint else 0
+        
+        report = ImportReport(
+            source=path,
+            resumed_from_line=checkpoint["line"] if checkpoint else 0
+        )
+        counter_ids = self._get_counter_ids()
+        
+        chunk: List[ReadingCreate] = []
+        chunk_lines: List[int] = []
+        last_line, last_offset = report.resumed_from_line, start_offset
+        # Первая порция могла быть сохранена до остановки без контрольной точки
+        replayed = resume
+        
+        header = read_csv_header(path, delimiter) if file_format == "csv" else None
+        lines = iter_lines(path, start_offset, report.resumed_from_line, skip_header=header is not None)
+        
+        for line_number, offset, text in lines:
+            report.processed += 1
+            last_line, last_offset = line_number, offset
+            
+            try:
+                record = parse_line(text, file_format, header, delimiter)
+                reading = self._parse_record(record, counter_ids)
+            except KeyError as e:
+                self._reject(report, line_number, f"Нет поля {e}")
+            except (ValueError, TypeError) as e:
+                self._reject(report, line_number, str(e))
+            else:
+                chunk.append(reading)
+                chunk_lines.append(line_number)
+            
+            if len(chunk) >= self.chunk_size:
+                self._commit_chunk(report, chunk, chunk_lines, replayed)
+                self._save_checkpoint(path, last_line, last_offset)
+                chunk, chunk_lines = [], []
+                replayed = False
+        
+        if chunk:
+            self._commit_chunk(report, chunk, chunk_lines, replayed)
+        
+        # Файл загружен полностью - контрольная точка больше не нужна
+        self._remove_checkpoint(path)
+        return report
+    
+    def _get_counter_ids(self) -> Dict[str, int]:
+        """Соответствие номеров счетчиков их ID"""
+        rows = self.db.execute(select(Counter.number, Counter.id)).all()
+        return {number: counter_id for number, counter_id in rows}
+    
+    @staticmethod
+    def _parse_record(record: Dict, counter_ids: Dict[str, int]) -> ReadingCreate:
+        """Преобразование записи файла в показание"""
+        number = str(record[COUNTER_FIELD]).strip()
+        if number not in counter_ids:
+            raise ValueError(f"Счетчик {number} не найден")
+        
+        return ReadingCreate(
+            counter_id=counter_ids[number],
+            value=int(record[VALUE_FIELD]),
+            reading_date=parse_reading_date(str(record[DATE_FIELD]))
+        )
+    
+    def _commit_chunk(self, report: ImportReport, chunk: List[ReadingCreate], chunk_lines: List[int],
+                      replayed: bool = False):
+        """Сохранение порции показаний одной транзакцией"""
+        if replayed:
+            chunk, chunk_lines = self._skip_imported(report, chunk, chunk_lines)
+            if not chunk:
+                return
+        result = self.reading_service.create_readings_bulk(chunk)
+        report.chunks += 1
+        report.accepted += result.accepted
+        for rejected in result.rejected_rows:
+            self._reject(report, chunk_lines[rejected.index], rejected.message)
+    
+    def _skip_imported(self, report: ImportReport, chunk: List[ReadingCreate],
+                       chunk_lines: List[int]) -> Tuple[List[ReadingCreate], List[int]]:
+        """Исключение показаний порции, уже сохраненных в базе
+        
+        Сохраненные показания читаются одним запросом по счетчикам и
+        диапазону дат порции.
+        """
+        history = queries.reading_history(lambda c: [
+            c.counter_id.in_({reading.counter_id for reading in chunk}),
+            c.reading_date >= min(reading.reading_date for reading in chunk),
+            c.reading_date <= max(reading.reading_date for reading in chunk),
+        ])
+        stored = set(self.db.execute(select(history.c.counter_id, history.c.reading_date, history.c.value)))
+        
+        kept, kept_lines = [], []
+        for reading, line_number in zip(chunk, chunk_lines):
+            if (reading.counter_id, reading.reading_date, reading.value) in stored:
+                report.skipped += 1
+            else:
+                kept.append(reading)
+                kept_lines.append(line_number)
+        return kept, kept_lines
+    
+    @staticmethod
+    def _reject(report: ImportReport, line_number: int, message: str):
+        """Учет отклоненной строки"""
+        report.rejected += 1
+        if len(report.errors) < MAX_IMPORT_ERRORS:
+            report.errors.append(f"Строка {line_number}: {message}")
+    
+    def _load_checkpoint(self, path: str) -> Optional[Dict]:
+        """Загрузка контрольной точки, если она относится к этому файлу"""
+        checkpoint_path = self.get_checkpoint_path(path)
+        if not os.path.exists(checkpoint_path):
+            return None
+        
+        with open(checkpoint_path, encoding="utf-8") as f:
+            checkpoint = json.load(f)
+        
+        # Файл изменился после прерванного импорта - начинаем заново
+        stat = os.stat(path)
+        if checkpoint.get("size") != stat.st_size or checkpoint.get("mtime") != stat.st_mtime:
+            return None
+        return checkpoint
+    
+    def _save_checkpoint(self, path: str, line_number: int, offset: int):
+        """Атомарная запись контрольной точки"""
+        stat = os.stat(path)
+        checkpoint = {
+            "line": line_number,
+            "offset": offset,
+            "size": stat.st_size,
+            "mtime": stat.st_mtime,
+        }
+        checkpoint_path = self.get_checkpoint_path(path)
+        tmp_path = f"{checkpoint_path}.tmp"
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            json.dump(checkpoint, f)
+        os.replace(tmp_path, checkpoint_path)
+    
+    def _remove_checkpoint(self, path: str):
+        """Удаление контрольной точки после завершения импорта"""
+        checkpoint_path = self.get_checkpoint_path(path)
+        if os.path.exists(checkpoint_path):
+            os.remove(checkpoint_path)
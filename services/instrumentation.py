@@ -0,0 +1,246 @@
+"""Учет SQL-запросов по вызовам методов сервисов и поиск N+1
+
+Включается явно: QueryInstrumentation.install() подписывается на события
+движка, instrument() оборачивает публичные методы классов. Каждый
+запрос засчитывается всем отслеживаемым вызовам, внутри которых он
+выполнен, поэтому цикл вызовов сервиса внутри метода интерфейса
+(N+1) виден у внешнего метода как повтор одного и того же запроса.
+
+Из окружения (configure_from_env):
+    WATER_COUNTER_QUERY_STATS   - log: предупреждения в лог и отчет при
+                                  выходе; strict: нарушение порога -
+                                  исключение QueryBudgetExceeded (для тестов)
+    WATER_COUNTER_MAX_REPEATED  - допустимое число одинаковых запросов
+                                  за вызов (по умолчанию 10)
+    WATER_COUNTER_MAX_STATEMENTS - допустимое число запросов за вызов
+"""
+import atexit
+import functools
+import inspect
+import logging
+import os
+import time
+from collections import Counter as CounterDict
+from contextvars import ContextVar
+from dataclasses import dataclass, field
+from typing import Dict, List, Optional, Tuple
+from sqlalchemy import event
+from sqlalchemy.engine import Engine
+
+logger = logging.getLogger("water_counter.queries")
+
+DEFAULT_MAX_REPEATED = 10
+
+# Циклы обработки команд не оборачиваются: в них уходит вся работа приложения
+LONG_RUNNING_METHODS = ("run", "serve_forever")
+
+# Стек отслеживаемых вызовов текущего потока/задачи
+_active_calls: ContextVar[Tuple["CallStats", ...]] = ContextVar("active_calls", default=())
+
+class QueryBudgetExceeded(AssertionError):
+    """Вызов метода превысил допустимое число запросов"""
+
+@dataclass
+class CallStats:
+    """Запросы одного вызова метода"""
+    method: str
+    statements: int = 0
+    sql_seconds: float = 0.0
+    shapes: CounterDict = field(default_factory=CounterDict)
+    
+    @property
+    def max_repeated(self) -> int:
+        """Наибольшее число выполнений одного и того же запроса"""
+        return max(self.shapes.values(), default=0)
+    
+    def most_repeated(self) -> Optional[str]:
+        """Текст самого частого запроса"""
+        if not self.shapes:
+            return None
+        return self.shapes.most_common(1)[0][0]
+
+@dataclass
+class MethodReport:
+    """Сводка по всем вызовам метода"""
+    method: str
+    calls: int = 0
+    statements: int = 0
+    sql_seconds: float = 0.0
+    max_statements: int = 0
+    max_repeated: int = 0
+    violations: int = 0
+
+class QueryInstrumentation:
+    """Счетчик запросов по вызовам методов с порогами для N+1"""
+    
+    def __init__(self, target=Engine, max_repeated: Optional[int] = DEFAULT_MAX_REPEATED,
+                 max_statements: Optional[int] = None, strict: bool = False):
+        self.target = target
+        self.max_repeated = max_repeated
+        self.max_statements = max_statements
+        self.strict = strict
+        self.reports: Dict[str, MethodReport] = {}
+        self._installed = False
+    
+    def install(self):
+        """Подписка на события выполнения запросов"""
+        if not self._installed:
+            event.listen(self.target, "before_cursor_execute", self._before_execute)
+            event.listen(self.target, "after_cursor_execute", self._after_execute)
+            self._installed = True
+        return self
+    
+    def uninstall(self):
+        """Отписка от событий"""
+        if self._installed:
+            event.remove(self.target, "before_cursor_execute", self._before_execute)
+            event.remove(self.target, "after_cursor_execute", self._after_execute)
+            self._installed = False
+    
+    def _before_execute(self, conn, cursor, statement, parameters, context, executemany):
+        conn.info.setdefault("query_started", []).append(time.perf_counter())
+    
+    def _after_execute(self, conn, cursor, statement, parameters, context, executemany):
+        elapsed = time.perf_counter() - conn.info["query_started"].pop()
+        for stats in _active_calls.get():
+            stats.statements += 1
+            stats.sql_seconds += elapsed
+            stats.shapes[statement] += 1
+    
+    def track(self, method: str) -> "_TrackedCall":
+        """Контекст учета запросов одного вызова"""
+        return _TrackedCall(self, method)
+    
+    def instrument(self, cls: type) -> type:
+        """Обертка публичных методов класса (в том числе async)
+        
+        Уже обернутые методы переключаются на этот экземпляр: запросы
+        засчитываются последнему инструментированию (например, в тестах
+        каждый тест включает свое).
+        """
+        for name, member in list(vars(cls).items()):
+            if name.startswith("_") or name in LONG_RUNNING_METHODS or not inspect.isfunction(member):
+                continue
+            if getattr(member, "__instrumented__", False):
+                member = member.__wrapped__
+            setattr(cls, name, self._wrap(f"{cls.__name__}.{name}", member))
+        return cls
+    
+    def _wrap(self, method: str, function):
+        if inspect.iscoroutinefunction(function):
+            @functools.wraps(function)
+            async def async_wrapper(*args, **kwargs):
+                with self.track(method):
+                    return await function(*args, **kwargs)
+            wrapper = async_wrapper
+        else:
+            @functools.wraps(function)
+            def wrapper(*args, **kwargs):
+                with self.track(method):
+                    return function(*args, **kwargs)
+        wrapper.__instrumented__ = True
+        return wrapper
+    
+    def _finish(self, stats: CallStats):
+        """Учет завершенного вызова и проверка порогов"""
+        report = self.reports.setdefault(stats.method, MethodReport(stats.method))
+        report.calls += 1
+        report.statements += stats.statements
+        report.sql_seconds += stats.sql_seconds
+        report.max_statements = max(report.max_statements, stats.statements)
+        report.max_repeated = max(report.max_repeated, stats.max_repeated)
+        
+        logger.debug("%s: %d запросов, %.1f мс SQL", stats.method, stats.statements, stats.sql_seconds * 1000)
+        
+        problems = []
+        if self.max_repeated is not None and stats.max_repeated > self.max_repeated:
+            problems.append(
+                f"один запрос выполнен {stats.max_repeated} раз (порог {self.max_repeated}): "
+                f"{' '.join(stats.most_repeated().split())[:200]}"
+            )
+        if self.max_statements is not None and stats.statements > self.max_statements:
+            problems.append(f"{stats.statements} запросов (порог {self.max_statements})")
+        if not problems:
+            return
+        
+        report.violations += 1
+        message = f"{stats.method}: " + "; ".join(problems)
+        if self.strict:
+            raise QueryBudgetExceeded(message)
+        logger.warning("Возможный N+1 в %s", message)
+    
+    def get_report(self) -> List[MethodReport]:
+        """Сводка по методам, больше всего запросов - первыми"""
+        return sorted(self.reports.values(), key=lambda report: report.statements, reverse=True)
+    
+    def format_report(self) -> str:
+        """Сводка в виде таблицы"""
+        lines = [f"{'метод':<50} {'вызовов':>8} {'запросов':>9} {'макс.':>6} {'повтор':>7} {'SQL, мс':>9}"]
+        for report in self.get_report():
+            lines.append(
+                f"{report.method:<50} {report.calls:>8} {report.statements:>9} "
+                f"{report.max_statements:>6} {report.max_repeated:>7} {report.sql_seconds * 1000:>9.1f}"
+                + (" ⚠️" if report.violations else "")
+            )
+        return "\n".join(lines)
+
+class _TrackedCall:
+    """Контекст одного отслеживаемого вызова"""
+    
+    def __init__(self, instrumentation: QueryInstrumentation, method: str):
+        self.instrumentation = instrumentation
+        self.stats = CallStats(method)
+        self._token = None
+    
+    def __enter__(self) -> CallStats:
+        self._token = _active_calls.set(_active_calls.get() + (self.stats,))
+        return self.stats
+    
+    def __exit__(self, exc_type, exc, tb):
+        _active_calls.reset(self._token)
+        if exc_type is None:
+            self.instrumentation._finish(self.stats)
+        return False
+
+def instrument_services(instrumentation: QueryInstrumentation, *extra_classes: type) -> QueryInstrumentation:
+    """Инструментирование всех сервисов пакета services и дополнительных классов"""
+    from .counter_service import CounterService
+    from .reading_service import ReadingService
+    from .payment_service import PaymentService
+    from .tariff_index import TariffIndex
+    from .property_service import PropertyService
+    from .usage_service import MonthlyUsageService
+    from .anomaly_service import AnomalyService
+    from .latest_service import LatestReadingService
+    from .forecast_service import ForecastService
+    from .import_service import ReadingImportService
+    from .export_service import ExportService
+    from .archive_service import ReadingArchiveService
+    from .async_service import AsyncCounterService, AsyncReadingService, AsyncPaymentService
+    
+    for cls in (CounterService, ReadingService, PaymentService, TariffIndex, PropertyService,
+                MonthlyUsageService, AnomalyService, LatestReadingService, ForecastService,
+                ReadingImportService, ExportService, ReadingArchiveService,
+                AsyncCounterService, AsyncReadingService, AsyncPaymentService, *extra_classes):
+        instrumentation.instrument(cls)
+    return instrumentation.install()
+
+def configure_from_env(*extra_classes: type, environ: Optional[Dict[str, str]] = None) -> Optional[QueryInstrumentation]:
+    """Включение учета запросов по переменным окружения"""
+    environ = os.environ if environ is None else environ
+    mode = environ.get("WATER_COUNTER_QUERY_STATS", "").lower()
+    if mode not in ("log", "strict"):
+        return None
+    
+    max_statements = environ.get("WATER_COUNTER_MAX_STATEMENTS")
+    instrumentation = QueryInstrumentation(
+        max_repeated=int(environ.get("WATER_COUNTER_MAX_REPEATED", DEFAULT_MAX_REPEATED)),
+        max_statements=int(max_statements) if max_statements else None,
+        strict=mode == "strict"
+    )
+    instrument_services(instrumentation, *extra_classes)
+    
+    if not logging.getLogger().handlers:
+        logging.basicConfig(level=logging.WARNING, format="%(levelname)s %(name)s: %(message)s")
+    atexit.register(lambda: print("\n📊 Запросы по методам:\n" + instrumentation.format_report()))
+    return instrumentation
@@ -0,0 +1,93 @@
+from datetime import datetime
+from typing import Dict, Iterable, List, Optional, Tuple
+from sqlalchemy import select, delete, insert, update, func, desc, bindparam
+from sqlalchemy.orm import Session
+from models.entities import Reading, CounterLatestReading
+from . import queries
+
+class LatestReadingService:
+    """Сервис снимка последних показаний counter_latest_readings
+    
+    Снимок обновляется в транзакции вставки показаний, поэтому последние
+    показания всех счетчиков читаются одним запросом без поиска по
+    таблице показаний. Показание задним числом (раньше последнего)
+    снимок не меняет.
+    """
+    
+    def __init__(self, db: Session):
+        self.db = db
+    
+    def apply_readings(self, readings: List[Dict]):
+        """Учет новых показаний (без коммита, в транзакции вставки)
+        
+        readings - словари с counter_id, value, reading_date в порядке вставки.
+        """
+        if not readings:
+            return
+        
+        # Последнее показание каждого счетчика в пакете; при равных датах - позднее вставленное
+        batch: Dict[int, Tuple[int, datetime]] = {}
+        for reading in readings:
+            current = batch.get(reading["counter_id"])
+            if current is None or reading["reading_date"] >= current[1]:
+                batch[reading["counter_id"]] = (reading["value"], reading["reading_date"])
+        
+        table = CounterLatestReading.__table__
+        existing = {
+            counter_id: reading_date
+            for counter_id, reading_date in self.db.execute(
+                select(table.c.counter_id, table.c.reading_date).where(table.c.counter_id.in_(batch))
+            )
+        }
+        
+        new_rows, changed_rows = [], []
+        for counter_id, (value, reading_date) in batch.items():
+            if counter_id not in existing:
+                new_rows.append({"counter_id": counter_id, "value": value, "reading_date": reading_date})
+            elif reading_date >= existing[counter_id]:
+                changed_rows.append({"b_counter_id": counter_id, "value": value, "reading_date": reading_date})
+        
+        if new_rows:
+            self.db.execute(insert(table), new_rows)
+        if changed_rows:
+            self.db.execute(
+                update(table)
+                .where(table.c.counter_id == bindparam("b_counter_id"))
+                .values(value=bindparam("value"), reading_date=bindparam("reading_date")),
+                changed_rows
+            )
+    
+    def get_latest_values(self, counter_ids: Optional[Iterable[int]] = None) -> Dict[int, Optional[Tuple[int, datetime]]]:
+        """Последние показания (значение, дата) счетчиков одним запросом
+        
+        Без counter_ids - для всех счетчиков. В результат попадают только
+        существующие счетчики; для счетчиков без показаний значение None.
+        """
+        rows = self.db.execute(queries.latest_values(counter_ids))
+        return {
+            counter_id: (value, reading_date) if value is not None else None
+            for counter_id, value, reading_date in rows
+        }
+    
+    def rebuild(self) -> int:
+        """Полный пересчет снимка по таблице показаний, возвращает число строк"""
+        self.db.execute(delete(CounterLatestReading))
+        
+        ranked = select(
+            Reading.counter_id,
+            Reading.value,
+            Reading.reading_date,
+            func.row_number().over(
+                partition_by=Reading.counter_id,
+                order_by=(desc(Reading.reading_date), desc(Reading.id))
+            ).label("rn"),
+        ).subquery()
+        result = self.db.execute(
+            insert(CounterLatestReading).from_select(
+                ["counter_id", "value", "reading_date"],
+                select(ranked.c.counter_id, ranked.c.value, ranked.c.reading_date).where(ranked.c.rn == 1)
+            )
+        )
+        
+        self.db.commit()
+        return result.rowcount
@@ -0,0 +1,45 @@
+"""Курсорная (keyset) пагинация
+
+Страница запрашивается по курсору - ключу сортировки последней строки
+предыдущей страницы, а не по OFFSET, поэтому стоимость выборки страницы
+не растет с ее номером. Запрос берет limit + 1 строк: лишняя строка
+показывает, что есть следующая страница.
+"""
+from dataclasses import dataclass, field
+from datetime import datetime
+from typing import Callable, Generic, List, Optional, Sequence, Tuple, TypeVar
+
+T = TypeVar("T")
+
+# Ключ сортировки строки: (дата, id)
+Cursor = Tuple[datetime, int]
+
+DEFAULT_PAGE_SIZE = 20
+
+@dataclass
+class Page(Generic[T]):
+    """Страница результатов и курсор следующей страницы"""
+    items: List[T] = field(default_factory=list)
+    next_cursor: Optional[Cursor] = None
+    
+    @property
+    def has_next(self) -> bool:
+        return self.next_cursor is not None
+
+def build_page(rows: Sequence[T], limit: int, key: Callable[[T], Cursor]) -> Page[T]:
+    """Страница из limit + 1 выбранных строк"""
+    items = list(rows[:limit])
+    next_cursor = key(items[-1]) if len(rows) > limit else None
+    return Page(items=items, next_cursor=next_cursor)
+
+def reading_key(reading) -> Cursor:
+    """Курсор показания"""
+    return reading.reading_date, reading.id
+
+def payment_key(payment) -> Cursor:
+    """Курсор платежа"""
+    return payment.calculated_at, payment.id
+
+def alert_key(alert) -> Cursor:
+    """Курсор оповещения"""
+    return alert.reading_date, alert.id
@@ -1,10 +1,17 @@
+import time
+from dataclasses import dataclass
+import numpy as np
 from sqlalchemy.orm import Session
-from sqlalchemy import desc
-from typing import List, Optional, Dict
-from datetime import datetime, date, timedelta
-from models.entities import Payment, Tariff
-from models.schemas import PaymentCreate, Payment as PaymentSchema, PaymentCalculation
-from .reading_service import ReadingService
+from sqlalchemy import select, insert, update, func, extract, tuple_
+from sqlalchemy.exc import IntegrityError
+from typing import List, Optional, Dict, Tuple, Sequence
+from datetime import datetime
+from models.entities import Payment, Tariff, Property
+from models.schemas import PaymentCalculation, BatchBillingResult, MonthlyConsumption
+from .reading_service import ReadingService, get_month_period
+from .tariff_index import TariffIndex
+from . import queries
+from .pagination import Page, Cursor, DEFAULT_PAGE_SIZE, build_page, payment_key
 
 DEFAULT_TARIFFS = [
             ("cold_water", 68.02),      # 68.02 руб за м³ холодной воды
@@ -13,20 +20,76 @@ DEFAULT_TARIFFS = [
         ]
         
 
+# Допустимые измерения группировки сводок
+SUMMARY_GROUPS = ("year", "month", "property")
+
+# Ключ платежа: один платеж объекта за период (уникальный индекс)
+PAYMENT_KEY = ("property_id", "period_start", "period_end")
+
+# Ключей в одном запросе ID сохраненных платежей: по три параметра на ключ,
+# чтобы не выйти за предел SQLite на число параметров (999 в старых сборках)
+KEY_LOOKUP_CHUNK = 300
+
+def payment_values(calculation: PaymentCalculation, notes: Optional[str] = None) -> Dict:
+    """Строка таблицы платежей по расчету"""
+    return {
+        "property_id": calculation.property_id,
+        "period_start": calculation.period_start,
+        "period_end": calculation.period_end,
+        "total_amount": calculation.total_amount,
+        "hot_water_amount": calculation.hot_water_consumption * calculation.hot_water_rate,
+        "cold_water_amount": calculation.cold_water_consumption * calculation.cold_water_rate,
+        "wastewater_amount": calculation.wastewater_consumption * calculation.wastewater_rate,
+        "hot_water_consumption": calculation.hot_water_consumption,
+        "cold_water_consumption": calculation.cold_water_consumption,
+        "wastewater_consumption": calculation.wastewater_consumption,
+        "calculated_at": datetime.utcnow(),
+        "notes": notes,
+    }
+
+def upsert_insert(dialect_name: str):
+    """Конструкция insert с ON CONFLICT DO UPDATE для диалекта или None
+    
+    Модули диалектов импортируются при первом сохранении платежей:
+    диалект PostgreSQL при запуске приложения не нужен.
+    """
+    if dialect_name == "sqlite":
+        from sqlalchemy.dialects.sqlite import insert as sqlite_insert
+        return sqlite_insert
+    if dialect_name == "postgresql":
+        from sqlalchemy.dialects.postgresql import insert as postgresql_insert
+        return postgresql_insert
+    return None
+
+def _payment_key(row: Dict) -> Tuple:
+    return tuple(row[field] for field in PAYMENT_KEY)
+
+@dataclass(frozen=True)
+class PaymentTotals:
+    """Агрегаты платежей по группе (год, месяц, объект)
+    
+    Измерения, по которым не было группировки, равны None.
+    """
+    year: Optional[int]
+    month: Optional[int]
+    property_id: Optional[int]
+    payments_count: int
+    total_amount: float
+    hot_water_consumption: int
+    cold_water_consumption: int
+    average_amount: float
+
 class PaymentService:
     """Сервис для расчета платежей"""
     
     def __init__(self, db: Session):
         self.db = db
         self.reading_service = ReadingService(db)
+        self.tariff_index = TariffIndex(db)
     
     def get_current_tariff(self, service_type: str) -> Optional[Tariff]:
         """Получение действующего тарифа для типа услуги"""
-        return self.db.query(Tariff)\
-            .filter(Tariff.service_type == service_type)\
-            .filter((Tariff.end_date.is_(None)) | (Tariff.end_date > datetime.now()))\
-            .order_by(desc(Tariff.start_date))\
-            .first()
+        return self.db.scalars(queries.current_tariff(service_type)).first()
     
     def create_tariff(self, service_type: str, price_per_cubic_meter: float, start_date: datetime) -> Tariff:
         """Создание нового тарифа"""
@@ -45,104 +108,320 @@ class PaymentService:
         self.db.add(new_tariff)
         self.db.commit()
         self.db.refresh(new_tariff)
+        
+        # Интервалы тарифов изменились
+        self.tariff_index.invalidate()
         return new_tariff
     
-    def calculate_monthly_payment(self, year: int, month: int) -> PaymentCalculation:
-        """Расчет платежа за месяц"""
+    def calculate_monthly_payment(self, year: int, month: int,
+                                  property_id: Optional[int] = None,
+                                  consumption: Optional[MonthlyConsumption] = None) -> PaymentCalculation:
+        """Расчет платежа за месяц
+        
+        Если property_id не указан, учитываются все счетчики базы.
+        consumption - уже полученный отчет calculate_monthly_consumption за
+        этот месяц и объект (например, для вывода аномалий), чтобы не
+        считать потребление повторно; отчет за другой месяц или объект -
+        ValueError.
+        """
         # Определяем период
-        if month == 12:
-            period_start = datetime(year, month, 1)
-            period_end = datetime(year + 1, 1, 1) - timedelta(seconds=1)
-        else:
-            period_start = datetime(year, month, 1)
-            period_end = datetime(year, month + 1, 1) - timedelta(seconds=1)
+        period_start, period_end = get_month_period(year, month)
         
         # Получаем потребление за месяц
-        consumption = self.reading_service.get_monthly_consumption(year, month)
+        if consumption is None:
+            consumption = self.reading_service.calculate_monthly_consumption(year, month, property_id)
+        elif consumption.period_start != period_start:
+            raise ValueError("Отчет о потреблении относится к другому месяцу")
+        elif consumption.property_id != property_id:
+            raise ValueError("Отчет о потреблении относится к другому объекту")
+        
+        # Получаем тарифы, действовавшие в расчетном периоде
+        rates = self._get_rates(period_end)
+        
+        return self._build_calculation(
+            period_start, period_end, consumption.hot, consumption.cold, rates, property_id
+        )
+    
+    def calculate_all_properties(self, year: int, month: int) -> BatchBillingResult:
+        """Расчет платежей за месяц по всем объектам
         
-        # Получаем действующие тарифы
-        hot_water_tariff = self.get_current_tariff("hot_water")
-        cold_water_tariff = self.get_current_tariff("cold_water")
-        wastewater_tariff = self.get_current_tariff("wastewater")
+        Потребление всех счетчиков берется одним оконным запросом,
+        тарифы - один раз на весь расчет, дальше суммы группируются
+        по объектам в памяти.
+        """
+        started = time.perf_counter()
+        report = self.reading_service.calculate_monthly_consumption(year, month)
+        rates = self._get_rates(report.period_end)
+        property_ids = [row[0] for row in self.db.execute(select(Property.id).order_by(Property.id))]
         
-        if not hot_water_tariff or not cold_water_tariff or not wastewater_tariff:
+        # Суммируем потребление по объектам
+        totals = {property_id: {"hot": 0, "cold": 0} for property_id in property_ids}
+        for counter in report.counters:
+            if counter.property_id in totals:
+                totals[counter.property_id][counter.water_type] += counter.consumption
+        
+        calculations = [
+            self._build_calculation(
+                report.period_start, report.period_end,
+                consumption["hot"], consumption["cold"], rates, property_id
+            )
+            for property_id, consumption in totals.items()
+        ]
+        
+        elapsed = time.perf_counter() - started
+        return BatchBillingResult(
+            period_start=report.period_start,
+            period_end=report.period_end,
+            calculations=calculations,
+            anomalies=report.anomalies,
+            properties_count=len(calculations),
+            elapsed_seconds=elapsed,
+            properties_per_second=len(calculations) / elapsed if elapsed > 0 else 0.0
+        )
+    
+    def _get_rates(self, moment: datetime) -> Tuple[float, float, float]:
+        """Цены (горячая, холодная, утилизация), действовавшие на момент moment
+        
+        Для периодов раньше первого тарифа берется самый ранний тариф.
+        """
+        rates = tuple(
+            self.tariff_index.get_price(service_type, moment, fallback_to_earliest=True)
+            for service_type in ("hot_water", "cold_water", "wastewater")
+        )
+        
+        if None in rates:
             raise ValueError("Не установлены тарифы для всех услуг")
         
+        return rates
+    
+    def get_rate_vectors(self, moments: List[datetime]) -> Tuple[np.ndarray, np.ndarray, np.ndarray]:
+        """Векторы цен (горячая, холодная, утилизация) для набора моментов
+        
+        Используется вместе с billing_kernel.compute_billing для пересчета
+        многих периодов за один вызов.
+        """
+        vectors = []
+        for service_type in ("hot_water", "cold_water", "wastewater"):
+            prices = self.tariff_index.get_prices(service_type, moments, fallback_to_earliest=True)
+            if None in prices:
+                raise ValueError("Не установлены тарифы для всех услуг")
+            vectors.append(np.asarray(prices, dtype=np.float64))
+        return tuple(vectors)
+    
+    @staticmethod
+    def _build_calculation(period_start: datetime, period_end: datetime,
+                           hot_consumption: int, cold_consumption: int,
+                           rates: Tuple[float, float, float],
+                           property_id: Optional[int] = None) -> PaymentCalculation:
+        """Расчет сумм по потреблению и ценам"""
+        hot_water_rate, cold_water_rate, wastewater_rate = rates
+        
         # Рассчитываем потребление утилизации (общий объем)
-        wastewater_consumption = consumption["hot"] + consumption["cold"]
+        wastewater_consumption = hot_consumption + cold_consumption
         
         # Рассчитываем суммы
-        hot_water_amount = consumption["hot"] * hot_water_tariff.price_per_cubic_meter
-        cold_water_amount = consumption["cold"] * cold_water_tariff.price_per_cubic_meter
-        wastewater_amount = wastewater_consumption * wastewater_tariff.price_per_cubic_meter
+        hot_water_amount = hot_consumption * hot_water_rate
+        cold_water_amount = cold_consumption * cold_water_rate
+        wastewater_amount = wastewater_consumption * wastewater_rate
         total_amount = hot_water_amount + cold_water_amount + wastewater_amount
         
         return PaymentCalculation(
+            property_id=property_id,
             period_start=period_start,
             period_end=period_end,
-            hot_water_consumption=consumption["hot"],
-            cold_water_consumption=consumption["cold"],
+            hot_water_consumption=hot_consumption,
+            cold_water_consumption=cold_consumption,
             wastewater_consumption=wastewater_consumption,
-            hot_water_rate=hot_water_tariff.price_per_cubic_meter,
-            cold_water_rate=cold_water_tariff.price_per_cubic_meter,
-            wastewater_rate=wastewater_tariff.price_per_cubic_meter,
+            hot_water_rate=hot_water_rate,
+            cold_water_rate=cold_water_rate,
+            wastewater_rate=wastewater_rate,
             total_amount=total_amount
         )
     
     def create_payment(self, calculation: PaymentCalculation, notes: str = None) -> Payment:
-        """Создание записи о платеже"""
-        payment = Payment(
-            period_start=calculation.period_start,
-            period_end=calculation.period_end,
-            total_amount=calculation.total_amount,
-            hot_water_amount=calculation.hot_water_consumption * calculation.hot_water_rate,
-            cold_water_amount=calculation.cold_water_consumption * calculation.cold_water_rate,
-            wastewater_amount=calculation.wastewater_consumption * calculation.wastewater_rate,
-            hot_water_consumption=calculation.hot_water_consumption,
-            cold_water_consumption=calculation.cold_water_consumption,
-            wastewater_consumption=calculation.wastewater_consumption,
-            notes=notes
-        )
-        self.db.add(payment)
+        """Сохранение платежа; прежний платеж объекта за тот же период перезаписывается"""
+        payment_id = self.save_payments([calculation], notes)[0]
+        return self.get_payment(payment_id)
+    
+    def save_payments(self, calculations: Sequence[PaymentCalculation], notes: Optional[str] = None) -> List[int]:
+        """Пакетное сохранение платежей в одной транзакции, возвращает их ID
+        
+        Платежи с тем же объектом и периодом перезаписываются
+        (INSERT ... ON CONFLICT DO UPDATE по уникальному ключу), поэтому
+        повторный запуск расчета не создает дубликатов. Платежи без
+        объекта (расчет по всем счетчикам базы) и базы без ON CONFLICT
+        обрабатываются поиском существующей строки (см. _save_payment_row).
+        """
+        rows = [payment_values(calculation, notes) for calculation in calculations]
+        
+        # Из повторов одного ключа в пакете сохраняется последний
+        unique_rows = {_payment_key(row): row for row in rows}
+        insert_factory = upsert_insert(self.db.get_bind().dialect.name)
+        upsert_rows, other_rows = [], []
+        for row in unique_rows.values():
+            if insert_factory is not None and row["property_id"] is not None:
+                upsert_rows.append(row)
+            else:
+                other_rows.append(row)
+        
+        payment_ids = {}
+        if upsert_rows:
+            payment_ids.update(self._upsert_payments(insert_factory, upsert_rows))
+        for row in other_rows:
+            payment_ids[_payment_key(row)] = self._save_payment_row(row)
         self.db.commit()
-        self.db.refresh(payment)
-        return payment
+        
+        return [payment_ids[_payment_key(row)] for row in rows]
+    
+    def _upsert_payments(self, insert_factory, rows: List[Dict]) -> Dict[Tuple, int]:
+        """INSERT ... ON CONFLICT DO UPDATE одним executemany, затем ID по ключам
+        
+        RETURNING с сохранением порядка строк SQLAlchemy выполняет по одной
+        строке, поэтому ID читаются отдельными запросами по KEY_LOOKUP_CHUNK
+        ключей.
+        """
+        table = Payment.__table__
+        statement = insert_factory(table)
+        statement = statement.on_conflict_do_update(
+            index_elements=[table.c[field] for field in PAYMENT_KEY],
+            set_={field: statement.excluded[field] for field in rows[0] if field not in PAYMENT_KEY}
+        )
+        self.db.execute(statement, rows)
+        
+        key_columns = [table.c[field] for field in PAYMENT_KEY]
+        keys = [_payment_key(row) for row in rows]
+        payment_ids = {}
+        for offset in range(0, len(keys), KEY_LOOKUP_CHUNK):
+            result = self.db.execute(
+                select(table.c.id, *key_columns)
+                .where(tuple_(*key_columns).in_(keys[offset:offset + KEY_LOOKUP_CHUNK]))
+            )
+            payment_ids.update((tuple(key), payment_id) for payment_id, *key in result)
+        return payment_ids
+    
+    def _save_payment_row(self, row: Dict) -> int:
+        """Обновление платежа с тем же ключом или вставка нового
+        
+        Поиск и вставка - два запроса, поэтому параллельная запись может
+        вставить тот же ключ между ними. Уникальные индексы (для платежей
+        без объекта - частичный) отклоняют такую вставку, и строка
+        перезаписывается обновлением.
+        """
+        table = Payment.__table__
+        key_filter = [table.c[field].is_not_distinct_from(row[field]) for field in PAYMENT_KEY]
+        payment_id = self.db.execute(select(table.c.id).where(*key_filter)).scalar()
+        if payment_id is None:
+            try:
+                with self.db.begin_nested():
+                    return self.db.execute(insert(table).values(row)).inserted_primary_key[0]
+            except IntegrityError:
+                payment_id = self.db.execute(select(table.c.id).where(*key_filter)).scalar_one()
+        self.db.execute(update(table).where(table.c.id == payment_id).values(row))
+        return payment_id
     
     def get_payment(self, payment_id: int) -> Optional[Payment]:
         """Получение платежа по ID"""
-        return self.db.query(Payment).filter(Payment.id == payment_id).first()
+        return self.db.scalars(queries.payment_by_id(payment_id)).first()
     
     def get_all_payments(self) -> List[Payment]:
         """Получение всех платежей"""
-        return self.db.query(Payment).order_by(desc(Payment.calculated_at)).all()
+        return list(self.db.scalars(queries.all_payments()))
+    
+    def get_payments_page(self, cursor: Optional[Cursor] = None,
+                          limit: int = DEFAULT_PAGE_SIZE) -> Page[Payment]:
+        """Страница платежей, новые первыми
+        
+        cursor - next_cursor предыдущей страницы, None для первой страницы.
+        """
+        rows = list(self.db.scalars(queries.payments_page(cursor, limit)))
+        return build_page(rows, limit, payment_key)
     
     def get_payments_by_year(self, year: int) -> List[Payment]:
         """Получение платежей за год"""
-        start_date = datetime(year, 1, 1)
-        end_date = datetime(year, 12, 31, 23, 59, 59)
-        
-        return self.db.query(Payment)\
-            .filter(Payment.period_start >= start_date, Payment.period_start <= end_date)\
-            .order_by(Payment.period_start)\
-            .all()
+        return list(self.db.scalars(queries.payments_by_year(year)))
     
     def get_payment_summary(self, year: int) -> Dict:
         """Получение сводки платежей за год"""
-        payments = self.get_payments_by_year(year)
-        
-        total_amount = sum(p.total_amount for p in payments)
-        total_hot_water = sum(p.hot_water_consumption for p in payments)
-        total_cold_water = sum(p.cold_water_consumption for p in payments)
+        totals = self.get_payment_totals(group_by=(), start_year=year, end_year=year)
+        total = totals[0] if totals else None
+        payments_count = total.payments_count if total else 0
+        total_amount = total.total_amount if total else 0
         
         return {
             "year": year,
-            "total_payments": len(payments),
+            "total_payments": payments_count,
             "total_amount": total_amount,
-            "total_hot_water_consumption": total_hot_water,
-            "total_cold_water_consumption": total_cold_water,
-            "average_monthly_amount": total_amount / 12 if payments else 0
+            "total_hot_water_consumption": total.hot_water_consumption if total else 0,
+            "total_cold_water_consumption": total.cold_water_consumption if total else 0,
+            "average_monthly_amount": total_amount / 12 if payments_count else 0
         }
     
+    def get_payment_totals(self, group_by: Sequence[str] = ("year", "month"),
+                           start_year: Optional[int] = None,
+                           end_year: Optional[int] = None,
+                           property_id: Optional[int] = None) -> List[PaymentTotals]:
+        """Агрегаты платежей одним запросом с группировкой в SQL
+        
+        group_by - любые из "year", "month", "property"; пустая группировка
+        дает один итог по всем платежам. Год и месяц берутся из начала
+        периода платежа.
+        """
+        unknown = set(group_by) - set(SUMMARY_GROUPS)
+        if unknown:
+            raise ValueError(f"Неизвестные измерения группировки: {', '.join(sorted(unknown))}")
+        
+        year_column = extract("year", Payment.period_start)
+        month_column = extract("month", Payment.period_start)
+        dimensions = {
+            "year": year_column,
+            "month": month_column,
+            "property": Payment.property_id,
+        }
+        group_columns = [dimensions[name].label(name) for name in SUMMARY_GROUPS if name in group_by]
+        
+        query = select(
+            *group_columns,
+            func.count(Payment.id).label("payments_count"),
+            func.coalesce(func.sum(Payment.total_amount), 0.0).label("total_amount"),
+            func.coalesce(func.sum(Payment.hot_water_consumption), 0).label("hot_water_consumption"),
+            func.coalesce(func.sum(Payment.cold_water_consumption), 0).label("cold_water_consumption"),
+            func.coalesce(func.avg(Payment.total_amount), 0.0).label("average_amount"),
+        )
+        
+        # Фильтр по диапазону дат, чтобы работал индекс по period_start
+        if start_year is not None:
+            query = query.where(Payment.period_start >= datetime(start_year, 1, 1))
+        if end_year is not None:
+            query = query.where(Payment.period_start < datetime(end_year + 1, 1, 1))
+        if property_id is not None:
+            query = query.where(Payment.property_id == property_id)
+        if group_columns:
+            query = query.group_by(*group_columns).order_by(*group_columns)
+        
+        totals = []
+        for row in self.db.execute(query):
+            if not row.payments_count:
+                continue
+            values = row._mapping
+            totals.append(PaymentTotals(
+                year=int(values["year"]) if "year" in values else None,
+                month=int(values["month"]) if "month" in values else None,
+                property_id=values.get("property"),
+                payments_count=row.payments_count,
+                total_amount=row.total_amount,
+                hot_water_consumption=row.hot_water_consumption,
+                cold_water_consumption=row.cold_water_consumption,
+                average_amount=row.average_amount
+            ))
+        return totals
+    
+    def get_yearly_rollup(self, start_year: Optional[int] = None,
+                          end_year: Optional[int] = None,
+                          by_property: bool = False) -> List[PaymentTotals]:
+        """Сводка по годам за несколько лет одним запросом"""
+        group_by = ("year", "property") if by_property else ("year",)
+        return self.get_payment_totals(group_by, start_year, end_year)
+    
     def initialize_default_tariffs(self) -> List[Tariff]:
         """Инициализация тарифов по умолчанию"""
         
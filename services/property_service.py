@@ -0,0 +1,42 @@
+from sqlalchemy.orm import Session
+from typing import List, Optional
+from models.entities import Property
+from models.schemas import PropertyCreate
+
+DEFAULT_PROPERTY_NAME = "Основная квартира"
+
+class PropertyService:
+    """Сервис для работы с объектами недвижимости"""
+    
+    def __init__(self, db: Session):
+        self.db = db
+    
+    def create_property(self, property_data: PropertyCreate) -> Property:
+        """Создание нового объекта"""
+        db_property = Property(
+            name=property_data.name,
+            address=property_data.address
+        )
+        self.db.add(db_property)
+        self.db.commit()
+        self.db.refresh(db_property)
+        return db_property
+    
+    def get_property(self, property_id: int) -> Optional[Property]:
+        """Получение объекта по ID"""
+        return self.db.query(Property).filter(Property.id == property_id).first()
+    
+    def get_property_by_name(self, name: str) -> Optional[Property]:
+        """Получение объекта по названию"""
+        return self.db.query(Property).filter(Property.name == name).first()
+    
+    def get_all_properties(self) -> List[Property]:
+        """Получение всех объектов"""
+        return self.db.query(Property).order_by(Property.id).all()
+    
+    def get_or_create_default_property(self) -> Property:
+        """Объект по умолчанию для режима одной квартиры"""
+        existing = self.get_property_by_name(DEFAULT_PROPERTY_NAME)
+        if existing:
+            return existing
+        return self.create_property(PropertyCreate(name=DEFAULT_PROPERTY_NAME))
@@ -0,0 +1,163 @@
+"""Построение запросов, общих для синхронных и асинхронных сервисов
+
+Функции возвращают select()-выражения; выполняют их Session.scalars
+или AsyncSession.scalars, поэтому поведение обоих слоев совпадает.
+"""
+from datetime import datetime
+from typing import Callable, Iterable, Optional, Sequence, Tuple
+from sqlalchemy import Select, Subquery, select, desc, tuple_, union_all
+from sqlalchemy.orm import aliased
+from models.entities import Counter, Reading, ReadingArchive, Tariff, Payment, CounterAlert, CounterLatestReading
+
+# Колонки показаний, общие для оперативной таблицы и архива
+READING_COLUMNS = ("id", "counter_id", "value", "reading_date", "created_at")
+
+ColumnsFilter = Callable[[object], Sequence]
+
+def counter_by_id(counter_id: int) -> Select:
+    """Счетчик по ID"""
+    return select(Counter).where(Counter.id == counter_id)
+
+def counter_by_number(number: str) -> Select:
+    """Счетчик по номеру"""
+    return select(Counter).where(Counter.number == number)
+
+def all_counters() -> Select:
+    """Все счетчики"""
+    return select(Counter)
+
+def counters_by_type(water_type: str) -> Select:
+    """Счетчики по типу воды"""
+    return select(Counter).where(Counter.water_type == water_type)
+
+def counters_by_property(property_id: int) -> Select:
+    """Счетчики объекта"""
+    return select(Counter).where(Counter.property_id == property_id)
+
+def reading_history(where: Optional[ColumnsFilter] = None,
+                    order_by: Optional[ColumnsFilter] = None,
+                    limit: Optional[int] = None) -> Subquery:
+    """Показания обоих уровней хранения (readings и readings_archive)
+    
+    where и order_by - функции от колонок таблицы, возвращающие условия
+    и порядок. Условия (и порядок с limit) применяются в каждой ветви
+    UNION ALL отдельно, чтобы работали индексы обеих таблиц; итоговый
+    порядок задает внешний запрос.
+    """
+    branches = []
+    for table in (Reading.__table__, ReadingArchive.__table__):
+        branch = select(*(table.c[name] for name in READING_COLUMNS))
+        if where is not None:
+            branch = branch.where(*where(table.c))
+        if order_by is not None and limit is not None:
+            branch = select(branch.order_by(*order_by(table.c)).limit(limit).subquery())
+        branches.append(branch)
+    return union_all(*branches).subquery("reading_history")
+
+def _history_readings(where: Optional[ColumnsFilter] = None,
+                      order_by: Optional[ColumnsFilter] = None,
+                      limit: Optional[int] = None) -> Select:
+    """Показания обоих уровней хранения как объекты Reading"""
+    history = reading_history(where, order_by, limit)
+    query = select(aliased(Reading, history))
+    if order_by is not None:
+        query = query.order_by(*order_by(history.c))
+    if limit is not None:
+        query = query.limit(limit)
+    return query
+
+def reading_by_id(reading_id: int) -> Select:
+    """Показание по ID"""
+    return _history_readings(lambda c: [c.id == reading_id])
+
+def readings_by_counter(counter_id: int, limit: int) -> Select:
+    """Последние показания счетчика"""
+    return _history_readings(
+        lambda c: [c.counter_id == counter_id],
+        lambda c: [desc(c.reading_date), desc(c.id)],
+        limit
+    )
+
+def latest_reading_by_counter(counter_id: int) -> Select:
+    """Последнее показание счетчика"""
+    return readings_by_counter(counter_id, 1)
+
+def latest_values(counter_ids: Optional[Iterable[int]] = None) -> Select:
+    """Счетчики с последним показанием из снимка: (id, value, reading_date)"""
+    latest = CounterLatestReading
+    query = select(Counter.id, latest.value, latest.reading_date)\
+        .outerjoin(latest, latest.counter_id == Counter.id)\
+        .order_by(Counter.id)
+    if counter_ids is not None:
+        query = query.where(Counter.id.in_(list(counter_ids)))
+    return query
+
+def latest_reading_by_date(counter_id: int, target_date: datetime) -> Select:
+    """Последнее показание счетчика не позже даты"""
+    return _history_readings(
+        lambda c: [c.counter_id == counter_id, c.reading_date <= target_date],
+        lambda c: [desc(c.reading_date), desc(c.id)],
+        1
+    )
+
+def readings_by_date_range(start_date: datetime, end_date: datetime) -> Select:
+    """Показания за период"""
+    return _history_readings(
+        lambda c: [c.reading_date >= start_date, c.reading_date <= end_date],
+        lambda c: [c.reading_date, c.id]
+    )
+
+def readings_page(counter_id: Optional[int], before: Optional[Tuple[datetime, int]], limit: int) -> Select:
+    """Страница показаний, новые первыми, после курсора (reading_date, id)"""
+    def where(c):
+        conditions = []
+        if counter_id is not None:
+            conditions.append(c.counter_id == counter_id)
+        if before is not None:
+            conditions.append(tuple_(c.reading_date, c.id) < before)
+        return conditions
+    
+    return _history_readings(where, lambda c: [desc(c.reading_date), desc(c.id)], limit + 1)
+
+def alerts_page(counter_id: Optional[int], kind: Optional[str],
+                before: Optional[Tuple[datetime, int]], limit: int) -> Select:
+    """Страница оповещений об аномалиях, новые первыми, после курсора (reading_date, id)"""
+    query = select(CounterAlert)
+    if counter_id is not None:
+        query = query.where(CounterAlert.counter_id == counter_id)
+    if kind is not None:
+        query = query.where(CounterAlert.kind == kind)
+    if before is not None:
+        query = query.where(tuple_(CounterAlert.reading_date, CounterAlert.id) < before)
+    return query.order_by(desc(CounterAlert.reading_date), desc(CounterAlert.id)).limit(limit + 1)
+
+def current_tariff(service_type: str) -> Select:
+    """Действующий тариф для типа услуги"""
+    return select(Tariff)\
+        .where(Tariff.service_type == service_type)\
+        .where((Tariff.end_date.is_(None)) | (Tariff.end_date > datetime.now()))\
+        .order_by(desc(Tariff.start_date))\
+        .limit(1)
+
+def payment_by_id(payment_id: int) -> Select:
+    """Платеж по ID"""
+    return select(Payment).where(Payment.id == payment_id)
+
+def all_payments() -> Select:
+    """Все платежи, новые первыми"""
+    return select(Payment).order_by(desc(Payment.calculated_at))
+
+def payments_page(before: Optional[Tuple[datetime, int]], limit: int) -> Select:
+    """Страница платежей, новые первыми, после курсора (calculated_at, id)"""
+    query = select(Payment)
+    if before is not None:
+        query = query.where(tuple_(Payment.calculated_at, Payment.id) < before)
+    return query.order_by(desc(Payment.calculated_at), desc(Payment.id)).limit(limit + 1)
+
+def payments_by_year(year: int) -> Select:
+    """Платежи за год"""
+    start_date = datetime(year, 1, 1)
+    end_date = datetime(year, 12, 31, 23, 59, 59)
+    return select(Payment)\
+        .where(Payment.period_start >= start_date, Payment.period_start <= end_date)\
+        .order_by(Payment.period_start)
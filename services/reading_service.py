@@ -1,15 +1,63 @@
 from sqlalchemy.orm import Session
-from sqlalchemy import desc
-from typing import List, Optional, Dict, Tuple
-from datetime import datetime, date
-from models.entities import Reading, Counter
-from models.schemas import ReadingCreate, Reading as ReadingSchema
+from sqlalchemy import desc, select, insert, func, case, and_, tuple_, event
+from typing import Callable, List, NamedTuple, Optional, Dict, Sequence, Tuple
+from datetime import datetime, date, timedelta
+from models.entities import Reading, Counter, CounterMonthlyUsage
+from .usage_service import MonthlyUsageService
+from .anomaly_service import AnomalyService
+from .latest_service import LatestReadingService
+from .timeseries import ReadingSeriesStore
+from .consumption_matrix import (
+    ConsumptionMatrix, MATRIX_GROUPS, check_boundaries, sweep_boundary_values, series_boundary_values, build_matrix
+)
+from . import queries
+from .pagination import Page, Cursor, DEFAULT_PAGE_SIZE, build_page, reading_key
+from models.schemas import (
+    ReadingCreate, Reading as ReadingSchema, RejectedReading, BulkReadingReport,
+    CounterConsumption, ConsumptionAnomaly, MonthlyConsumption
+)
+
+def get_month_period(year: int, month: int) -> Tuple[datetime, datetime]:
+    """Границы месяца: первая и последняя секунда периода"""
+    period_start = datetime(year, month, 1)
+    if month == 12:
+        period_end = datetime(year + 1, 1, 1) - timedelta(seconds=1)
+    else:
+        period_end = datetime(year, month + 1, 1) - timedelta(seconds=1)
+    return period_start, period_end
+
+class BoundaryValues(NamedTuple):
+    """Граничные показания счетчика за месяц"""
+    id: int
+    number: str
+    water_type: str
+    property_id: Optional[int]
+    start_value: Optional[int]
+    end_value: Optional[int]
+    readings_count: Optional[int]
 
 class ReadingService:
-    """Сервис для работы с показаниями счетчиков"""
+    """Сервис для работы с показаниями счетчиков
     
-    def __init__(self, db: Session):
+    Если передано хранилище series, расчеты потребления и история
+    показаний счетчика берутся из него без запросов к таблице показаний,
+    а новые показания добавляются в него после коммита транзакции, в
+    которой они записаны; откаченные показания в хранилище не попадают.
+    """
+    
+    def __init__(self, db: Session, series: Optional[ReadingSeriesStore] = None):
         self.db = db
+        self.series = series
+        self.usage_service = MonthlyUsageService(db)
+        self.anomaly_service = AnomalyService(db)
+        self.latest_service = LatestReadingService(db)
+        # Получатели измененных строк помесячного потребления (например, прогноз)
+        self.usage_listeners: List[Callable[[List[Dict]], None]] = []
+        # Показания текущей транзакции, которые ждут коммита для series
+        self._pending_series: List[Dict] = []
+        if series is not None:
+            event.listen(db, "after_commit", self._apply_pending_series)
+            event.listen(db, "after_transaction_end", self._discard_pending_series)
     
     def create_reading(self, reading: ReadingCreate) -> Reading:
         """Создание нового показания"""
@@ -19,98 +67,376 @@ class ReadingService:
             reading_date=reading.reading_date
         )
         self.db.add(db_reading)
+        self.db.flush()
+        self._after_insert([{
+            "counter_id": db_reading.counter_id,
+            "value": db_reading.value,
+            "reading_date": db_reading.reading_date,
+        }])
         self.db.commit()
         self.db.refresh(db_reading)
         return db_reading
     
+    def create_readings_bulk(self, readings: List[ReadingCreate]) -> BulkReadingReport:
+        """Пакетное создание показаний в одной транзакции
+        
+        Последние показания всех счетчиков пакета загружаются одним запросом,
+        дальше каждое показание проверяется относительно последнего принятого
+        значения своего счетчика. Принятые показания вставляются одним
+        executemany и фиксируются одним коммитом.
+        """
+        latest = self._get_latest_values({reading.counter_id for reading in readings})
+        
+        rows = []
+        rejected_rows = []
+        for index, reading in enumerate(readings):
+            if reading.counter_id not in latest:
+                accepted, message = False, f"Счетчик {reading.counter_id} не найден"
+            elif latest[reading.counter_id] is None:
+                accepted, message = True, "OK"
+            else:
+                last_value, last_date = latest[reading.counter_id]
+                accepted, message = self._check_reading(reading.value, reading.reading_date, last_value, last_date)
+            
+            if not accepted:
+                rejected_rows.append(RejectedReading(
+                    index=index,
+                    counter_id=reading.counter_id,
+                    message=message
+                ))
+                continue
+            
+            rows.append({
+                "counter_id": reading.counter_id,
+                "value": reading.value,
+                "reading_date": reading.reading_date,
+            })
+            latest[reading.counter_id] = (reading.value, reading.reading_date)
+        
+        if rows:
+            # Core insert по таблице идет через executemany без ORM-слоя
+            self.db.execute(insert(Reading.__table__), rows)
+            self._after_insert(rows)
+        self.db.commit()
+        
+        return BulkReadingReport(
+            accepted=len(rows),
+            rejected=len(rejected_rows),
+            rejected_rows=rejected_rows
+        )
+    
+    def _after_insert(self, rows: List[Dict]):
+        """Обновление производных данных после вставки показаний (в той же транзакции)"""
+        usage_rows = self.usage_service.apply_readings(rows)
+        self.latest_service.apply_readings(rows)
+        self.anomaly_service.apply_readings(rows)
+        if self.series is not None:
+            self._pending_series.extend(rows)
+        for listener in self.usage_listeners:
+            listener(usage_rows)
+    
+    def _apply_pending_series(self, session: Session):
+        """Перенос показаний зафиксированной транзакции в series"""
+        if self._pending_series:
+            self.series.add_readings(self._pending_series)
+            self._pending_series = []
+    
+    def _discard_pending_series(self, session: Session, transaction):
+        """Сброс показаний транзакции, завершенной без коммита"""
+        if transaction.parent is None:
+            self._pending_series = []
+    
+    def _get_latest_values(self, counter_ids) -> Dict[int, Optional[Tuple[int, datetime]]]:
+        """Последние показания (значение, дата) для набора счетчиков одним запросом
+        
+        В результат попадают только существующие счетчики; для счетчиков
+        без показаний значение None.
+        """
+        if not counter_ids:
+            return {}
+        return self.latest_service.get_latest_values(counter_ids)
+    
+    def get_latest_values(self) -> Dict[int, Optional[Tuple[int, datetime]]]:
+        """Последние показания (значение, дата) всех счетчиков одним запросом"""
+        return self.latest_service.get_latest_values()
+    
     def get_reading(self, reading_id: int) -> Optional[Reading]:
         """Получение показания по ID"""
-        return self.db.query(Reading).filter(Reading.id == reading_id).first()
+        return self.db.scalars(queries.reading_by_id(reading_id)).first()
     
     def get_readings_by_counter(self, counter_id: int, limit: int = 10) -> List[Reading]:
         """Получение последних показаний для счетчика"""
-        return self.db.query(Reading)\
-            .filter(Reading.counter_id == counter_id)\
-            .order_by(desc(Reading.reading_date))\
-            .limit(limit)\
-            .all()
+        return list(self.db.scalars(queries.readings_by_counter(counter_id, limit)))
+    
+    def get_readings_page(self, counter_id: Optional[int] = None, cursor: Optional[Cursor] = None,
+                          limit: int = DEFAULT_PAGE_SIZE) -> Page[Reading]:
+        """Страница показаний (всех или одного счетчика), новые первыми
+        
+        cursor - next_cursor предыдущей страницы, None для первой страницы.
+        """
+        rows = list(self.db.scalars(queries.readings_page(counter_id, cursor, limit)))
+        return build_page(rows, limit, reading_key)
+    
+    def get_counter_history(self, counter_id: int, start_date: Optional[datetime] = None,
+                            end_date: Optional[datetime] = None) -> List[Tuple[datetime, int]]:
+        """Показания счетчика за период парами (дата, значение) в порядке дат"""
+        if self.series is not None:
+            series = self.series.get(counter_id)
+            return series.history(start_date, end_date) if series is not None else []
+        
+        def where(c):
+            conditions = [c.counter_id == counter_id]
+            if start_date is not None:
+                conditions.append(c.reading_date >= start_date)
+            if end_date is not None:
+                conditions.append(c.reading_date <= end_date)
+            return conditions
+        
+        history = queries.reading_history(where)
+        query = select(history.c.reading_date, history.c.value).order_by(history.c.reading_date, history.c.id)
+        return [tuple(row) for row in self.db.execute(query)]
     
     def get_latest_reading_by_counter(self, counter_id: int) -> Optional[Reading]:
         """Получение последнего показания для счетчика"""
-        return self.db.query(Reading)\
-            .filter(Reading.counter_id == counter_id)\
-            .order_by(desc(Reading.reading_date))\
-            .first()
+        return self.db.scalars(queries.latest_reading_by_counter(counter_id)).first()
     
     def get_readings_by_date_range(self, start_date: datetime, end_date: datetime) -> List[Reading]:
         """Получение показаний за период"""
-        return self.db.query(Reading)\
-            .filter(Reading.reading_date >= start_date, Reading.reading_date <= end_date)\
-            .order_by(Reading.reading_date)\
-            .all()
+        return list(self.db.scalars(queries.readings_by_date_range(start_date, end_date)))
     
-    def get_monthly_consumption(self, year: int, month: int) -> Dict[str, int]:
-        """Расчет потребления как разница двух последних показаний по каждому счетчику"""
-        # Получаем все счетчики
-        counters = self.db.query(Counter).all()
+    def get_monthly_consumption(self, year: int, month: int,
+                                property_id: Optional[int] = None) -> Dict[str, int]:
+        """Расчет потребления за месяц по типам воды"""
+        report = self.calculate_monthly_consumption(year, month, property_id)
+        return {"hot": report.hot, "cold": report.cold}
+    
+    def calculate_monthly_consumption(self, year: int, month: int,
+                                      property_id: Optional[int] = None) -> MonthlyConsumption:
+        """Расчет потребления за месяц по всем счетчикам одним запросом
+        
+        Потребление счетчика - разница между последним показанием в месяце
+        и последним показанием до начала месяца (если его нет - первым
+        показанием в месяце). Данные берутся из таблицы помесячного
+        потребления. Если указан property_id, учитываются только счетчики
+        этого объекта.
+        """
+        period_start, period_end = get_month_period(year, month)
+        if self.series is not None:
+            rows = self._series_boundary_values(period_start, period_end, property_id)
+        else:
+            query = self._monthly_consumption_query(year, month)
+            if property_id is not None:
+                query = query.where(Counter.property_id == property_id)
+            rows = self.db.execute(query).all()
         
+        report = MonthlyConsumption(period_start=period_start, period_end=period_end, property_id=property_id)
         consumption = {"hot": 0, "cold": 0}
         
-        for counter in counters:
-            # Берем два последних показания по дате
-            last_two = self.db.query(Reading)\
-                .filter(Reading.counter_id == counter.id)\
-                .order_by(desc(Reading.reading_date))\
-                .limit(2)\
-                .all()
-
-            if len(last_two) == 2:
-                last_reading, previous_reading = last_two[0], last_two[1]
-                diff = last_reading.value - previous_reading.value
-                if diff >= 0:
-                    consumption[counter.water_type] += diff
-                else:
-                    print(f"⚠️ Внимание: Показания счетчика {counter.number} уменьшились. Проверьте данные.")
-            else:
-                print(f"⚠️ Внимание: Для счетчика {counter.number} недостаточно данных (нужно минимум два показания)")
+        for row in rows:
+            counter_consumption = CounterConsumption(
+                counter_id=row.id,
+                number=row.number,
+                water_type=row.water_type,
+                property_id=row.property_id,
+                start_value=row.start_value,
+                end_value=row.end_value
+            )
+            report.counters.append(counter_consumption)
+            
+            if not row.readings_count or row.readings_count < 2:
+                report.anomalies.append(ConsumptionAnomaly(
+                    counter_id=row.id,
+                    number=row.number,
+                    kind="insufficient_data",
+                    message=f"Для счетчика {row.number} недостаточно данных (нужно минимум два показания)"
+                ))
+                continue
+            
+            diff = row.end_value - row.start_value
+            if diff < 0:
+                report.anomalies.append(ConsumptionAnomaly(
+                    counter_id=row.id,
+                    number=row.number,
+                    kind="negative_delta",
+                    message=f"Показания счетчика {row.number} уменьшились. Проверьте данные."
+                ))
+                continue
+            
+            counter_consumption.consumption = diff
+            consumption[row.water_type] += diff
         
-        return consumption
+        report.hot = consumption["hot"]
+        report.cold = consumption["cold"]
+        return report
+    
+    def _monthly_consumption_query(self, year: int, month: int):
+        """Запрос граничных показаний всех счетчиков за месяц
+        
+        Для каждого счетчика берется последняя строка помесячного потребления
+        не позже месяца: если она за этот месяц, потребление уже посчитано,
+        иначе показаний в месяце не было и потребление нулевое.
+        """
+        usage = CounterMonthlyUsage
+        ranked = select(
+            usage.counter_id,
+            usage.year,
+            usage.month,
+            usage.last_value,
+            usage.consumption,
+            func.row_number().over(
+                partition_by=usage.counter_id,
+                order_by=(desc(usage.year), desc(usage.month))
+            ).label("rn"),
+            func.sum(usage.readings_count).over(partition_by=usage.counter_id).label("readings_count"),
+        ).where(tuple_(usage.year, usage.month) <= (year, month)).subquery()
+        latest = select(ranked).where(ranked.c.rn == 1).subquery()
+        
+        in_month = and_(latest.c.year == year, latest.c.month == month)
+        return select(
+            Counter.id,
+            Counter.number,
+            Counter.water_type,
+            Counter.property_id,
+            case((in_month, latest.c.last_value - latest.c.consumption), else_=latest.c.last_value).label("start_value"),
+            latest.c.last_value.label("end_value"),
+            latest.c.readings_count,
+        ).outerjoin(latest, latest.c.counter_id == Counter.id).order_by(Counter.id)
+    
+    def _series_boundary_values(self, period_start: datetime, period_end: datetime,
+                                property_id: Optional[int] = None) -> List[BoundaryValues]:
+        """Граничные показания месяца по хранилищу рядов (как _monthly_consumption_query)"""
+        query = select(Counter.id, Counter.number, Counter.water_type, Counter.property_id).order_by(Counter.id)
+        if property_id is not None:
+            query = query.where(Counter.property_id == property_id)
+        
+        rows = []
+        for counter in self.db.execute(query):
+            series = self.series.get(counter.id)
+            lo, hi = series.bounds(period_start, period_end) if series is not None else (0, 0)
+            if not hi:
+                rows.append(BoundaryValues(*counter, None, None, None))
+            elif lo == hi:
+                # Показаний в месяце нет, потребление нулевое
+                rows.append(BoundaryValues(*counter, series.values[hi - 1], series.values[hi - 1], hi))
+            else:
+                start_value = series.values[lo - 1] if lo else series.values[lo]
+                rows.append(BoundaryValues(*counter, start_value, series.values[hi - 1], hi))
+        return rows
     
     def get_latest_reading_by_date(self, counter_id: int, target_date: datetime) -> Optional[Reading]:
         """Получение последнего показания до указанной даты"""
-        return self.db.query(Reading)\
-            .filter(Reading.counter_id == counter_id, Reading.reading_date <= target_date)\
-            .order_by(desc(Reading.reading_date))\
-            .first()
+        return self.db.scalars(queries.latest_reading_by_date(counter_id, target_date)).first()
     
     def validate_reading(self, counter_id: int, value: int, reading_date: datetime) -> Tuple[bool, str]:
         """Валидация показания"""
-        # Получаем последнее показание для этого счетчика
-        latest_reading = self.get_latest_reading_by_counter(counter_id)
+        # Получаем последнее показание для этого счетчика из снимка
+        latest = self._get_latest_values([counter_id]).get(counter_id)
         
-        if latest_reading:
-            # Проверяем, что новое показание больше предыдущего
-            if value < latest_reading.value:
-                return False, f"Новое показание ({value}) меньше предыдущего ({latest_reading.value})"
-            
-            # Проверяем, что дата показания не раньше предыдущего
-            if reading_date < latest_reading.reading_date:
-                return False, f"Дата показания ({reading_date}) раньше предыдущего ({latest_reading.reading_date})"
+        if latest:
+            return self._check_reading(value, reading_date, *latest)
+        
+        return True, "OK"
+    
+    @staticmethod
+    def _check_reading(value: int, reading_date: datetime,
+                       latest_value: int, latest_date: datetime) -> Tuple[bool, str]:
+        """Проверка показания относительно последнего известного"""
+        # Проверяем, что новое показание больше предыдущего
+        if value < latest_value:
+            return False, f"Новое показание ({value}) меньше предыдущего ({latest_value})"
+        
+        # Проверяем, что дата показания не раньше предыдущего
+        if reading_date < latest_date:
+            return False, f"Дата показания ({reading_date}) раньше предыдущего ({latest_date})"
         
         return True, "OK"
     
     def get_consumption_for_period(self, start_date: datetime, end_date: datetime) -> Dict[str, int]:
         """Расчет потребления за период"""
-        counters = self.db.query(Counter).all()
+        if self.series is not None:
+            start_values = self.series.values_at(start_date)
+            end_values = self.series.values_at(end_date)
+        else:
+            start_values = self._get_values_at(start_date)
+            end_values = self._get_values_at(end_date)
         consumption = {"hot": 0, "cold": 0}
         
-        for counter in counters:
-            start_reading = self.get_latest_reading_by_date(counter.id, start_date)
-            end_reading = self.get_latest_reading_by_date(counter.id, end_date)
-            
-            if start_reading and end_reading:
-                diff = end_reading.value - start_reading.value
+        for counter_id, water_type in self.db.execute(select(Counter.id, Counter.water_type)):
+            if counter_id in start_values and counter_id in end_values:
+                diff = end_values[counter_id] - start_values[counter_id]
                 if diff >= 0:
-                    consumption[counter.water_type] += diff
+                    consumption[water_type] += diff
         
         return consumption
+    
+    def get_consumption_matrix(self, boundaries: Sequence[datetime],
+                               group_by: Optional[str] = None,
+                               batch_size: int = 10000) -> ConsumptionMatrix:
+        """Потребление за много периодов одним проходом по показаниям
+        
+        boundaries - границы периодов по возрастанию (n + 1 граница на
+        n периодов). Без group_by строки матрицы - счетчики, иначе суммы
+        по "water_type" или "property". Показания до последней границы
+        читаются одним упорядоченным запросом (или берутся из хранилища
+        series), показания на границах находятся слиянием с их списком.
+        """
+        boundaries = check_boundaries(boundaries)
+        if group_by is not None and group_by not in MATRIX_GROUPS:
+            raise ValueError(f"Неизвестная группировка: {group_by}")
+        
+        counters = self.db.execute(
+            select(Counter.id, Counter.water_type, Counter.property_id).order_by(Counter.id)
+        ).all()
+        rows = {counter.id: position for position, counter in enumerate(counters)}
+        
+        if self.series is not None:
+            values, known = series_boundary_values(self.series, rows, boundaries)
+        else:
+            history = queries.reading_history(lambda c: [c.reading_date <= boundaries[-1]])
+            readings = self.db.connection().execute(
+                select(history.c.counter_id, history.c.reading_date, history.c.value)
+                .order_by(history.c.counter_id, history.c.reading_date, history.c.id)
+                .execution_options(yield_per=batch_size)
+            )
+            values, known = sweep_boundary_values(readings, rows, boundaries)
+        
+        return build_matrix(counters, values, known, boundaries, group_by)
+    
+    def _get_values_at(self, moment: datetime) -> Dict[int, int]:
+        """Показания всех счетчиков на момент moment (последние не позже него)
+        
+        Полные месяцы берутся из таблицы помесячного потребления, сырые
+        показания читаются только за неполный месяц moment.
+        """
+        month_start = datetime(moment.year, moment.month, 1)
+        history = queries.reading_history(lambda c: [c.reading_date >= month_start, c.reading_date <= moment])
+        ranked = select(
+            history.c.counter_id,
+            history.c.value,
+            func.row_number().over(
+                partition_by=history.c.counter_id,
+                order_by=(desc(history.c.reading_date), desc(history.c.id))
+            ).label("rn"),
+        ).subquery()
+        values = {
+            counter_id: value
+            for counter_id, value in self.db.execute(
+                select(ranked.c.counter_id, ranked.c.value).where(ranked.c.rn == 1)
+            )
+        }
+        
+        usage = CounterMonthlyUsage
+        ranked = select(
+            usage.counter_id,
+            usage.last_value,
+            func.row_number().over(
+                partition_by=usage.counter_id,
+                order_by=(desc(usage.year), desc(usage.month))
+            ).label("rn"),
+        ).where(tuple_(usage.year, usage.month) < (moment.year, moment.month)).subquery()
+        for counter_id, value in self.db.execute(
+            select(ranked.c.counter_id, ranked.c.last_value).where(ranked.c.rn == 1)
+        ):
+            values.setdefault(counter_id, value)
+        
+        return values
@@ -0,0 +1,93 @@
+from bisect import bisect_right
+from datetime import datetime
+from typing import Dict, List, Optional, Sequence
+from sqlalchemy import select
+from sqlalchemy.orm import Session
+from models.entities import Tariff
+
+class TariffIntervals:
+    """Отсортированные интервалы действия тарифов одной услуги"""
+    
+    __slots__ = ("starts", "ends", "prices")
+    
+    def __init__(self):
+        self.starts: List[datetime] = []
+        self.ends: List[Optional[datetime]] = []
+        self.prices: List[float] = []
+    
+    def append(self, start: datetime, end: Optional[datetime], price: float):
+        """Добавление интервала (вызывается в порядке возрастания start)"""
+        self.starts.append(start)
+        self.ends.append(end)
+        self.prices.append(price)
+    
+    def find(self, moment: datetime, fallback_to_earliest: bool = False) -> Optional[int]:
+        """Номер интервала, действующего в момент moment, или None
+        
+        С fallback_to_earliest моменты до начала истории тарифов
+        относятся к самому раннему тарифу.
+        """
+        position = bisect_right(self.starts, moment) - 1
+        if position < 0:
+            return 0 if fallback_to_earliest else None
+        end = self.ends[position]
+        if end is not None and moment >= end:
+            return None
+        return position
+
+class TariffIndex:
+    """Индекс тарифов в памяти
+    
+    Таблица тарифов загружается одним запросом и раскладывается по типам
+    услуг в отсортированные массивы интервалов. Цена на момент времени
+    ищется бинарным поиском. После изменения тарифов индекс нужно
+    сбросить через invalidate(), следующий запрос загрузит его заново.
+    """
+    
+    def __init__(self, db: Session):
+        self.db = db
+        self._intervals: Optional[Dict[str, TariffIntervals]] = None
+    
+    def invalidate(self):
+        """Сброс индекса после изменения тарифов"""
+        self._intervals = None
+    
+    def _get_intervals(self, service_type: str) -> Optional[TariffIntervals]:
+        """Интервалы услуги, при необходимости загружает индекс"""
+        if self._intervals is None:
+            self._intervals = self._load()
+        return self._intervals.get(service_type)
+    
+    def _load(self) -> Dict[str, TariffIntervals]:
+        """Загрузка всех тарифов одним запросом"""
+        rows = self.db.execute(
+            select(Tariff.service_type, Tariff.start_date, Tariff.end_date, Tariff.price_per_cubic_meter)
+            .order_by(Tariff.service_type, Tariff.start_date, Tariff.id)
+        ).all()
+        
+        intervals: Dict[str, TariffIntervals] = {}
+        for service_type, start_date, end_date, price in rows:
+            intervals.setdefault(service_type, TariffIntervals()).append(start_date, end_date, price)
+        return intervals
+    
+    def get_price(self, service_type: str, moment: datetime,
+                  fallback_to_earliest: bool = False) -> Optional[float]:
+        """Цена услуги, действовавшая в момент moment"""
+        intervals = self._get_intervals(service_type)
+        if intervals is None:
+            return None
+        position = intervals.find(moment, fallback_to_earliest)
+        return intervals.prices[position] if position is not None else None
+    
+    def get_prices(self, service_type: str, moments: Sequence[datetime],
+                   fallback_to_earliest: bool = False) -> List[Optional[float]]:
+        """Цены услуги для набора моментов времени"""
+        intervals = self._get_intervals(service_type)
+        if intervals is None:
+            return [None] * len(moments)
+        
+        prices = []
+        for moment in moments:
+            position = intervals.find(moment, fallback_to_earliest)
+            prices.append(intervals.prices[position] if position is not None else None)
+        return prices
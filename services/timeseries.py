@@ -0,0 +1,179 @@
+"""Компактное хранилище истории показаний в памяти
+
+Показания каждого счетчика лежат в двух непрерывных буферах array:
+моменты (микросекунды от начала эпохи) и значения, по 16 байт на
+показание вместо ORM-объекта с identity map. Буферы упорядочены по
+дате, поэтому диапазон дат находится бинарным поиском, а срезы
+отдаются массивами NumPy для векторных расчетов.
+
+Хранилище загружается одним Core-запросом и обновляется через
+add_readings(); ReadingService делает это сам после коммита записи, если
+хранилище передано ему в конструктор.
+"""
+from array import array
+from bisect import bisect_left, bisect_right
+from datetime import datetime, timedelta
+from typing import Dict, Iterable, Iterator, List, Optional, Tuple
+import numpy as np
+from sqlalchemy import select
+from sqlalchemy.orm import Session
+from . import queries
+
+DEFAULT_BATCH_SIZE = 10000
+
+EPOCH = datetime(1970, 1, 1)
+MICROSECOND = timedelta(microseconds=1)
+
+def to_timestamp(moment: datetime) -> int:
+    """Момент в микросекундах от начала эпохи (даты без часового пояса)"""
+    return (moment - EPOCH) // MICROSECOND
+
+def from_timestamp(timestamp: int) -> datetime:
+    """Обратное преобразование to_timestamp"""
+    return EPOCH + timedelta(microseconds=int(timestamp))
+
+class CounterSeries:
+    """Показания одного счетчика в порядке дат
+    
+    При равных датах показания идут в порядке добавления, как при
+    сортировке по (reading_date, id).
+    """
+    
+    __slots__ = ("counter_id", "timestamps", "values")
+    
+    def __init__(self, counter_id: int):
+        self.counter_id = counter_id
+        self.timestamps = array("q")
+        self.values = array("q")
+    
+    def __len__(self) -> int:
+        return len(self.values)
+    
+    def append(self, reading_date: datetime, value: int):
+        """Добавление показания, задним числом - со сдвигом хвоста"""
+        timestamp = to_timestamp(reading_date)
+        if not self.timestamps or timestamp >= self.timestamps[-1]:
+            self.timestamps.append(timestamp)
+            self.values.append(value)
+            return
+        position = bisect_right(self.timestamps, timestamp)
+        self.timestamps.insert(position, timestamp)
+        self.values.insert(position, value)
+    
+    def bounds(self, start_date: Optional[datetime] = None,
+               end_date: Optional[datetime] = None) -> Tuple[int, int]:
+        """Границы [lo, hi) показаний с start_date по end_date включительно"""
+        lo = bisect_left(self.timestamps, to_timestamp(start_date)) if start_date is not None else 0
+        hi = bisect_right(self.timestamps, to_timestamp(end_date)) if end_date is not None else len(self)
+        return lo, max(lo, hi)
+    
+    def value_at(self, moment: datetime) -> Optional[int]:
+        """Последнее показание не позже moment"""
+        position = bisect_right(self.timestamps, to_timestamp(moment))
+        return self.values[position - 1] if position else None
+    
+    def slice(self, start_date: Optional[datetime] = None,
+              end_date: Optional[datetime] = None) -> Tuple[np.ndarray, np.ndarray]:
+        """Моменты и значения за период (копии, буферы не блокируются)"""
+        lo, hi = self.bounds(start_date, end_date)
+        return (
+            np.frombuffer(self.timestamps[lo:hi], dtype=np.int64),
+            np.frombuffer(self.values[lo:hi], dtype=np.int64),
+        )
+    
+    def deltas(self, start_date: Optional[datetime] = None,
+               end_date: Optional[datetime] = None) -> np.ndarray:
+        """Разницы соседних показаний за период"""
+        return np.diff(self.slice(start_date, end_date)[1])
+    
+    def history(self, start_date: Optional[datetime] = None,
+                end_date: Optional[datetime] = None) -> List[Tuple[datetime, int]]:
+        """Показания за период парами (дата, значение)"""
+        lo, hi = self.bounds(start_date, end_date)
+        return [
+            (from_timestamp(timestamp), value)
+            for timestamp, value in zip(self.timestamps[lo:hi], self.values[lo:hi])
+        ]
+
+class ReadingSeriesStore:
+    """Ряды показаний счетчиков"""
+    
+    __slots__ = ("_series",)
+    
+    def __init__(self):
+        self._series: Dict[int, CounterSeries] = {}
+    
+    @classmethod
+    def load(cls, db: Session, counter_ids: Optional[Iterable[int]] = None,
+             batch_size: int = DEFAULT_BATCH_SIZE) -> "ReadingSeriesStore":
+        """Загрузка показаний (всех или указанных счетчиков) одним запросом
+        
+        Показания читаются из обоих уровней хранения, включая архив.
+        Строки читаются порциями и сразу раскладываются по буферам, поэтому
+        в памяти не держится ни результат запроса целиком, ни ORM-объекты.
+        """
+        if counter_ids is not None:
+            counter_ids = list(counter_ids)
+        history = queries.reading_history(
+            (lambda c: [c.counter_id.in_(counter_ids)]) if counter_ids is not None else None
+        )
+        query = (
+            select(history.c.counter_id, history.c.reading_date, history.c.value)
+            .order_by(history.c.counter_id, history.c.reading_date, history.c.id)
+            .execution_options(yield_per=batch_size)
+        )
+        
+        store = cls()
+        series = None
+        for partition in db.connection().execute(query).partitions():
+            for counter_id, reading_date, value in partition:
+                if series is None or series.counter_id != counter_id:
+                    series = store._series[counter_id] = CounterSeries(counter_id)
+                # Строки уже упорядочены по дате, вставка не нужна
+                series.timestamps.append(to_timestamp(reading_date))
+                series.values.append(value)
+        return store
+    
+    def __len__(self) -> int:
+        return len(self._series)
+    
+    def __contains__(self, counter_id: int) -> bool:
+        return counter_id in self._series
+    
+    def __iter__(self) -> Iterator[CounterSeries]:
+        return iter(self._series.values())
+    
+    def get(self, counter_id: int) -> Optional[CounterSeries]:
+        """Ряд счетчика или None, если показаний нет"""
+        return self._series.get(counter_id)
+    
+    @property
+    def readings_count(self) -> int:
+        """Число показаний всех счетчиков"""
+        return sum(len(series) for series in self._series.values())
+    
+    @property
+    def nbytes(self) -> int:
+        """Объем буферов показаний в байтах"""
+        return sum(
+            series.timestamps.buffer_info()[1] * series.timestamps.itemsize
+            + series.values.buffer_info()[1] * series.values.itemsize
+            for series in self._series.values()
+        )
+    
+    def add_readings(self, readings: Iterable[Dict]):
+        """Учет новых показаний (словари с counter_id, value, reading_date)"""
+        for reading in readings:
+            series = self._series.get(reading["counter_id"])
+            if series is None:
+                series = self._series[reading["counter_id"]] = CounterSeries(reading["counter_id"])
+            series.append(reading["reading_date"], reading["value"])
+    
+    def values_at(self, moment: datetime) -> Dict[int, int]:
+        """Показания всех счетчиков на момент moment (последние не позже него)"""
+        values = {}
+        for counter_id, series in self._series.items():
+            value = series.value_at(moment)
+            if value is not None:
+                values[counter_id] = value
+        return values
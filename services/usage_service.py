@@ -0,0 +1,244 @@
+from collections import defaultdict
+from datetime import datetime
+from typing import Dict, Iterable, Iterator, List, Tuple
+from sqlalchemy import select, delete, insert, update, func, desc, tuple_, bindparam
+from sqlalchemy.orm import Session
+from models.entities import CounterMonthlyUsage
+from . import queries
+
+MAX_VERIFY_MISMATCHES = 100
+
+# Поля строки помесячного потребления, которые сравниваются при проверке
+USAGE_FIELDS = ("first_value", "first_date", "last_value", "last_date", "readings_count", "consumption")
+
+def iter_monthly_usage(readings: Iterable[Tuple[int, int, datetime]]) -> Iterator[Dict]:
+    """Расчет строк помесячного потребления по потоку показаний
+    
+    Показания должны идти в порядке (counter_id, reading_date, id).
+    """
+    current = None
+    previous_last = None
+    for counter_id, value, reading_date in readings:
+        key = (counter_id, reading_date.year, reading_date.month)
+        if current is not None and (current["counter_id"], current["year"], current["month"]) == key:
+            current["last_value"] = value
+            current["last_date"] = reading_date
+            current["readings_count"] += 1
+            continue
+        
+        if current is not None:
+            current["consumption"] = current["last_value"] - _base_value(current, previous_last)
+            yield current
+            previous_last = current["last_value"] if current["counter_id"] == counter_id else None
+        
+        current = {
+            "counter_id": counter_id,
+            "year": reading_date.year,
+            "month": reading_date.month,
+            "first_value": value,
+            "first_date": reading_date,
+            "last_value": value,
+            "last_date": reading_date,
+            "readings_count": 1,
+        }
+    
+    if current is not None:
+        current["consumption"] = current["last_value"] - _base_value(current, previous_last)
+        yield current
+
+def _base_value(row: Dict, previous_last) -> int:
+    """База для расчета потребления месяца"""
+    return previous_last if previous_last is not None else row["first_value"]
+
+class MonthlyUsageService:
+    """Сервис таблицы помесячного потребления counter_monthly_usage
+    
+    При вставке показаний обновляются только затронутые месяцы счетчика
+    и следующий за ними месяц с данными, потребление которого зависит
+    от последнего показания предыдущего.
+    """
+    
+    def __init__(self, db: Session):
+        self.db = db
+    
+    def apply_readings(self, readings: List[Dict]) -> List[Dict]:
+        """Учет новых показаний (без коммита, в транзакции вставки)
+        
+        readings - словари с counter_id, value, reading_date в порядке вставки.
+        Возвращает добавленные и измененные строки помесячного потребления.
+        """
+        if not readings:
+            return []
+        
+        # Агрегируем пакет по (счетчик, год, месяц)
+        batch: Dict[Tuple[int, int, int], Dict] = {}
+        for reading in readings:
+            reading_date = reading["reading_date"]
+            key = (reading["counter_id"], reading_date.year, reading_date.month)
+            row = batch.get(key)
+            if row is None:
+                batch[key] = {
+                    "first_value": reading["value"], "first_date": reading_date,
+                    "last_value": reading["value"], "last_date": reading_date,
+                    "readings_count": 1,
+                }
+                continue
+            if reading_date < row["first_date"]:
+                row["first_value"], row["first_date"] = reading["value"], reading_date
+            if reading_date >= row["last_date"]:
+                row["last_value"], row["last_date"] = reading["value"], reading_date
+            row["readings_count"] += 1
+        
+        counter_ids = {key[0] for key in batch}
+        min_period = min((key[1], key[2]) for key in batch)
+        
+        # Строки затронутых счетчиков начиная с самого раннего месяца пакета
+        table = CounterMonthlyUsage.__table__
+        existing = self.db.execute(
+            select(table).where(
+                table.c.counter_id.in_(counter_ids),
+                tuple_(table.c.year, table.c.month) >= min_period
+            )
+        ).mappings()
+        chains: Dict[int, Dict[Tuple[int, int], Dict]] = defaultdict(dict)
+        for usage in existing:
+            chains[usage["counter_id"]][(usage["year"], usage["month"])] = dict(usage)
+        existing_keys = {
+            (counter_id, period) for counter_id, chain in chains.items() for period in chain
+        }
+        
+        previous_last = self._get_previous_last_values(counter_ids, min_period)
+        
+        for (counter_id, year, month), row in batch.items():
+            usage = chains[counter_id].get((year, month))
+            if usage is None:
+                chains[counter_id][(year, month)] = dict(
+                    row, counter_id=counter_id, year=year, month=month, consumption=None
+                )
+                continue
+            # При равных датах новое показание вставлено позже и становится последним
+            if row["first_date"] < usage["first_date"]:
+                usage["first_value"], usage["first_date"] = row["first_value"], row["first_date"]
+            if row["last_date"] >= usage["last_date"]:
+                usage["last_value"], usage["last_date"] = row["last_value"], row["last_date"]
+            usage["readings_count"] += row["readings_count"]
+        
+        # Пересчитываем потребление по цепочке месяцев каждого счетчика
+        new_rows, changed_rows = [], []
+        for counter_id, chain in chains.items():
+            last_value = previous_last.get(counter_id)
+            for period in sorted(chain):
+                usage = chain[period]
+                base = last_value if last_value is not None else usage["first_value"]
+                consumption = usage["last_value"] - base
+                last_value = usage["last_value"]
+                
+                if (counter_id, period) not in existing_keys:
+                    usage["consumption"] = consumption
+                    new_rows.append(usage)
+                elif (counter_id, *period) in batch or usage["consumption"] != consumption:
+                    usage["consumption"] = consumption
+                    changed_rows.append(usage)
+        
+        if new_rows:
+            self.db.execute(insert(table), new_rows)
+        if changed_rows:
+            self.db.execute(
+                update(table)
+                .where(
+                    table.c.counter_id == bindparam("b_counter_id"),
+                    table.c.year == bindparam("b_year"),
+                    table.c.month == bindparam("b_month")
+                )
+                .values({field: bindparam(field) for field in USAGE_FIELDS}),
+                [
+                    dict({field: usage[field] for field in USAGE_FIELDS},
+                         b_counter_id=usage["counter_id"], b_year=usage["year"], b_month=usage["month"])
+                    for usage in changed_rows
+                ]
+            )
+        return new_rows + changed_rows
+    
+    def _get_previous_last_values(self, counter_ids, period: Tuple[int, int]) -> Dict[int, int]:
+        """Последнее показание каждого счетчика до указанного месяца"""
+        ranked = select(
+            CounterMonthlyUsage.counter_id,
+            CounterMonthlyUsage.last_value,
+            func.row_number().over(
+                partition_by=CounterMonthlyUsage.counter_id,
+                order_by=(desc(CounterMonthlyUsage.year), desc(CounterMonthlyUsage.month))
+            ).label("rn"),
+        ).where(
+            CounterMonthlyUsage.counter_id.in_(counter_ids),
+            tuple_(CounterMonthlyUsage.year, CounterMonthlyUsage.month) < period
+        ).subquery()
+        
+        rows = self.db.execute(select(ranked.c.counter_id, ranked.c.last_value).where(ranked.c.rn == 1))
+        return {counter_id: last_value for counter_id, last_value in rows}
+    
+    def _iter_expected_usage(self) -> Iterator[Dict]:
+        """Строки помесячного потребления, рассчитанные по сырым показаниям"""
+        history = queries.reading_history()
+        readings = self.db.execute(
+            select(history.c.counter_id, history.c.value, history.c.reading_date)
+            .order_by(history.c.counter_id, history.c.reading_date, history.c.id)
+            .execution_options(yield_per=10000)
+        )
+        return iter_monthly_usage(readings)
+    
+    def rebuild(self, batch_size: int = 10000) -> int:
+        """Полный пересчет таблицы по сырым показаниям, возвращает число строк"""
+        self.db.execute(delete(CounterMonthlyUsage))
+        
+        total = 0
+        batch = []
+        for row in self._iter_expected_usage():
+            batch.append(row)
+            if len(batch) >= batch_size:
+                self.db.execute(insert(CounterMonthlyUsage.__table__), batch)
+                total += len(batch)
+                batch = []
+        if batch:
+            self.db.execute(insert(CounterMonthlyUsage.__table__), batch)
+            total += len(batch)
+        
+        self.db.commit()
+        return total
+    
+    def verify(self) -> List[str]:
+        """Сверка таблицы с сырыми показаниями, возвращает список расхождений"""
+        actual_rows = self.db.execute(
+            select(CounterMonthlyUsage)
+            .order_by(CounterMonthlyUsage.counter_id, CounterMonthlyUsage.year, CounterMonthlyUsage.month)
+            .execution_options(yield_per=10000)
+        ).scalars()
+        
+        mismatches = []
+        actual = next(actual_rows, None)
+        for expected in self._iter_expected_usage():
+            key = (expected["counter_id"], expected["year"], expected["month"])
+            
+            # Лишние строки таблицы, для которых нет показаний
+            while actual is not None and (actual.counter_id, actual.year, actual.month) < key:
+                mismatches.append(f"Счетчик {actual.counter_id}, {actual.month:02d}.{actual.year}: нет показаний")
+                actual = next(actual_rows, None)
+            
+            if actual is None or (actual.counter_id, actual.year, actual.month) != key:
+                mismatches.append(f"Счетчик {key[0]}, {key[2]:02d}.{key[1]}: строка отсутствует")
+            else:
+                for field in USAGE_FIELDS:
+                    if getattr(actual, field) != expected[field]:
+                        mismatches.append(
+                            f"Счетчик {key[0]}, {key[2]:02d}.{key[1]}: {field} = {getattr(actual, field)}, "
+                            f"ожидалось {expected[field]}"
+                        )
+                actual = next(actual_rows, None)
+            
+            if len(mismatches) >= MAX_VERIFY_MISMATCHES:
+                return mismatches[:MAX_VERIFY_MISMATCHES]
+        
+        while actual is not None and len(mismatches) < MAX_VERIFY_MISMATCHES:
+            mismatches.append(f"Счетчик {actual.counter_id}, {actual.month:02d}.{actual.year}: нет показаний")
+            actual = next(actual_rows, None)
+        
+        return mismatches
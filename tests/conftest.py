@@ -0,0 +1,67 @@
+"""Общие фикстуры тестов: пустая база на последней ревизии схемы"""
+import os
+import sys
+from datetime import datetime
+from typing import Dict, List
+
+import pytest
+from sqlalchemy import create_engine, insert
+from sqlalchemy.orm import sessionmaker
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from models.entities import Counter, Reading
+from models.migrations import ensure_schema
+from services.instrumentation import QueryInstrumentation, instrument_services
+
+@pytest.fixture
+def db(tmp_path):
+    """Сессия новой SQLite-базы, схема создается миграциями"""
+    engine = create_engine(f"sqlite:///{tmp_path / 'test.db'}")
+    ensure_schema(engine)
+    session = sessionmaker(bind=engine, autoflush=False)()
+    try:
+        yield session
+    finally:
+        session.close()
+        engine.dispose()
+
+@pytest.fixture
+def strict_queries(db):
+    """Строгий учет запросов сервисов в базе db
+    
+    Повтор одного запроса больше порога (N+1) или больше max_statements
+    запросов за вызов метода сервиса - исключение QueryBudgetExceeded.
+    """
+    instrumentation = instrument_services(QueryInstrumentation(target=db.get_bind(), strict=True))
+    try:
+        yield instrumentation
+    finally:
+        instrumentation.uninstall()
+
+@pytest.fixture
+def counter_ids(db) -> List[int]:
+    """Три счетчика без объекта"""
+    counters = [
+        Counter(number="ГВ-1", water_type="hot"),
+        Counter(number="ХВ-1", water_type="cold"),
+        Counter(number="ХВ-2", water_type="cold"),
+    ]
+    db.add_all(counters)
+    db.commit()
+    return [counter.id for counter in counters]
+
+def reading(counter_id: int, value: int, reading_date: datetime) -> Dict:
+    """Строка показания в формате сервисов учета"""
+    return {"counter_id": counter_id, "value": value, "reading_date": reading_date}
+
+def insert_readings(db, rows: List[Dict], *services):
+    """Вставка показаний без проверок и учет их сервисами в той же транзакции
+    
+    Повторяет ReadingService._after_insert, но допускает показания задним
+    числом, которые create_readings_bulk отклоняет.
+    """
+    db.execute(insert(Reading.__table__), rows)
+    for service in services:
+        service.apply_readings(rows)
+    db.commit()
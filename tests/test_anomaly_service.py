@@ -0,0 +1,56 @@
+"""Детектор аномалий: пересчет по истории против пошагового учета"""
+from datetime import datetime, timedelta
+
+from sqlalchemy import select
+
+from conftest import insert_readings, reading
+from models.entities import CounterAlert
+from services.anomaly_service import AnomalyService
+
+def daily_readings(counter_id, usages, start=datetime(2024, 1, 1)):
+    value = 100
+    rows = [reading(counter_id, value, start)]
+    for day, usage in enumerate(usages, 1):
+        value += usage
+        rows.append(reading(counter_id, value, start + timedelta(days=day)))
+    return rows
+
+def alert_rows(db):
+    return sorted(tuple(row) for row in db.execute(
+        select(CounterAlert.counter_id, CounterAlert.reading_date, CounterAlert.kind, CounterAlert.acknowledged)
+    ))
+
+def test_rebuild_replaces_alerts_and_keeps_acknowledgement(db, counter_ids):
+    service = AnomalyService(db)
+    hot, cold, _ = counter_ids
+    # Норма 1 м³/сут, затем скачок и утечка; на холодном счетчике откат
+    rows = daily_readings(hot, [1] * 20 + [5] * 4) + daily_readings(cold, [2] * 5 + [-3])
+    for offset in range(0, len(rows), 7):
+        insert_readings(db, rows[offset:offset + 7], service)
+    
+    incremental = alert_rows(db)
+    assert {kind for _, _, kind, _ in incremental} == {"spike", "leak", "regression"}
+    
+    first_alert = db.scalars(select(CounterAlert).order_by(CounterAlert.id)).first()
+    assert service.acknowledge_alert(first_alert.id)
+    expected = sorted(
+        (counter_id, reading_date, kind, (counter_id, reading_date, kind) == (
+            first_alert.counter_id, first_alert.reading_date, first_alert.kind))
+        for counter_id, reading_date, kind, _ in incremental
+    )
+    
+    # Повторный пересчет не добавляет дубликатов и не сбрасывает отметки
+    for _ in range(2):
+        assert service.rebuild(record_alerts=True) == (2, len(incremental))
+        assert alert_rows(db) == expected
+
+def test_needs_rebuild_after_history_without_stats(db, counter_ids):
+    service = AnomalyService(db)
+    assert not service.needs_rebuild()
+    
+    # Показания, записанные до появления детектора (миграция 0006)
+    insert_readings(db, daily_readings(counter_ids[0], [1] * 3))
+    assert service.needs_rebuild()
+    
+    service.rebuild()
+    assert not service.needs_rebuild()
@@ -0,0 +1,98 @@
+"""Архив показаний: чтение через оба уровня совпадает с историей до архивации"""
+from datetime import datetime, timedelta
+
+from sqlalchemy import func, select
+
+from models.entities import Reading, ReadingArchive
+from models.schemas import ReadingCreate
+from services.anomaly_service import AnomalyService
+from services.archive_service import ReadingArchiveService
+from services.export_service import ExportService
+from services.latest_service import LatestReadingService
+from services.reading_service import ReadingService
+from services.timeseries import ReadingSeriesStore
+from services.usage_service import MonthlyUsageService
+
+BOUNDARIES = [datetime(2023, month, 1) for month in range(1, 13)] + \
+    [datetime(2024, month, 1) for month in range(1, 13)] + [datetime(2025, 1, 1)]
+
+def generate_readings(counter_ids):
+    """Два года показаний, по три в месяц; два из них с одной датой"""
+    readings = []
+    for position, counter_id in enumerate(counter_ids):
+        value = 100 * position
+        for month_start in BOUNDARIES[:-1]:
+            for day in (3, 17, 17):
+                value += day % 5 + position
+                readings.append(ReadingCreate(
+                    counter_id=counter_id, value=value,
+                    reading_date=month_start + timedelta(days=day - 1, hours=position)
+                ))
+    return readings
+
+def read_everything(db, counter_ids):
+    """Результаты всех путей чтения истории"""
+    reading_service = ReadingService(db)
+    pages = []
+    page = reading_service.get_readings_page(limit=40)
+    while True:
+        pages.extend((item.id, item.value, item.reading_date) for item in page.items)
+        if page.next_cursor is None:
+            break
+        page = reading_service.get_readings_page(cursor=page.next_cursor, limit=40)
+    
+    store = ReadingSeriesStore.load(db)
+    return {
+        "history": [reading_service.get_counter_history(counter_id) for counter_id in counter_ids],
+        "history_range": reading_service.get_counter_history(
+            counter_ids[1], datetime(2023, 3, 10), datetime(2023, 9, 20)
+        ),
+        "pages": pages,
+        "by_counter": [
+            (item.id, item.value) for item in reading_service.get_readings_by_counter(counter_ids[0], 50)
+        ],
+        "by_date": [item.id for item in reading_service.get_readings_by_date_range(
+            datetime(2023, 2, 1), datetime(2023, 2, 28)
+        )],
+        "latest_by_date": reading_service.get_latest_reading_by_date(counter_ids[0], datetime(2023, 5, 10)).id,
+        "matrix": reading_service.get_consumption_matrix(BOUNDARIES).as_dict(),
+        "period": reading_service.get_consumption_for_period(datetime(2023, 2, 10), datetime(2024, 8, 10)),
+        "monthly": reading_service.calculate_monthly_consumption(2023, 4).model_dump(),
+        "export": [tuple(row) for row in db.execute(ExportService(db).build_query("readings"))],
+        "store": [store.get(counter_id).history() for counter_id in counter_ids],
+        "anomaly_rebuild": AnomalyService(db).rebuild(),
+    }
+
+def test_archive_keeps_history_readable(db, counter_ids):
+    ReadingService(db).create_readings_bulk(generate_readings(counter_ids))
+    before = read_everything(db, counter_ids)
+    total = db.scalar(select(func.count()).select_from(Reading))
+    max_id = db.scalar(select(func.max(Reading.id)))
+    
+    service = ReadingArchiveService(db, batch_size=25)
+    report = service.archive(datetime(2024, 7, 1))
+    
+    # Из 18 месяцев каждого счетчика в оперативной таблице остается последнее показание месяца
+    assert report.archived == len(counter_ids) * 18 * 2
+    assert report.batches == -(-report.archived // 25)
+    assert service.get_archived_count() == report.archived
+    assert db.scalar(select(func.count()).select_from(Reading)) == total - report.archived
+    assert db.scalar(
+        select(func.count()).select_from(Reading).where(Reading.reading_date < datetime(2024, 7, 1))
+    ) == len(counter_ids) * 18
+    
+    assert read_everything(db, counter_ids) == before
+    
+    # Производные таблицы совпадают с пересчетом по обоим уровням
+    assert MonthlyUsageService(db).verify() == []
+    latest_service = LatestReadingService(db)
+    latest = latest_service.get_latest_values()
+    latest_service.rebuild()
+    assert latest_service.get_latest_values() == latest
+    
+    # Повторный запуск ничего не переносит, новые id больше архивных
+    assert service.archive(datetime(2024, 7, 1)).archived == 0
+    new_reading = ReadingService(db).create_reading(
+        ReadingCreate(counter_id=counter_ids[0], value=10 ** 6, reading_date=datetime(2025, 1, 5))
+    )
+    assert new_reading.id > max_id >= db.scalar(select(func.max(ReadingArchive.id)))
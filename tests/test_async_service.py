@@ -0,0 +1,50 @@
+"""Асинхронные сервисы на той же базе, что и синхронные"""
+import asyncio
+from datetime import datetime
+
+from sqlalchemy.ext.asyncio import async_sessionmaker, create_async_engine
+
+from conftest import insert_readings, reading
+from models.schemas import ReadingCreate
+from services.async_service import AsyncReadingService
+from services.reading_service import ReadingService
+
+def test_async_reads_match_sync_service(db, counter_ids):
+    hot, cold, _ = counter_ids
+    service = ReadingService(db)
+    insert_readings(db, [
+        reading(hot, 10, datetime(2024, 4, 30)),
+        reading(cold, 50, datetime(2024, 4, 30)),
+        reading(hot, 14, datetime(2024, 5, 15)),
+        reading(hot, 17, datetime(2024, 5, 31)),
+        reading(cold, 58, datetime(2024, 5, 31)),
+    ], service.usage_service, service.latest_service)
+    expected_page = [row.id for row in service.get_readings_page(limit=3).items]
+    expected_consumption = service.calculate_monthly_consumption(2024, 5).model_dump()
+    expected_validation = service.validate_reading(hot, 12, datetime(2024, 6, 1))
+    
+    async def run():
+        # Тот же файл базы через aiosqlite (драйвер из requirements.txt)
+        engine = create_async_engine(db.get_bind().url.set(drivername="sqlite+aiosqlite"))
+        try:
+            async with async_sessionmaker(engine, expire_on_commit=False)() as session:
+                async_service = AsyncReadingService(session)
+                page = await async_service.get_readings_page(limit=3)
+                consumption = await async_service.calculate_monthly_consumption(2024, 5)
+                validation = await async_service.validate_reading(hot, 12, datetime(2024, 6, 1))
+                report = await async_service.create_readings_bulk([
+                    ReadingCreate(counter_id=hot, value=20, reading_date=datetime(2024, 6, 10)),
+                ])
+                return page, consumption, validation, report
+        finally:
+            await engine.dispose()
+    
+    page, consumption, validation, report = asyncio.run(run())
+    
+    assert [row.id for row in page.items] == expected_page
+    assert consumption.model_dump() == expected_consumption
+    assert validation == expected_validation
+    assert validation[0] is False
+    assert report.accepted == 1
+    db.rollback()
+    assert service.get_readings_page(hot, limit=1).items[0].value == 20
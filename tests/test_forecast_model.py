@@ -0,0 +1,70 @@
+"""Модель прогноза: пошаговые поправки против построения с нуля"""
+import numpy as np
+import pytest
+
+from services.forecast_service import (
+    ForecastModel, MIN_SEASONAL_MONTHS, MIN_TREND_MONTHS, design_matrix, month_index,
+)
+
+ORIGIN = month_index(2024, 1)
+
+def seasonal_usage(periods, base, trend):
+    angle = 2 * np.pi * (np.asarray(periods) % 12) / 12
+    return np.rint(base + trend * (np.asarray(periods) - ORIGIN) / 12 + 3 * np.sin(angle)).astype(float)
+
+def fitted(rows):
+    """Модель, построенная одним load по строкам {(счетчик, месяц): значение}"""
+    model = ForecastModel(origin=ORIGIN, cutoff=ORIGIN)
+    counter_ids, periods = zip(*rows)
+    model.load(np.array(counter_ids), np.array(periods), np.array(list(rows.values())))
+    return model
+
+def test_observed_deltas_match_fit_from_scratch():
+    periods = list(range(ORIGIN - 36, ORIGIN))
+    rows = {(1, period): value for period, value in zip(periods, seasonal_usage(periods, 10, 1))}
+    rows.update({(2, period): value for period, value in zip(periods[-8:], seasonal_usage(periods[-8:], 5, 0))})
+    model = fitted(rows)
+    
+    # Исправление месяца, удаление месяца, новый месяц и новый счетчик
+    changes = [(1, periods[3], 40.0), (1, periods[10], None), (2, periods[0], 6.0),
+               (3, periods[-1], 7.0), (2, periods[-1], -1.0)]
+    for counter_id, period, value in changes:
+        model.observe(counter_id, period, value)
+        if value is None or value < 0:
+            rows.pop((counter_id, period), None)
+        else:
+            rows[(counter_id, period)] = value
+    
+    reference = fitted(rows)
+    order = [reference.position(counter_id) for counter_id in model.counter_ids]
+    np.testing.assert_array_equal(model.months, reference.months[order])
+    np.testing.assert_allclose(model.xtx, reference.xtx[order], atol=1e-9)
+    np.testing.assert_allclose(model.xty, reference.xty[order], atol=1e-9)
+    np.testing.assert_allclose(model.coefficients(), reference.coefficients()[order], atol=1e-9)
+
+def test_fit_matches_ridge_solution():
+    periods = np.arange(ORIGIN - MIN_SEASONAL_MONTHS, ORIGIN)
+    values = seasonal_usage(periods, 12, 2)
+    model = fitted({(1, period): value for period, value in zip(periods.tolist(), values)})
+    
+    features = design_matrix(periods, ORIGIN)
+    penalty = np.diag([0.0, 1.0, 1.0, 1.0, 1.0, 1.0])
+    expected = np.linalg.lstsq(features.T @ features + penalty, features.T @ values, rcond=None)[0]
+    np.testing.assert_allclose(model.coefficients()[0], expected, atol=1e-4)
+
+@pytest.mark.parametrize("months", [1, MIN_TREND_MONTHS - 1])
+def test_short_history_reduces_to_mean(months):
+    periods = list(range(ORIGIN - months, ORIGIN))
+    values = [10.0 + 3 * index for index in range(months)]
+    model = fitted({(1, period): value for period, value in zip(periods, values)})
+    
+    np.testing.assert_allclose(model.coefficients()[0, 1:], 0, atol=1e-6)
+    np.testing.assert_allclose(model.predict([ORIGIN, ORIGIN + 7])[0], np.mean(values), atol=1e-4)
+
+def test_history_without_full_seasons_has_no_seasonal_terms():
+    periods = list(range(ORIGIN - (MIN_SEASONAL_MONTHS - 1), ORIGIN))
+    model = fitted({(1, period): value for period, value in zip(periods, seasonal_usage(periods, 10, 2))})
+    
+    coefficients = model.coefficients()[0]
+    np.testing.assert_allclose(coefficients[2:], 0, atol=1e-6)
+    assert coefficients[1] > 0
@@ -0,0 +1,89 @@
+"""HTTP-прием: сохранение принятых показаний и повтор записи после ошибки"""
+import json
+import threading
+import time
+import urllib.error
+import urllib.request
+from contextlib import contextmanager
+
+from sqlalchemy import func, select
+from sqlalchemy.orm import sessionmaker
+
+from models.entities import Reading
+from ui.http_ingest import IngestServer
+
+@contextmanager
+def running_server(session_factory):
+    """Сервер на свободном порту с короткой паузой записи"""
+    server = IngestServer(("127.0.0.1", 0), flush_size=100, flush_interval=0.05,
+                          session_factory=session_factory)
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    try:
+        yield f"http://127.0.0.1:{server.server_address[1]}"
+    finally:
+        server.shutdown()
+        server.server_close()
+        thread.join()
+
+def request(url, payload=None):
+    """Код ответа и тело JSON"""
+    data = None if payload is None else json.dumps(payload).encode("utf-8")
+    try:
+        with urllib.request.urlopen(urllib.request.Request(url, data=data)) as response:
+            return response.status, json.load(response)
+    except urllib.error.HTTPError as e:
+        return e.code, json.load(e)
+
+def wait_for(condition, timeout=5.0):
+    """Ожидание условия, которое выполняет фоновый поток записи"""
+    deadline = time.monotonic() + timeout
+    while not condition():
+        assert time.monotonic() < deadline, "условие не выполнилось"
+        time.sleep(0.02)
+
+def batch(counter_ids, day):
+    return [
+        {"counter_id": counter_id, "value": 10 + day, "reading_date": f"2024-03-{day:02d}T00:00:00"}
+        for counter_id in counter_ids
+    ]
+
+def count_readings(db):
+    db.rollback()  # Новый снимок после записи из потока сервера
+    return db.scalar(select(func.count()).select_from(Reading))
+
+def test_posted_batch_is_saved(db, counter_ids):
+    session_factory = sessionmaker(bind=db.get_bind())
+    with running_server(session_factory) as url:
+        status, body = request(f"{url}/readings", batch(counter_ids, 1))
+        assert (status, body) == (202, {"queued": 3})
+        wait_for(lambda: request(f"{url}/stats")[1]["readings_accepted"] == 3)
+    
+    assert count_readings(db) == 3
+
+def test_failed_write_is_retried_not_dropped(db, counter_ids):
+    session_factory = sessionmaker(bind=db.get_bind())
+    failing = [True]
+    
+    def flaky_factory():
+        if failing:
+            raise RuntimeError("база недоступна")
+        return session_factory()
+    
+    with running_server(flaky_factory) as url:
+        assert request(f"{url}/readings", batch(counter_ids, 1))[0] == 202
+        wait_for(lambda: request(f"{url}/health")[0] == 503)
+        
+        # Пока запись не удается, новые показания не принимаются
+        assert request(f"{url}/readings", batch(counter_ids, 2))[0] == 503
+        stats = request(f"{url}/stats")[1]
+        assert stats["readings_rejected"] == 0
+        assert stats["readings_buffered"] == 3
+        
+        failing.clear()
+        wait_for(lambda: request(f"{url}/health")[0] == 200)
+        stats = request(f"{url}/stats")[1]
+        assert stats["readings_accepted"] == 3
+        assert stats["failed_flushes"] >= 1
+    
+    assert count_readings(db) == 3
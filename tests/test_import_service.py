@@ -0,0 +1,74 @@
+"""Импорт показаний: продолжение после остановки без потерь и дубликатов"""
+import os
+from datetime import datetime, timedelta
+
+import pytest
+from sqlalchemy import func, select
+
+from models.entities import Reading
+from services.import_service import ReadingImportService
+from services.latest_service import LatestReadingService
+
+CHUNK_SIZE = 3
+
+@pytest.fixture
+def readings_csv(tmp_path, counter_ids):
+    """CSV из 10 показаний двух счетчиков и одной строки с неизвестным счетчиком"""
+    lines = ["counter_number,value,reading_date"]
+    for day in range(5):
+        reading_date = (datetime(2024, 1, 1) + timedelta(days=day)).date().isoformat()
+        lines.append(f"ГВ-1,{10 + day},{reading_date}")
+        lines.append(f"ХВ-1,{20 + 2 * day},{reading_date}")
+    lines.insert(5, "НЕТ-1,1,2024-01-01")
+    path = tmp_path / "readings.csv"
+    path.write_text("\n".join(lines) + "\n", encoding="utf-8")
+    return str(path)
+
+def fail_on_call(monkeypatch, cls, name, call_number):
+    """Метод класса падает на call_number-м вызове"""
+    original = getattr(cls, name)
+    calls = []
+    
+    def failing(self, *args, **kwargs):
+        calls.append(1)
+        if len(calls) == call_number:
+            raise RuntimeError("остановка импорта")
+        return original(self, *args, **kwargs)
+    
+    monkeypatch.setattr(cls, name, failing)
+
+def stored_readings(db):
+    rows = db.execute(select(Reading.counter_id, Reading.reading_date, Reading.value)).all()
+    assert len(rows) == len(set(rows)), "дубликаты показаний"
+    return len(rows)
+
+def test_resume_after_chunk_fails_partway(db, readings_csv, monkeypatch):
+    # Вторая порция вставлена, но падает до коммита (при обновлении снимка)
+    fail_on_call(monkeypatch, LatestReadingService, "apply_readings", 2)
+    with pytest.raises(RuntimeError):
+        ReadingImportService(db, CHUNK_SIZE).import_file(readings_csv)
+    db.rollback()  # Незафиксированная порция теряется вместе с процессом
+    monkeypatch.undo()
+    
+    assert stored_readings(db) == CHUNK_SIZE
+    assert os.path.exists(ReadingImportService.get_checkpoint_path(readings_csv))
+    
+    report = ReadingImportService(db, CHUNK_SIZE).import_file(readings_csv)
+    assert report.resumed_from_line == 4
+    assert (report.accepted, report.rejected, report.skipped) == (7, 1, 0)
+    assert stored_readings(db) == 10
+    assert not os.path.exists(ReadingImportService.get_checkpoint_path(readings_csv))
+
+def test_resume_after_commit_without_checkpoint(db, readings_csv, monkeypatch):
+    # Вторая порция зафиксирована, контрольная точка осталась после первой
+    fail_on_call(monkeypatch, ReadingImportService, "_save_checkpoint", 2)
+    with pytest.raises(RuntimeError):
+        ReadingImportService(db, CHUNK_SIZE).import_file(readings_csv)
+    monkeypatch.undo()
+    
+    assert stored_readings(db) == 2 * CHUNK_SIZE
+    
+    report = ReadingImportService(db, CHUNK_SIZE).import_file(readings_csv)
+    assert report.resumed_from_line == 4
+    assert (report.accepted, report.rejected, report.skipped) == (4, 1, 3)
+    assert stored_readings(db) == 10
@@ -0,0 +1,42 @@
+"""Снимок последних показаний: пошаговое обновление против пересчета"""
+from datetime import datetime
+
+from conftest import insert_readings, reading
+from services.latest_service import LatestReadingService
+
+def test_apply_readings_matches_rebuild(db, counter_ids):
+    service = LatestReadingService(db)
+    hot, cold, unused = counter_ids
+    batches = [
+        [
+            reading(hot, 10, datetime(2024, 1, 5)),
+            reading(hot, 14, datetime(2024, 1, 20)),
+            reading(cold, 100, datetime(2024, 1, 10)),
+        ],
+        # Равные даты в пакете: последним считается вставленное позже
+        [
+            reading(hot, 20, datetime(2024, 2, 1)),
+            reading(hot, 21, datetime(2024, 2, 1)),
+        ],
+        # Равная дата в следующем пакете тоже заменяет снимок
+        [reading(hot, 22, datetime(2024, 2, 1))],
+        # Задним числом: снимок не меняется
+        [
+            reading(cold, 90, datetime(2023, 12, 1)),
+            reading(hot, 12, datetime(2024, 1, 25)),
+        ],
+    ]
+    
+    for batch in batches:
+        insert_readings(db, batch, service)
+    
+    incremental = service.get_latest_values()
+    assert incremental == {
+        hot: (22, datetime(2024, 2, 1)),
+        cold: (100, datetime(2024, 1, 10)),
+        unused: None,
+    }
+    
+    service.rebuild()
+    assert service.get_latest_values() == incremental
+    assert service.get_latest_values([cold]) == {cold: incremental[cold]}
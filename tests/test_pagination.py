@@ -0,0 +1,92 @@
+"""Курсорная пагинация показаний и платежей"""
+from datetime import datetime
+
+from sqlalchemy import insert
+
+from conftest import insert_readings, reading
+from models.entities import Payment
+from services.payment_service import PaymentService
+from services.reading_service import ReadingService
+
+def walk(get_page, between_pages=None):
+    """Все страницы по курсорам; between_pages вызывается после каждой страницы"""
+    pages = [get_page(None)]
+    while pages[-1].has_next:
+        if between_pages:
+            between_pages()
+        pages.append(get_page(pages[-1].next_cursor))
+    return pages
+
+def newest_first(rows):
+    return [row.id for row in sorted(rows, key=lambda row: (row.reading_date, row.id), reverse=True)]
+
+def test_readings_with_equal_dates_are_split_by_id(db, counter_ids):
+    hot, cold, _ = counter_ids
+    # Семь показаний за один день: граница страниц проходит внутри даты
+    insert_readings(db, [reading(counter_id, value, datetime(2024, 3, 1))
+                         for value in range(4) for counter_id in (hot, cold)][:7])
+    insert_readings(db, [reading(hot, 10, datetime(2024, 3, 2)), reading(hot, 0, datetime(2024, 2, 1))])
+    service = ReadingService(db)
+    
+    pages = walk(lambda cursor: service.get_readings_page(cursor=cursor, limit=3))
+    
+    ids = [row.id for page in pages for row in page.items]
+    assert [len(page.items) for page in pages] == [3, 3, 3]
+    assert ids == newest_first(row for page in pages for row in page.items)
+    assert len(set(ids)) == 9
+    # Последняя страница ровно по limit строк - курсора дальше нет
+    assert pages[-1].next_cursor is None
+    
+    hot_pages = walk(lambda cursor: service.get_readings_page(hot, cursor, limit=2))
+    assert [row.counter_id for page in hot_pages for row in page.items] == [hot] * 6
+    assert [len(page.items) for page in hot_pages] == [2, 2, 2]
+
+def test_reading_pages_stay_stable_when_rows_are_inserted(db, counter_ids):
+    hot = counter_ids[0]
+    insert_readings(db, [reading(hot, day, datetime(2024, 1, day)) for day in range(1, 11)])
+    service = ReadingService(db)
+    expected = [row.id for row in service.get_readings_page(hot, limit=100).items]
+    
+    inserted = []
+    
+    def insert_between_pages():
+        # Новые показания и показание той же даты, что у курсора, но с большим id
+        day = 20 + len(inserted)
+        insert_readings(db, [
+            reading(hot, 100 + day, datetime(2024, 1, day)),
+            reading(hot, 0, datetime(2024, 1, 8 - 3 * len(inserted))),
+        ])
+        inserted.append(day)
+    
+    pages = walk(lambda cursor: service.get_readings_page(hot, cursor, limit=3), insert_between_pages)
+    
+    ids = [row.id for page in pages for row in page.items]
+    assert ids == expected
+    assert pages[-1].next_cursor is None
+
+def test_payments_with_equal_calculated_at(db):
+    calculated_at = datetime(2024, 6, 1, 12, 0)
+    db.execute(insert(Payment.__table__), [
+        {
+            "period_start": datetime(2024, month, 1),
+            "period_end": datetime(2024, month, 28),
+            "total_amount": 1.0,
+            "cold_water_consumption": 0, "cold_water_amount": 0.0,
+            "hot_water_consumption": 0, "hot_water_amount": 0.0,
+            "wastewater_consumption": 0, "wastewater_amount": 0.0,
+            "calculated_at": calculated_at if month < 5 else datetime(2024, 5, month),
+        }
+        for month in range(1, 8)
+    ])
+    db.commit()
+    service = PaymentService(db)
+    
+    pages = walk(lambda cursor: service.get_payments_page(cursor, limit=2))
+    
+    payments = [payment for page in pages for payment in page.items]
+    assert [len(page.items) for page in pages] == [2, 2, 2, 1]
+    assert [payment.id for payment in payments] == [
+        payment.id for payment in sorted(payments, key=lambda payment: (payment.calculated_at, payment.id), reverse=True)
+    ]
+    assert len({payment.id for payment in payments}) == 7
+    assert pages[-1].next_cursor is None
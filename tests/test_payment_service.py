@@ -0,0 +1,76 @@
+"""Платежи: отчет о потреблении, ID по ключам и перезапись при повторном расчете"""
+import sqlite3
+from datetime import datetime, timedelta
+
+import pytest
+from sqlalchemy import event, func, select
+
+from models.entities import Payment
+from models.schemas import PaymentCalculation
+from services.payment_service import KEY_LOOKUP_CHUNK, PaymentService
+from services.property_service import PropertyService
+
+# Предел числа параметров в старых сборках SQLite (SQLITE_MAX_VARIABLE_NUMBER)
+SQLITE_MIN_VARIABLES = 999
+
+def daily_calculations(property_id, days, consumption=1):
+    start = datetime(2000, 1, 1)
+    return [
+        PaymentCalculation(
+            property_id=property_id,
+            period_start=start + timedelta(days=day),
+            period_end=start + timedelta(days=day, hours=23),
+            hot_water_consumption=consumption,
+            cold_water_consumption=consumption,
+            wastewater_consumption=2 * consumption,
+            hot_water_rate=1.0,
+            cold_water_rate=1.0,
+            wastewater_rate=1.0,
+            total_amount=4.0 * consumption,
+        )
+        for day in range(days)
+    ]
+
+def test_save_payments_past_sqlite_variable_limit(db):
+    engine = db.get_bind()
+    
+    @event.listens_for(engine, "connect")
+    def limit_variables(connection, record):
+        connection.setlimit(sqlite3.SQLITE_LIMIT_VARIABLE_NUMBER, SQLITE_MIN_VARIABLES)
+    
+    db.close()
+    engine.dispose()
+    
+    # По три параметра на ключ: одним запросом ID не прочитать
+    days = 2 * KEY_LOOKUP_CHUNK + 50
+    assert 3 * days > SQLITE_MIN_VARIABLES
+    property_id = PropertyService(db).get_or_create_default_property().id
+    service = PaymentService(db)
+    
+    ids = service.save_payments(daily_calculations(property_id, days))
+    assert len(set(ids)) == days
+    
+    # Повторный расчет перезаписывает те же платежи и возвращает те же ID
+    assert service.save_payments(daily_calculations(property_id, days, consumption=2)) == ids
+    assert db.scalar(select(func.count()).select_from(Payment)) == days
+    payment = db.get(Payment, ids[-1])
+    assert (payment.period_start, payment.total_amount) == (datetime(2000, 1, 1) + timedelta(days=days - 1), 8.0)
+
+def test_consumption_report_must_match_month_and_property(db):
+    service = PaymentService(db)
+    service.initialize_default_tariffs()
+    property_id = PropertyService(db).get_or_create_default_property().id
+    
+    report = service.reading_service.calculate_monthly_consumption(2024, 5, property_id)
+    calculation = service.calculate_monthly_payment(2024, 5, property_id, consumption=report)
+    assert calculation == service.calculate_monthly_payment(2024, 5, property_id)
+    
+    with pytest.raises(ValueError, match="другому объекту"):
+        service.calculate_monthly_payment(2024, 5, consumption=report)
+    with pytest.raises(ValueError, match="другому объекту"):
+        service.calculate_monthly_payment(
+            2024, 5, property_id,
+            consumption=service.reading_service.calculate_monthly_consumption(2024, 5)
+        )
+    with pytest.raises(ValueError, match="другому месяцу"):
+        service.calculate_monthly_payment(2024, 6, property_id, consumption=report)
@@ -0,0 +1,62 @@
+"""Число запросов расчетов не зависит от числа объектов и счетчиков"""
+from datetime import datetime
+
+import pytest
+from sqlalchemy import select
+
+from models.entities import Counter, Property
+from models.schemas import ReadingCreate
+from services.instrumentation import QueryBudgetExceeded
+from services.latest_service import LatestReadingService
+from services.payment_service import PaymentService
+from services.reading_service import ReadingService
+
+# Запросов за вызов при любом числе объектов: потребление одним оконным
+# запросом, тарифы одним запросом индекса, список объектов
+CALCULATE_ALL_PROPERTIES_BUDGET = 3
+GET_LATEST_VALUES_BUDGET = 1
+
+def add_properties(db, count, first=0):
+    """Объекты с парой счетчиков и показаниями за апрель и май 2024"""
+    readings = []
+    for number in range(first, first + count):
+        property_ = Property(name=f"Объект {number}")
+        db.add(property_)
+        db.flush()
+        for water_type in ("hot", "cold"):
+            counter = Counter(number=f"{water_type}-{number}", water_type=water_type, property_id=property_.id)
+            db.add(counter)
+            db.flush()
+            readings += [
+                ReadingCreate(counter_id=counter.id, value=10 + number, reading_date=datetime(2024, 4, 30)),
+                ReadingCreate(counter_id=counter.id, value=15 + 2 * number, reading_date=datetime(2024, 5, 31)),
+            ]
+    db.commit()
+    ReadingService(db).create_readings_bulk(readings)
+
+def test_batch_queries_do_not_grow_with_counters(db, strict_queries):
+    PaymentService(db).initialize_default_tariffs()
+    
+    properties = 0
+    for count in (2, 10):
+        add_properties(db, count, properties)
+        properties += count
+        strict_queries.reports.clear()
+        
+        batch = PaymentService(db).calculate_all_properties(2024, 5)
+        latest = LatestReadingService(db).get_latest_values()
+        
+        assert len(batch.calculations) == properties
+        assert len(latest) == 2 * properties
+        reports = strict_queries.reports
+        assert reports["PaymentService.calculate_all_properties"].statements == CALCULATE_ALL_PROPERTIES_BUDGET
+        assert reports["LatestReadingService.get_latest_values"].statements == GET_LATEST_VALUES_BUDGET
+
+def test_per_property_loop_is_reported_as_n_plus_one(db, strict_queries):
+    add_properties(db, strict_queries.max_repeated + 1)
+    reading_service = ReadingService(db)
+    
+    with pytest.raises(QueryBudgetExceeded, match="один запрос выполнен"):
+        with strict_queries.track("loop"):
+            for property_id in db.scalars(select(Property.id)):
+                reading_service.calculate_monthly_consumption(2024, 5, property_id)
@@ -0,0 +1,58 @@
+"""Хранилище series у ReadingService: только зафиксированные показания"""
+from datetime import datetime
+
+import pytest
+from sqlalchemy import event
+
+from models.schemas import ReadingCreate
+from services.reading_service import ReadingService
+from services.timeseries import ReadingSeriesStore
+
+def history(service, counter_id):
+    """История счетчика по series и по базе"""
+    return service.get_counter_history(counter_id), ReadingService(service.db).get_counter_history(counter_id)
+
+def new_reading(counter_id, value, day):
+    return ReadingCreate(counter_id=counter_id, value=value, reading_date=datetime(2024, 5, day))
+
+def test_series_gets_committed_readings(db, counter_ids):
+    hot = counter_ids[0]
+    service = ReadingService(db, ReadingSeriesStore.load(db))
+    
+    service.create_readings_bulk([new_reading(hot, 10, 1), new_reading(hot, 12, 20)])
+    service.create_reading(new_reading(hot, 15, 31))
+    
+    from_series, from_db = history(service, hot)
+    assert from_series == from_db
+    assert len(from_series) == 3
+
+def test_series_skips_rolled_back_readings(db, counter_ids):
+    hot = counter_ids[0]
+    service = ReadingService(db, ReadingSeriesStore.load(db))
+    service.create_readings_bulk([new_reading(hot, 10, 1)])
+    
+    # Ошибка после вставки, до коммита
+    def fail(usage_rows):
+        raise RuntimeError("ошибка получателя")
+    
+    service.usage_listeners.append(fail)
+    with pytest.raises(RuntimeError):
+        service.create_readings_bulk([new_reading(hot, 12, 10)])
+    db.rollback()
+    service.usage_listeners.remove(fail)
+    
+    # Ошибка самого коммита
+    def fail_commit(session):
+        raise RuntimeError("ошибка коммита")
+    
+    event.listen(db, "before_commit", fail_commit)
+    with pytest.raises(RuntimeError):
+        service.create_reading(new_reading(hot, 13, 15))
+    event.remove(db, "before_commit", fail_commit)
+    db.rollback()
+    
+    service.create_readings_bulk([new_reading(hot, 14, 20)])
+    from_series, from_db = history(service, hot)
+    assert from_series == from_db == [(datetime(2024, 5, 1), 10), (datetime(2024, 5, 20), 14)]
+    assert service.calculate_monthly_consumption(2024, 5).model_dump() == \
+        ReadingService(db).calculate_monthly_consumption(2024, 5).model_dump()
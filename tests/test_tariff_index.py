@@ -0,0 +1,43 @@
+"""Индекс тарифов: цена на границах интервалов действия"""
+from datetime import datetime
+
+import pytest
+
+from models.entities import Tariff
+from services.tariff_index import TariffIndex
+
+@pytest.fixture
+def index(db):
+    """Два смежных тарифа, разрыв и действующий тариф без конца"""
+    db.add_all([
+        Tariff(service_type="cold_water", price_per_cubic_meter=10.0,
+               start_date=datetime(2023, 1, 1), end_date=datetime(2024, 1, 1)),
+        Tariff(service_type="cold_water", price_per_cubic_meter=20.0,
+               start_date=datetime(2024, 1, 1), end_date=datetime(2024, 6, 1)),
+        Tariff(service_type="cold_water", price_per_cubic_meter=30.0,
+               start_date=datetime(2024, 7, 1), end_date=None),
+    ])
+    db.commit()
+    return TariffIndex(db)
+
+@pytest.mark.parametrize("moment, price", [
+    (datetime(2023, 1, 1), 10.0),  # Равна start_date первого тарифа
+    (datetime(2023, 12, 31, 23, 59, 59), 10.0),
+    (datetime(2024, 1, 1), 20.0),  # Равна end_date: действует следующий тариф
+    (datetime(2024, 6, 1), None),  # Равна end_date перед разрывом
+    (datetime(2024, 6, 15), None),  # Между тарифами
+    (datetime(2024, 7, 1), 30.0),
+    (datetime(2030, 1, 1), 30.0),  # Тариф без конца
+    (datetime(2022, 12, 31), None),  # Раньше самого раннего
+])
+def test_price_at_boundaries(index, moment, price):
+    assert index.get_price("cold_water", moment) == price
+    assert index.get_prices("cold_water", [moment]) == [price]
+
+def test_fallback_to_earliest_only_before_history(index):
+    assert index.get_price("cold_water", datetime(2022, 12, 31), fallback_to_earliest=True) == 10.0
+    # Разрыв внутри истории не заполняется самым ранним тарифом
+    assert index.get_price("cold_water", datetime(2024, 6, 15), fallback_to_earliest=True) is None
+    assert index.get_prices("cold_water", [datetime(2000, 1, 1), datetime(2024, 1, 1)],
+                            fallback_to_earliest=True) == [10.0, 20.0]
+    assert index.get_price("hot_water", datetime(2024, 1, 1), fallback_to_earliest=True) is None
@@ -0,0 +1,59 @@
+"""Таблица помесячного потребления: пошаговое обновление против пересчета"""
+from datetime import datetime
+
+from sqlalchemy import select
+
+from conftest import insert_readings, reading
+from models.entities import CounterMonthlyUsage
+from services.usage_service import MonthlyUsageService, USAGE_FIELDS
+
+def usage_table(db):
+    """Строки таблицы по ключу (счетчик, год, месяц)"""
+    return {
+        (row.counter_id, row.year, row.month): {field: getattr(row, field) for field in USAGE_FIELDS}
+        for row in db.scalars(select(CounterMonthlyUsage))
+    }
+
+def test_apply_readings_matches_rebuild(db, counter_ids):
+    service = MonthlyUsageService(db)
+    hot, cold, other = counter_ids
+    batches = [
+        # Показания по порядку, несколько счетчиков и месяцев в пакете
+        [
+            reading(hot, 10, datetime(2024, 1, 5)),
+            reading(hot, 14, datetime(2024, 1, 20)),
+            reading(cold, 100, datetime(2024, 1, 10)),
+            reading(hot, 20, datetime(2024, 3, 3)),
+            reading(cold, 130, datetime(2024, 3, 15)),
+        ],
+        # Равные даты: последним считается показание, вставленное позже
+        [
+            reading(hot, 25, datetime(2024, 3, 31)),
+            reading(hot, 26, datetime(2024, 3, 31)),
+            reading(other, 5, datetime(2024, 2, 1)),
+        ],
+        [reading(hot, 27, datetime(2024, 3, 31))],
+        # Задним числом в пропущенный месяц: меняется потребление марта
+        [reading(hot, 17, datetime(2024, 2, 14))],
+        # Задним числом раньше первого показания месяца и всей истории
+        [
+            reading(cold, 95, datetime(2024, 1, 2)),
+            reading(cold, 90, datetime(2023, 12, 28)),
+        ],
+        # Задним числом после последнего показания месяца: меняется следующий месяц
+        [reading(cold, 120, datetime(2024, 1, 31, 23))],
+    ]
+    
+    for batch in batches:
+        insert_readings(db, batch, service)
+        assert service.verify() == []
+    
+    incremental = usage_table(db)
+    service.rebuild()
+    assert usage_table(db) == incremental
+    
+    # Показание в феврале меняет базу марта: 27 - 17
+    assert incremental[(hot, 2024, 3)]["consumption"] == 10
+    assert incremental[(hot, 2024, 3)]["last_value"] == 27
+    # Последнее показание января задним числом - база марта (февраля нет): 130 - 120
+    assert incremental[(cold, 2024, 3)]["consumption"] == 10
@@ -0,0 +1,334 @@
+"""Командная строка для пакетных операций без диалога
+
+    python main.py init
+    python main.py bill --year 2024 --month 5 --save
+    python main.py forecast --year 2024 --month 6
+    python main.py tariff set --service cold_water --price 70.5 --start 2025-01-01
+    python main.py tariff list
+    python main.py readings import readings.csv
+    python main.py readings archive --months 24
+    python main.py summary --year 2024 --by-property
+    python main.py alerts list --kind leak
+    python main.py alerts rebuild
+    python main.py export readings readings.csv.gz --start 2024-01-01
+
+Результат печатается в stdout одним JSON-документом. Коды возврата:
+0 - успешно, 1 - ошибка, 2 - неверные аргументы, 3 - выполнено
+с предупреждениями (отклоненные показания, аномалии потребления,
+непросмотренные оповещения).
+"""
+import argparse
+import dataclasses
+import json
+import sys
+from typing import Dict, List, Optional
+
+EXIT_OK = 0
+EXIT_ERROR = 1
+EXIT_USAGE = 2
+EXIT_WARNINGS = 3
+
+SERVICE_TYPES = ("cold_water", "hot_water", "wastewater")
+
+def _json_default(value):
+    """Даты - в ISO 8601, остальное - строкой"""
+    if hasattr(value, "isoformat"):
+        return value.isoformat()
+    return str(value)
+
+def _emit(data) -> None:
+    """Вывод результата в JSON"""
+    print(json.dumps(data, ensure_ascii=False, indent=2, default=_json_default))
+
+def _note(message: str) -> None:
+    """Подсказка пользователю в stderr, чтобы stdout оставался JSON"""
+    print(f"⚠️ {message}", file=sys.stderr)
+
+def _tariff_dict(tariff) -> Dict:
+    return {
+        "id": tariff.id,
+        "service_type": tariff.service_type,
+        "price_per_cubic_meter": tariff.price_per_cubic_meter,
+        "start_date": tariff.start_date,
+        "end_date": tariff.end_date,
+    }
+
+def cmd_init(db, args) -> int:
+    """Объект, счетчики и тарифы по умолчанию"""
+    from services.counter_service import CounterService
+    from services.payment_service import PaymentService
+    from services.property_service import PropertyService
+    
+    default_property = PropertyService(db).get_or_create_default_property()
+    counters = CounterService(db).initialize_default_counters(default_property.id)
+    tariffs = PaymentService(db).initialize_default_tariffs()
+    _emit({
+        "property_id": default_property.id,
+        "counters_created": len(counters),
+        "tariffs_created": len(tariffs),
+    })
+    return EXIT_OK
+
+def cmd_bill(db, args) -> int:
+    """Расчет платежей за месяц по всем объектам или по одному"""
+    from services.payment_service import PaymentService
+    
+    payment_service = PaymentService(db)
+    details = {}
+    if args.property is not None:
+        consumption = payment_service.reading_service.calculate_monthly_consumption(
+            args.year, args.month, args.property
+        )
+        calculations = [payment_service.calculate_monthly_payment(
+            args.year, args.month, args.property, consumption=consumption
+        )]
+        anomalies = consumption.anomalies
+    else:
+        batch = payment_service.calculate_all_properties(args.year, args.month)
+        calculations, anomalies = batch.calculations, batch.anomalies
+        details = {"properties_count": batch.properties_count, "elapsed_seconds": batch.elapsed_seconds}
+    
+    saved = []
+    if args.save:
+        saved = payment_service.save_payments(calculations, args.notes)
+    
+    _emit({
+        "year": args.year,
+        "month": args.month,
+        **details,
+        "total_amount": round(sum(calculation.total_amount for calculation in calculations), 2),
+        "calculations": [calculation.model_dump(mode="json") for calculation in calculations],
+        "anomalies": [anomaly.model_dump(mode="json") for anomaly in anomalies],
+        "saved_payment_ids": saved,
+    })
+    return EXIT_WARNINGS if anomalies else EXIT_OK
+
+def cmd_forecast(db, args) -> int:
+    """Ожидаемые платежи за месяц по прогнозу потребления"""
+    from services.forecast_service import ForecastService
+    
+    forecast_service = ForecastService(db)
+    calculations = forecast_service.project_payments(args.year, args.month)
+    result = {
+        "year": args.year,
+        "month": args.month,
+        "total_amount": round(sum(calculation.total_amount for calculation in calculations), 2),
+        "calculations": [calculation.model_dump(mode="json") for calculation in calculations],
+    }
+    if args.counters:
+        result["counters"] = forecast_service.forecast_counters(args.year, args.month)
+    _emit(result)
+    return EXIT_OK
+
+def cmd_tariff_set(db, args) -> int:
+    """Новый тариф с даты; действующий тариф закрывается"""
+    from services.payment_service import PaymentService
+    
+    if args.price <= 0:
+        raise ValueError("Цена должна быть больше нуля")
+    tariff = PaymentService(db).create_tariff(args.service, args.price, args.start)
+    _emit(_tariff_dict(tariff))
+    return EXIT_OK
+
+def cmd_tariff_list(db, args) -> int:
+    """Действующие тарифы"""
+    from services.payment_service import PaymentService
+    
+    payment_service = PaymentService(db)
+    tariffs = [payment_service.get_current_tariff(service_type) for service_type in SERVICE_TYPES]
+    _emit([_tariff_dict(tariff) for tariff in tariffs if tariff])
+    return EXIT_OK
+
+def cmd_readings_import(db, args) -> int:
+    """Импорт показаний из CSV/JSONL"""
+    from services.import_service import ReadingImportService
+    
+    report = ReadingImportService(db, args.chunk_size).import_file(
+        args.path, args.format, resume=not args.no_resume, delimiter=args.delimiter
+    )
+    _emit(report.model_dump(mode="json"))
+    return EXIT_WARNINGS if report.rejected else EXIT_OK
+
+def cmd_readings_archive(db, args) -> int:
+    """Перенос показаний старше горизонта в архив"""
+    from services.archive_service import ReadingArchiveService, horizon_start
+    
+    before = args.before or horizon_start(args.months)
+    report = ReadingArchiveService(db, args.batch_size).archive(before)
+    _emit(report.model_dump(mode="json"))
+    return EXIT_OK
+
+def cmd_summary(db, args) -> int:
+    """Сводка платежей за год"""
+    from services.payment_service import PaymentService
+    
+    payment_service = PaymentService(db)
+    result = payment_service.get_payment_summary(args.year)
+    if args.by_property:
+        result["properties"] = [
+            dataclasses.asdict(totals)
+            for totals in payment_service.get_payment_totals(("property",), args.year, args.year)
+        ]
+    if args.by_month:
+        result["months"] = [
+            dataclasses.asdict(totals)
+            for totals in payment_service.get_payment_totals(("month",), args.year, args.year)
+        ]
+    _emit(result)
+    return EXIT_OK
+
+def cmd_alerts_list(db, args) -> int:
+    """Оповещения об аномалиях, новые первыми"""
+    from services.anomaly_service import AnomalyService, REBUILD_HINT
+    
+    anomaly_service = AnomalyService(db)
+    if anomaly_service.needs_rebuild():
+        _note(REBUILD_HINT)
+    page = anomaly_service.get_alerts_page(args.counter, args.kind, limit=args.limit)
+    _emit([
+        {
+            "id": alert.id,
+            "counter_id": alert.counter_id,
+            "kind": alert.kind,
+            "reading_date": alert.reading_date,
+            "value": alert.value,
+            "daily_usage": alert.daily_usage,
+            "baseline": alert.baseline,
+            "message": alert.message,
+            "acknowledged": alert.acknowledged,
+        }
+        for alert in page.items
+    ])
+    return EXIT_WARNINGS if any(not alert.acknowledged for alert in page.items) else EXIT_OK
+
+def cmd_alerts_rebuild(db, args) -> int:
+    """Пересчет статистики детектора по истории показаний"""
+    from services.anomaly_service import AnomalyService
+    
+    counters, alerts = AnomalyService(db).rebuild(record_alerts=args.record_alerts)
+    _emit({"counters": counters, "alerts_found": alerts, "alerts_recorded": args.record_alerts})
+    return EXIT_OK
+
+def cmd_export(db, args) -> int:
+    """Потоковый экспорт набора данных в файл"""
+    from services.export_service import ExportService
+    
+    report = ExportService(db, args.batch_size).export(
+        args.dataset, args.path, args.format,
+        start_date=args.start, end_date=args.end,
+        counter_id=args.counter, property_id=args.property
+    )
+    _emit(report.model_dump(mode="json"))
+    return EXIT_OK
+
+def build_parser() -> argparse.ArgumentParser:
+    """Разбор аргументов: подкоманда и ее параметры"""
+    from services.import_service import DEFAULT_CHUNK_SIZE, SUPPORTED_FORMATS, parse_reading_date
+    from services.anomaly_service import ALERT_KINDS
+    from services.archive_service import DEFAULT_HORIZON_MONTHS, DEFAULT_BATCH_SIZE
+    from services.export_service import DATASETS, EXPORT_FORMATS, parse_end_date
+    from services.export_service import DEFAULT_BATCH_SIZE as EXPORT_BATCH_SIZE
+    
+    parser = argparse.ArgumentParser(prog="main.py", description="Water Counter: пакетные операции")
+    commands = parser.add_subparsers(dest="command", required=True)
+    
+    init = commands.add_parser("init", help="Объект, счетчики и тарифы по умолчанию")
+    init.set_defaults(handler=cmd_init)
+    
+    bill = commands.add_parser("bill", help="Расчет платежей за месяц")
+    bill.add_argument("--year", type=int, required=True)
+    bill.add_argument("--month", type=int, required=True, choices=range(1, 13), metavar="1-12")
+    bill.add_argument("--property", type=int, help="ID объекта (по умолчанию - все объекты)")
+    bill.add_argument("--save", action="store_true", help="Сохранить рассчитанные платежи")
+    bill.add_argument("--notes", help="Примечание к сохраненным платежам")
+    bill.set_defaults(handler=cmd_bill)
+    
+    forecast = commands.add_parser("forecast", help="Прогноз платежей за месяц")
+    forecast.add_argument("--year", type=int, required=True)
+    forecast.add_argument("--month", type=int, required=True, choices=range(1, 13), metavar="1-12")
+    forecast.add_argument("--counters", action="store_true", help="Добавить прогноз по счетчикам")
+    forecast.set_defaults(handler=cmd_forecast)
+    
+    tariff = commands.add_parser("tariff", help="Тарифы").add_subparsers(dest="action", required=True)
+    tariff_set = tariff.add_parser("set", help="Установить тариф")
+    tariff_set.add_argument("--service", required=True, choices=SERVICE_TYPES)
+    tariff_set.add_argument("--price", type=float, required=True, help="Цена за м³, руб")
+    tariff_set.add_argument("--start", type=parse_reading_date, required=True, help="Дата начала (ГГГГ-ММ-ДД)")
+    tariff_set.set_defaults(handler=cmd_tariff_set)
+    tariff.add_parser("list", help="Действующие тарифы").set_defaults(handler=cmd_tariff_list)
+    
+    readings = commands.add_parser("readings", help="Показания").add_subparsers(dest="action", required=True)
+    readings_import = readings.add_parser("import", help="Импорт показаний из CSV/JSONL")
+    readings_import.add_argument("path")
+    readings_import.add_argument("--format", choices=SUPPORTED_FORMATS)
+    readings_import.add_argument("--chunk-size", type=int, default=DEFAULT_CHUNK_SIZE)
+    readings_import.add_argument("--delimiter", default=",")
+    readings_import.add_argument("--no-resume", action="store_true", help="Начать с начала файла")
+    readings_import.set_defaults(handler=cmd_readings_import)
+    readings_archive = readings.add_parser("archive", help="Перенести старые показания в архив")
+    horizon = readings_archive.add_mutually_exclusive_group()
+    horizon.add_argument("--months", type=int, default=DEFAULT_HORIZON_MONTHS, help="Горизонт хранения в месяцах")
+    horizon.add_argument("--before", type=parse_reading_date, help="Архивировать показания раньше даты (ГГГГ-ММ-ДД)")
+    readings_archive.add_argument("--batch-size", type=int, default=DEFAULT_BATCH_SIZE)
+    readings_archive.set_defaults(handler=cmd_readings_archive)
+    
+    summary = commands.add_parser("summary", help="Сводка платежей за год")
+    summary.add_argument("--year", type=int, required=True)
+    summary.add_argument("--by-property", action="store_true")
+    summary.add_argument("--by-month", action="store_true")
+    summary.set_defaults(handler=cmd_summary)
+    
+    alerts = commands.add_parser("alerts", help="Оповещения об аномалиях").add_subparsers(dest="action", required=True)
+    alerts_list = alerts.add_parser("list", help="Последние оповещения")
+    alerts_list.add_argument("--counter", type=int, help="ID счетчика")
+    alerts_list.add_argument("--kind", choices=ALERT_KINDS)
+    alerts_list.add_argument("--limit", type=int, default=50)
+    alerts_list.set_defaults(handler=cmd_alerts_list)
+    alerts_rebuild = alerts.add_parser("rebuild", help="Пересчитать статистику по истории показаний")
+    alerts_rebuild.add_argument("--record-alerts", action="store_true", help="Записать аномалии истории")
+    alerts_rebuild.set_defaults(handler=cmd_alerts_rebuild)
+    
+    export = commands.add_parser("export", help="Экспорт показаний, платежей и тарифов")
+    export.add_argument("dataset", choices=DATASETS)
+    export.add_argument("path", help="Файл выгрузки (.csv, .jsonl, .parquet; .gz - сжатие)")
+    export.add_argument("--format", choices=EXPORT_FORMATS, help="Формат (по умолчанию - по расширению)")
+    export.add_argument("--start", type=parse_reading_date, help="Начало периода (ГГГГ-ММ-ДД)")
+    export.add_argument("--end", type=parse_end_date, help="Конец периода включительно (ГГГГ-ММ-ДД)")
+    export.add_argument("--counter", type=int, help="ID счетчика (только readings)")
+    export.add_argument("--property", type=int, help="ID объекта")
+    export.add_argument("--batch-size", type=int, default=EXPORT_BATCH_SIZE)
+    export.set_defaults(handler=cmd_export)
+    return parser
+
+def main(argv: Optional[List[str]] = None) -> int:
+    """Выполнение подкоманды, возвращает код возврата"""
+    argv = sys.argv[1:] if argv is None else argv
+    
+    try:
+        args = build_parser().parse_args(argv)
+    except SystemExit as e:
+        return EXIT_OK if e.code == 0 else EXIT_USAGE
+    
+    from models.database import engine, SessionLocal
+    from models.migrations import ensure_schema, SchemaRevisionError
+    
+    try:
+        migrated = ensure_schema(engine)
+    except SchemaRevisionError as e:
+        _emit({"error": str(e)})
+        return EXIT_ERROR
+    db = SessionLocal()
+    try:
+        # После обновления схемы напоминаем о пересчете статистики детектора
+        if migrated and args.handler not in (cmd_alerts_list, cmd_alerts_rebuild):
+            from services.anomaly_service import AnomalyService, REBUILD_HINT
+            
+            if AnomalyService(db).needs_rebuild():
+                _note(REBUILD_HINT)
+        return args.handler(db, args)
+    except (ValueError, OSError) as e:
+        db.rollback()
+        _emit({"error": str(e)})
+        return EXIT_ERROR
+    finally:
+        db.close()
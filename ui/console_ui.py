@@ -1,21 +1,43 @@
 from datetime import datetime, date
+from functools import cached_property
 from typing import List
 from sqlalchemy.orm import Session
 from models.database import get_db
-from models.entities import Counter, Reading, Payment, Tariff
-from services.counter_service import CounterService
-from services.reading_service import ReadingService
-from services.payment_service import PaymentService
-from models.schemas import ReadingCreate, CounterCreate
+from ui.pager import page_through
+
+# Размер страниц в просмотре истории
+PAGE_SIZE = 20
+PAYMENTS_PAGE_SIZE = 5
 
 class ConsoleUI:
     """Консольный интерфейс для приложения"""
     
     def __init__(self):
         self.db = next(get_db())
-        self.counter_service = CounterService(self.db)
-        self.reading_service = ReadingService(self.db)
-        self.payment_service = PaymentService(self.db)
+    
+    # Сервисы, схемы и модели (а с ними pydantic, NumPy, pyarrow и
+    # маппинг таблиц) загружаются при первом обращении, поэтому меню
+    # появляется без их импорта
+    
+    @cached_property
+    def counter_service(self):
+        from services.counter_service import CounterService
+        return CounterService(self.db)
+    
+    @cached_property
+    def reading_service(self):
+        from services.reading_service import ReadingService
+        return ReadingService(self.db)
+    
+    @cached_property
+    def payment_service(self):
+        from services.payment_service import PaymentService
+        return PaymentService(self.db)
+    
+    @cached_property
+    def property_service(self):
+        from services.property_service import PropertyService
+        return PropertyService(self.db)
     
     def show_main_menu(self):
         """Отображение главного меню"""
@@ -30,11 +52,18 @@ class ConsoleUI:
         print("6. Управление тарифами")
         print("7. Управление счетчиками")
         print("8. Инициализация системы")
+        print("9. Импорт показаний из файла")
+        print("10. Расчет платежей по всем объектам")
+        print("11. Пересчет помесячного потребления")
+        print("12. Экспорт данных")
+        print("13. Оповещения об аномалиях")
         print("0. Выход")
         print("-"*50)
     
     def input_readings(self):
         """Ввод показаний счетчиков"""
+        from models.schemas import ReadingCreate
+        
         print("\n📊 ВВОД ПОКАЗАНИЙ СЧЕТЧИКОВ")
         print("-"*30)
         
@@ -59,10 +88,12 @@ class ConsoleUI:
         
         print(f"\nВведите показания на {reading_date.strftime('%d.%m.%Y')}:")
         
+        # Последние показания всех счетчиков одним запросом
+        latest_values = self.reading_service.get_latest_values()
+        
         for counter in counters:
-            # Получаем последнее показание
-            latest_reading = self.reading_service.get_latest_reading_by_counter(counter.id)
-            last_value = latest_reading.value if latest_reading else 0
+            latest = latest_values.get(counter.id)
+            last_value = latest[0] if latest else 0
             
             print(f"\n{counter.description} ({counter.number})")
             print(f"Последнее показание: {last_value} м³")
@@ -90,6 +121,43 @@ class ConsoleUI:
                 except Exception as e:
                     print(f"❌ Ошибка: {e}")
     
+    def import_readings(self):
+        """Импорт показаний из CSV/JSONL файла"""
+        from services.import_service import ReadingImportService, DEFAULT_CHUNK_SIZE
+        
+        print("\n📥 ИМПОРТ ПОКАЗАНИЙ ИЗ ФАЙЛА")
+        print("-"*30)
+        print("Поддерживаются CSV (с заголовком) и JSONL с полями:")
+        print("counter_number, value, reading_date (ГГГГ-ММ-ДД или ДД.ММ.ГГГГ)")
+        
+        path = input("Путь к файлу: ").strip()
+        if not path:
+            print("❌ Путь к файлу не указан")
+            return
+        
+        try:
+            chunk_input = input(f"Размер порции (по умолчанию {DEFAULT_CHUNK_SIZE}): ").strip()
+            chunk_size = int(chunk_input) if chunk_input else DEFAULT_CHUNK_SIZE
+            
+            import_service = ReadingImportService(self.db, chunk_size)
+            report = import_service.import_file(path)
+            
+            if report.resumed_from_line:
+                print(f"↪️ Импорт продолжен со строки {report.resumed_from_line + 1}")
+            print(f"✅ Обработано строк: {report.processed}")
+            print(f"✅ Принято показаний: {report.accepted}")
+            if report.rejected:
+                print(f"⚠️ Отклонено: {report.rejected}")
+                for error in report.errors:
+                    print(f"  {error}")
+                
+        except FileNotFoundError:
+            print(f"❌ Файл не найден: {path}")
+        except ValueError as e:
+            print(f"❌ Ошибка импорта: {e}")
+        except Exception as e:
+            print(f"❌ Ошибка: {e}")
+    
     def show_counters(self):
         """Просмотр счетчиков"""
         print("\n🔧 СЧЕТЧИКИ")
@@ -100,10 +168,11 @@ class ConsoleUI:
             print("Счетчики не найдены")
             return
         
+        latest_values = self.reading_service.get_latest_values()
         for counter in counters:
-            latest_reading = self.reading_service.get_latest_reading_by_counter(counter.id)
-            last_value = latest_reading.value if latest_reading else "Нет данных"
-            last_date = latest_reading.reading_date.strftime("%d.%m.%Y") if latest_reading else "Нет данных"
+            latest = latest_values.get(counter.id)
+            last_value = latest[0] if latest else "Нет данных"
+            last_date = latest[1].strftime("%d.%m.%Y") if latest else "Нет данных"
             
             print(f"\n{counter.description}")
             print(f"  Номер: {counter.number}")
@@ -112,6 +181,8 @@ class ConsoleUI:
     
     def show_readings_history(self):
         """Просмотр истории показаний"""
+        from models.entities import Reading
+        
         print("\n📈 ИСТОРИЯ ПОКАЗАНИЙ")
         print("-"*30)
         
@@ -120,17 +191,31 @@ class ConsoleUI:
             print("Счетчики не найдены")
             return
         
-        for counter in counters:
-            print(f"\n{counter.description} ({counter.number})")
-            print("-" * 40)
-            
-            readings = self.reading_service.get_readings_by_counter(counter.id, 5)
-            if not readings:
-                print("  Нет данных")
-                continue
-            
-            for reading in readings:
-                print(f"  {reading.reading_date.strftime('%d.%m.%Y')}: {reading.value} м³")
+        for i, counter in enumerate(counters, 1):
+            print(f"{i}. {counter.description} ({counter.number})")
+        
+        choice = input("\nВыберите счетчик (Enter — все счетчики): ").strip()
+        counter_id = None
+        if choice:
+            try:
+                counter_id = counters[int(choice) - 1].id
+            except (ValueError, IndexError):
+                print("❌ Неверный выбор")
+                return
+        
+        names = {counter.id: f"{counter.description} ({counter.number})" for counter in counters}
+        
+        def render(reading: Reading):
+            line = f"  {reading.reading_date.strftime('%d.%m.%Y')}: {reading.value} м³"
+            if counter_id is None:
+                line += f"  — {names.get(reading.counter_id, reading.counter_id)}"
+            print(line)
+        
+        print()
+        page_through(
+            lambda cursor: self.reading_service.get_readings_page(counter_id, cursor, PAGE_SIZE),
+            render
+        )
     
     def calculate_monthly_payment(self):
         """Расчет платежа за месяц"""
@@ -153,7 +238,13 @@ class ConsoleUI:
                 print("❌ Месяц должен быть от 1 до 12")
                 return
             
-            calculation = self.payment_service.calculate_monthly_payment(year, month)
+            consumption_report = self.reading_service.calculate_monthly_consumption(year, month)
+            for anomaly in consumption_report.anomalies:
+                print(f"⚠️ Внимание: {anomaly.message}")
+            
+            calculation = self.payment_service.calculate_monthly_payment(
+                year, month, consumption=consumption_report
+            )
             
             print(f"\n📊 РАСЧЕТ ЗА {month:02d}.{year}")
             print("="*40)
@@ -180,17 +271,164 @@ class ConsoleUI:
         except Exception as e:
             print(f"❌ Ошибка: {e}")
     
+    def calculate_all_properties(self):
+        """Расчет платежей за месяц по всем объектам"""
+        print("\n🏢 РАСЧЕТ ПЛАТЕЖЕЙ ПО ВСЕМ ОБЪЕКТАМ")
+        print("-"*30)
+        
+        current_date = datetime.now()
+        
+        try:
+            year_input = input(f"Введите год (по умолчанию {current_date.year}): ").strip()
+            year = int(year_input) if year_input else current_date.year
+            
+            month_input = input(f"Введите месяц (1-12, по умолчанию {current_date.month}): ").strip()
+            month = int(month_input) if month_input else current_date.month
+            
+            if month < 1 or month > 12:
+                print("❌ Месяц должен быть от 1 до 12")
+                return
+            
+            result = self.payment_service.calculate_all_properties(year, month)
+            
+            for anomaly in result.anomalies:
+                print(f"⚠️ Внимание: {anomaly.message}")
+            
+            print(f"\n📊 РАСЧЕТ ЗА {month:02d}.{year}")
+            print("="*40)
+            for calculation in result.calculations:
+                print(f"Объект #{calculation.property_id}: {calculation.total_amount:.2f} руб")
+            
+            total_amount = sum(c.total_amount for c in result.calculations)
+            print(f"\nОбъектов: {result.properties_count}")
+            print(f"ИТОГО: {total_amount:.2f} руб")
+            print(f"⏱️ {result.elapsed_seconds:.3f} с ({result.properties_per_second:.0f} объектов/с)")
+            
+            save = input("\nСохранить платежи по всем объектам? (y/n): ").lower()
+            if save == 'y':
+                notes = input("Примечания (необязательно): ").strip() or None
+                payment_ids = self.payment_service.save_payments(result.calculations, notes)
+                print(f"✅ Сохранено платежей: {len(payment_ids)} (прежние расчеты за период перезаписаны)")
+            
+        except ValueError as e:
+            print(f"❌ Ошибка расчета: {e}")
+        except Exception as e:
+            print(f"❌ Ошибка: {e}")
+    
+    def rebuild_monthly_usage(self):
+        """Пересчет таблицы помесячного потребления с проверкой"""
+        from services.usage_service import MonthlyUsageService
+        
+        print("\n🔄 ПЕРЕСЧЕТ ПОМЕСЯЧНОГО ПОТРЕБЛЕНИЯ")
+        print("-"*30)
+        
+        try:
+            usage_service = MonthlyUsageService(self.db)
+            rows = usage_service.rebuild()
+            print(f"✅ Пересчитано строк: {rows}")
+            
+            mismatches = usage_service.verify()
+            if mismatches:
+                print(f"❌ Найдены расхождения с показаниями ({len(mismatches)}):")
+                for mismatch in mismatches:
+                    print(f"  {mismatch}")
+            else:
+                print("✅ Таблица совпадает с показаниями")
+                
+        except Exception as e:
+            print(f"❌ Ошибка: {e}")
+    
+    def export_data(self):
+        """Экспорт показаний, платежей или тарифов в файл"""
+        from services.export_service import ExportService, DATASETS, parse_end_date
+        from services.import_service import parse_reading_date
+        
+        print("\n📤 ЭКСПОРТ ДАННЫХ")
+        print("-"*30)
+        
+        for i, dataset in enumerate(DATASETS, 1):
+            print(f"{i}. {dataset}")
+        
+        try:
+            dataset = DATASETS[int(input("Выберите набор данных: ").strip()) - 1]
+            path = input("Файл выгрузки (.csv, .jsonl, .parquet; .gz - сжатие): ").strip()
+            if not path:
+                print("❌ Путь к файлу не указан")
+                return
+            
+            start_input = input("Начало периода (ГГГГ-ММ-ДД, Enter - без ограничения): ").strip()
+            end_input = input("Конец периода (ГГГГ-ММ-ДД, Enter - без ограничения): ").strip()
+            
+            counter_id = None
+            if dataset == "readings":
+                counter_input = input("Номер счетчика (Enter - все счетчики): ").strip()
+                if counter_input:
+                    counter = self.counter_service.get_counter_by_number(counter_input)
+                    if not counter:
+                        print(f"❌ Счетчик {counter_input} не найден")
+                        return
+                    counter_id = counter.id
+            
+            report = ExportService(self.db).export(
+                dataset, path,
+                start_date=parse_reading_date(start_input) if start_input else None,
+                end_date=parse_end_date(end_input) if end_input else None,
+                counter_id=counter_id
+            )
+            print(f"✅ Выгружено строк: {report.rows} в {report.path} ({report.elapsed_seconds:.2f} с)")
+            
+        except IndexError:
+            print("❌ Неверный выбор")
+        except ValueError as e:
+            print(f"❌ Ошибка экспорта: {e}")
+        except Exception as e:
+            print(f"❌ Ошибка: {e}")
+    
+    def show_alerts(self):
+        """Просмотр оповещений об утечках и аномалиях показаний"""
+        from services.anomaly_service import AnomalyService, REBUILD_HINT
+        
+        print("\n🚨 ОПОВЕЩЕНИЯ ОБ АНОМАЛИЯХ")
+        print("-"*30)
+        
+        anomaly_service = AnomalyService(self.db)
+        if anomaly_service.needs_rebuild():
+            print(f"⚠️ {REBUILD_HINT}")
+        numbers = {counter.id: counter.number for counter in self.counter_service.get_all_counters()}
+        titles = {"leak": "Утечка", "spike": "Скачок", "stall": "Простой", "regression": "Откат"}
+        
+        def render(alert):
+            mark = "  " if alert.acknowledged else "❗"
+            print(f"{mark} #{alert.id} {alert.reading_date.strftime('%d.%m.%Y')} "
+                  f"{numbers.get(alert.counter_id, alert.counter_id)}: "
+                  f"{titles.get(alert.kind, alert.kind)} — {alert.message}")
+        
+        shown = page_through(
+            lambda cursor: anomaly_service.get_alerts_page(cursor=cursor, limit=PAGE_SIZE),
+            render,
+            empty_message="Оповещений нет"
+        )
+        if not shown:
+            return
+        
+        alert_input = input("\nНомер оповещения для отметки о просмотре (Enter - пропустить): ").strip().lstrip("#")
+        if alert_input:
+            try:
+                if anomaly_service.acknowledge_alert(int(alert_input)):
+                    print("✅ Оповещение отмечено")
+                else:
+                    print("❌ Оповещение не найдено")
+            except ValueError:
+                print("❌ Введите корректный номер")
+    
     def show_payments_history(self):
         """Просмотр истории платежей"""
+        from models.entities import Payment
+        
         print("\n💳 ИСТОРИЯ ПЛАТЕЖЕЙ")
         print("-"*30)
         
-        payments = self.payment_service.get_all_payments()
-        if not payments:
-            print("Платежи не найдены")
-            return
-        
-        for payment in payments:
+        def render(payment: Payment):
             print(f"\nПлатеж #{payment.id}")
             print(f"Период: {payment.period_start.strftime('%d.%m.%Y')} - {payment.period_end.strftime('%d.%m.%Y')}")
             print(f"Холодная вода: {payment.cold_water_consumption} м³ = {payment.cold_water_amount:.2f} руб")
@@ -200,6 +438,12 @@ class ConsoleUI:
             if payment.notes:
                 print(f"Примечания: {payment.notes}")
             print(f"Рассчитан: {payment.calculated_at.strftime('%d.%m.%Y %H:%M')}")
+        
+        page_through(
+            lambda cursor: self.payment_service.get_payments_page(cursor, PAYMENTS_PAGE_SIZE),
+            render,
+            empty_message="Платежи не найдены"
+        )
     
     def manage_tariffs(self):
         """Управление тарифами"""
@@ -290,8 +534,10 @@ class ConsoleUI:
         print("\n🚀 ИНИЦИАЛИЗАЦИЯ СИСТЕМЫ")
         print("-"*30)
         
+        default_property = self.property_service.get_or_create_default_property()
+        
         print("Создание счетчиков по умолчанию...")
-        counters = self.counter_service.initialize_default_counters()
+        counters = self.counter_service.initialize_default_counters(default_property.id)
         print(f"✅ Создано {len(counters)} счетчиков")
         
         print("Создание тарифов по умолчанию...")
@@ -329,6 +575,8 @@ class ConsoleUI:
     
     def add_counter(self):
         """Добавление нового счетчика"""
+        from models.schemas import CounterCreate
+        
         print("\n➕ ДОБАВЛЕНИЕ СЧЕТЧИКА")
         print("-"*30)
         
@@ -359,11 +607,13 @@ class ConsoleUI:
             
             description = input("Описание (необязательно): ").strip() or None
             
-            # Создаем счетчик
+            # Создаем счетчик в объекте по умолчанию
+            default_property = self.property_service.get_or_create_default_property()
             counter_data = CounterCreate(
                 number=number,
                 water_type=water_type,
-                description=description
+                description=description,
+                property_id=default_property.id
             )
             
             new_counter = self.counter_service.create_counter(counter_data)
@@ -436,6 +686,8 @@ class ConsoleUI:
     
     def edit_counter_number(self, counter):
         """Редактирование номера счетчика"""
+        from models.schemas import CounterCreate
+        
         print(f"\n📝 РЕДАКТИРОВАНИЕ НОМЕРА СЧЕТЧИКА")
         print("-"*40)
         print(f"Текущий номер: {counter.number}")
@@ -467,6 +719,8 @@ class ConsoleUI:
     
     def edit_counter_type(self, counter):
         """Редактирование типа счетчика"""
+        from models.schemas import CounterCreate
+        
         print(f"\n🌊 РЕДАКТИРОВАНИЕ ТИПА СЧЕТЧИКА")
         print("-"*40)
         print(f"Текущий тип: {'Горячая вода' if counter.water_type == 'hot' else 'Холодная вода'}")
@@ -504,6 +758,8 @@ class ConsoleUI:
     
     def edit_counter_description(self, counter):
         """Редактирование описания счетчика"""
+        from models.schemas import CounterCreate
+        
         print(f"\n📄 РЕДАКТИРОВАНИЕ ОПИСАНИЯ СЧЕТЧИКА")
         print("-"*40)
         print(f"Текущее описание: {counter.description or 'Без описания'}")
@@ -593,6 +849,16 @@ class ConsoleUI:
                 self.manage_counters()
             elif choice == "8":
                 self.initialize_system()
+            elif choice == "9":
+                self.import_readings()
+            elif choice == "10":
+                self.calculate_all_properties()
+            elif choice == "11":
+                self.rebuild_monthly_usage()
+            elif choice == "12":
+                self.export_data()
+            elif choice == "13":
+                self.show_alerts()
             elif choice == "0":
                 print("👋 До свидания!")
                 break
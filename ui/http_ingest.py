@@ -0,0 +1,345 @@
+"""HTTP-сервер приема показаний от счетчиков и приложений подрядчиков
+
+Запуск: python -m ui.http_ingest --port 8080
+
+POST /readings  - одно показание (объект) или пакет (массив) в формате
+                  ReadingCreate: counter_id, value, reading_date
+GET  /stats     - задержки приема (p50/p99), запросы в секунду, буфер
+GET  /health    - проверка доступности
+
+Показания проверяются схемой ReadingCreate и складываются в ограниченный
+буфер, откуда фоновый поток сохраняет их через
+ReadingService.create_readings_bulk пакетами по размеру или по времени.
+Если буфер заполнен, сервер отвечает 503 с заголовком Retry-After;
+пакет больше всего буфера не поместится никогда и отклоняется с 413.
+
+Пакет, который не удалось записать (база недоступна, схема не
+обновлена), возвращается в начало буфера и повторяется с растущей
+паузой. Пока запись не восстановится, POST /readings и GET /health
+отвечают 503: принятые показания не теряются, новые не принимаются.
+"""
+import argparse
+import json
+import threading
+import time
+from collections import deque
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Callable, Dict, List, Optional
+from pydantic import ValidationError
+from models.database import engine, SessionLocal
+from models.migrations import ensure_schema
+from models.schemas import ReadingCreate, BulkReadingReport
+from services.reading_service import ReadingService
+
+DEFAULT_BUFFER_SIZE = 50000
+DEFAULT_FLUSH_SIZE = 5000
+DEFAULT_FLUSH_INTERVAL = 0.5  # секунды
+LATENCY_WINDOW = 10000  # Число последних запросов для перцентилей
+RATE_WINDOW = 10.0  # Окно расчета текущей частоты запросов, секунды
+MAX_STORED_ERRORS = 50
+MAX_RETRY_DELAY = 30.0  # Наибольшая пауза между повторами записи, секунды
+
+class IngestStats:
+    """Статистика приема: задержки и частота запросов"""
+    
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._latencies = deque(maxlen=LATENCY_WINDOW)
+        self._timestamps = deque()
+        self.started_at = time.monotonic()
+        self.requests = 0
+        self.rejected_requests = 0
+        self.readings_queued = 0
+        self.readings_accepted = 0
+        self.readings_rejected = 0
+        self.flushes = 0
+        self.failed_flushes = 0
+        self.errors = deque(maxlen=MAX_STORED_ERRORS)
+    
+    def record_request(self, latency: float, rejected: bool = False):
+        """Учет обработанного запроса"""
+        now = time.monotonic()
+        with self._lock:
+            self.requests += 1
+            if rejected:
+                self.rejected_requests += 1
+            self._latencies.append(latency)
+            self._timestamps.append(now)
+            while self._timestamps and now - self._timestamps[0] > RATE_WINDOW:
+                self._timestamps.popleft()
+    
+    def record_queued(self, count: int):
+        """Учет показаний, принятых в буфер"""
+        with self._lock:
+            self.readings_queued += count
+    
+    def record_flush(self, report: BulkReadingReport):
+        """Учет сохраненного пакета"""
+        with self._lock:
+            self.flushes += 1
+            self.readings_accepted += report.accepted
+            self.readings_rejected += report.rejected
+            for rejected in report.rejected_rows:
+                self.errors.append(f"Счетчик {rejected.counter_id}: {rejected.message}")
+    
+    def record_error(self, message: str):
+        """Учет ошибки записи пакета"""
+        with self._lock:
+            self.failed_flushes += 1
+            self.errors.append(message)
+    
+    def snapshot(self, buffered: int) -> Dict:
+        """Текущие показатели в виде словаря"""
+        with self._lock:
+            latencies = sorted(self._latencies)
+            uptime = time.monotonic() - self.started_at
+            window = min(RATE_WINDOW, uptime) or 1.0
+            return {
+                "uptime_seconds": round(uptime, 3),
+                "requests": self.requests,
+                "rejected_requests": self.rejected_requests,
+                "requests_per_second": round(self.requests / uptime, 2) if uptime else 0.0,
+                "recent_requests_per_second": round(len(self._timestamps) / window, 2),
+                "latency_p50_ms": round(_percentile(latencies, 0.50) * 1000, 3),
+                "latency_p99_ms": round(_percentile(latencies, 0.99) * 1000, 3),
+                "readings_queued": self.readings_queued,
+                "readings_buffered": buffered,
+                "readings_accepted": self.readings_accepted,
+                "readings_rejected": self.readings_rejected,
+                "flushes": self.flushes,
+                "failed_flushes": self.failed_flushes,
+                "recent_errors": list(self.errors),
+            }
+
+def _percentile(sorted_values: List[float], fraction: float) -> float:
+    """Перцентиль по отсортированному списку (ближайший ранг)"""
+    if not sorted_values:
+        return 0.0
+    index = min(len(sorted_values) - 1, int(round(fraction * (len(sorted_values) - 1))))
+    return sorted_values[index]
+
+class WriteBehindBuffer:
+    """Ограниченный буфер показаний с фоновой групповой записью
+    
+    Пакет сохраняется, когда в буфере набралось flush_size показаний или
+    прошло flush_interval секунд с последней записи. Пакет с ошибкой
+    записи возвращается в начало буфера и повторяется через паузу,
+    которая удваивается до MAX_RETRY_DELAY; пока запись не удалась,
+    буфер новые показания не принимает.
+    """
+    
+    def __init__(self, stats: IngestStats,
+                 max_size: int = DEFAULT_BUFFER_SIZE,
+                 flush_size: int = DEFAULT_FLUSH_SIZE,
+                 flush_interval: float = DEFAULT_FLUSH_INTERVAL,
+                 session_factory: Callable = SessionLocal):
+        self.stats = stats
+        self.max_size = max_size
+        self.flush_size = flush_size
+        self.flush_interval = flush_interval
+        self.session_factory = session_factory
+        self._items: List[ReadingCreate] = []
+        self._condition = threading.Condition()
+        self._stopping = False
+        self._retry_delay = 0.0
+        self._thread = threading.Thread(target=self._run, name="ingest-flusher", daemon=True)
+    
+    def __len__(self) -> int:
+        with self._condition:
+            return len(self._items)
+    
+    @property
+    def healthy(self) -> bool:
+        """Последняя запись в базу прошла успешно"""
+        with self._condition:
+            return not self._retry_delay
+    
+    def start(self):
+        """Запуск фонового потока записи"""
+        self._thread.start()
+    
+    def stop(self):
+        """Остановка с записью оставшихся показаний"""
+        with self._condition:
+            self._stopping = True
+            self._condition.notify()
+        self._thread.join()
+    
+    def offer(self, readings: List[ReadingCreate]) -> bool:
+        """Добавление показаний целиком; False, если места в буфере нет
+        или запись в базу не удается
+        
+        Пакет больше max_size не поместится никогда, его отклоняет
+        обработчик запроса до вызова offer.
+        """
+        with self._condition:
+            if self._retry_delay or len(self._items) + len(readings) > self.max_size:
+                return False
+            self._items.extend(readings)
+            if len(self._items) >= self.flush_size:
+                self._condition.notify()
+        self.stats.record_queued(len(readings))
+        return True
+    
+    def _run(self):
+        """Цикл фоновой записи"""
+        while True:
+            with self._condition:
+                # После ошибки записи ждем всю паузу, даже при полном буфере
+                deadline = time.monotonic() + (self._retry_delay or self.flush_interval)
+                while not self._stopping and (self._retry_delay or len(self._items) < self.flush_size):
+                    remaining = deadline - time.monotonic()
+                    if remaining <= 0:
+                        break
+                    self._condition.wait(remaining)
+                batch = self._items[:self.flush_size]
+                del self._items[:self.flush_size]
+                stopping = self._stopping
+            
+            saved = not batch or self._flush(batch)
+            with self._condition:
+                if saved:
+                    self._retry_delay = 0.0
+                elif stopping:
+                    # Последняя попытка при остановке: дальше ждать некому
+                    lost = len(batch) + len(self._items)
+                    self._items.clear()
+                    self.stats.record_error(f"Остановка без записи: потеряно {lost} показаний")
+                    return
+                else:
+                    self._items[:0] = batch
+                    self._retry_delay = min(MAX_RETRY_DELAY, self._retry_delay * 2 or self.flush_interval)
+                if stopping and not self._items:
+                    return
+    
+    def _flush(self, batch: List[ReadingCreate]) -> bool:
+        """Сохранение пакета одной транзакцией; False при ошибке записи"""
+        try:
+            # Закрытие сессии откатывает незавершенную транзакцию
+            with self.session_factory() as db:
+                report = ReadingService(db).create_readings_bulk(batch)
+        except Exception as e:
+            self.stats.record_error(f"Ошибка записи пакета из {len(batch)} показаний: {e}")
+            return False
+        self.stats.record_flush(report)
+        return True
+
+class IngestHandler(BaseHTTPRequestHandler):
+    """Обработчик HTTP-запросов приема показаний"""
+    
+    server_version = "WaterCounterIngest/1.0"
+    
+    def do_POST(self):
+        started = time.perf_counter()
+        if self.path != "/readings":
+            self._send_json(404, {"error": "Не найдено"})
+            return
+        
+        try:
+            length = int(self.headers.get("Content-Length", 0))
+            payload = json.loads(self.rfile.read(length) or b"null")
+            items = payload if isinstance(payload, list) else [payload]
+            readings = [ReadingCreate.model_validate(item) for item in items]
+        except (ValueError, ValidationError) as e:
+            self._finish(started, 400, {"error": str(e)}, rejected=True)
+            return
+        
+        if not readings:
+            self._finish(started, 400, {"error": "Пустой пакет"}, rejected=True)
+            return
+        
+        if len(readings) > self.server.buffer.max_size:
+            # Повтор не поможет - пакет нужно разделить
+            self._finish(started, 413, {
+                "error": f"Пакет из {len(readings)} показаний больше буфера, "
+                         f"не больше {self.server.buffer.max_size} за запрос"
+            }, rejected=True)
+            return
+        
+        if not self.server.buffer.healthy:
+            self._finish(started, 503, {"error": "Запись в базу недоступна, повторите позже"},
+                         rejected=True, headers={"Retry-After": "5"})
+            return
+        
+        if not self.server.buffer.offer(readings):
+            # Буфер заполнен - клиент должен повторить запрос позже
+            self._finish(started, 503, {"error": "Буфер заполнен, повторите позже"},
+                         rejected=True, headers={"Retry-After": "1"})
+            return
+        
+        self._finish(started, 202, {"queued": len(readings)})
+    
+    def do_GET(self):
+        if self.path == "/stats":
+            self._send_json(200, self.server.stats.snapshot(len(self.server.buffer)))
+        elif self.path == "/health":
+            if self.server.buffer.healthy:
+                self._send_json(200, {"status": "ok"})
+            else:
+                self._send_json(503, {"status": "unavailable", "error": "Запись в базу не удается"})
+        else:
+            self._send_json(404, {"error": "Не найдено"})
+    
+    def _finish(self, started: float, status: int, body: Dict,
+                rejected: bool = False, headers: Optional[Dict[str, str]] = None):
+        """Ответ клиенту с учетом задержки в статистике"""
+        self._send_json(status, body, headers)
+        self.server.stats.record_request(time.perf_counter() - started, rejected)
+    
+    def _send_json(self, status: int, body: Dict, headers: Optional[Dict[str, str]] = None):
+        """Отправка JSON-ответа"""
+        data = json.dumps(body, ensure_ascii=False).encode("utf-8")
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json; charset=utf-8")
+        self.send_header("Content-Length", str(len(data)))
+        for name, value in (headers or {}).items():
+            self.send_header(name, value)
+        self.end_headers()
+        self.wfile.write(data)
+    
+    def log_message(self, format, *args):
+        """Построчный лог запросов отключен, статистика доступна в /stats"""
+        pass
+
+class IngestServer(ThreadingHTTPServer):
+    """HTTP-сервер с буфером отложенной записи"""
+    
+    daemon_threads = True
+    
+    def __init__(self, address, buffer_size: int = DEFAULT_BUFFER_SIZE,
+                 flush_size: int = DEFAULT_FLUSH_SIZE,
+                 flush_interval: float = DEFAULT_FLUSH_INTERVAL,
+                 session_factory: Callable = SessionLocal):
+        super().__init__(address, IngestHandler)
+        self.stats = IngestStats()
+        self.buffer = WriteBehindBuffer(self.stats, buffer_size, flush_size, flush_interval, session_factory)
+        self.buffer.start()
+    
+    def server_close(self):
+        super().server_close()
+        self.buffer.stop()
+
+def main(argv: Optional[List[str]] = None):
+    """Запуск сервера приема показаний"""
+    parser = argparse.ArgumentParser(description="HTTP-прием показаний счетчиков")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8080)
+    parser.add_argument("--buffer-size", type=int, default=DEFAULT_BUFFER_SIZE)
+    parser.add_argument("--flush-size", type=int, default=DEFAULT_FLUSH_SIZE)
+    parser.add_argument("--flush-interval", type=float, default=DEFAULT_FLUSH_INTERVAL)
+    args = parser.parse_args(argv)
+    
+    # Буфер пишет в таблицы последних миграций, схему обновляем до приема
+    ensure_schema(engine)
+    server = IngestServer((args.host, args.port), args.buffer_size, args.flush_size, args.flush_interval)
+    print(f"🌊 Прием показаний: http://{args.host}:{args.port}/readings")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        print("\n⏹️ Остановка, сохранение буфера...")
+    finally:
+        server.server_close()
+        print(json.dumps(server.stats.snapshot(0), ensure_ascii=False, indent=2))
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,37 @@
+"""Постраничный вывод в консоли
+
+Следующая страница запрашивается только по команде пользователя,
+поэтому в памяти держится одна страница, а не вся история.
+"""
+from typing import Callable, Optional, TypeVar
+from services.pagination import Page, Cursor
+
+T = TypeVar("T")
+
+def page_through(fetch_page: Callable[[Optional[Cursor]], Page[T]],
+                 render: Callable[[T], None],
+                 empty_message: str = "Нет данных") -> int:
+    """Вывод страниц до конца данных или до отказа пользователя
+    
+    fetch_page получает курсор (None для первой страницы) и возвращает
+    Page; render печатает одну строку. Возвращает число выведенных строк.
+    """
+    cursor = None
+    shown = 0
+    while True:
+        page = fetch_page(cursor)
+        for item in page.items:
+            render(item)
+        shown += len(page.items)
+        
+        if shown == 0:
+            print(empty_message)
+            return 0
+        if not page.has_next:
+            print(f"\n— Показано записей: {shown}, конец списка —")
+            return shown
+        
+        answer = input(f"\nПоказано записей: {shown}. Enter — следующая страница, q — выход: ").strip().lower()
+        if answer in ("q", "й", "0"):
+            return shown
+        cursor = page.next_cursor